@@ -1,10 +1,32 @@
 from fastapi import APIRouter
 from .schemas import AgentRequest
-from .services import run_agent_work
+from .services import (
+    cancel_agent_job,
+    get_agent_job,
+    get_agent_job_result,
+    run_agent_work,
+    submit_agent_job,
+)
 
 router = APIRouter()
 
 @router.post("/run-agent")
 async def run_agent(request: AgentRequest):    
     return await run_agent_work(request.query, request.url, {"sub": "ahmad.ejaz@codeupscale.com"})
-        
\ No newline at end of file
+
+@router.post("/jobs", status_code=202)
+async def submit_job(request: AgentRequest):
+    """Queue an agent run and return its task_id right away"""
+    return await submit_agent_job(request.query, request.url, {"sub": "ahmad.ejaz@codeupscale.com"})
+
+@router.get("/jobs/{task_id}")
+async def get_job(task_id: str):
+    return await get_agent_job(task_id)
+
+@router.get("/jobs/{task_id}/result")
+async def get_job_result(task_id: str):
+    return await get_agent_job_result(task_id)
+
+@router.post("/jobs/{task_id}/cancel")
+async def cancel_job(task_id: str):
+    return await cancel_agent_job(task_id)
@@ -1,36 +1,117 @@
+import asyncio
+import json
+import os
+import uuid
+
 from fastapi import HTTPException
+from src.jobs.job_queue import JobQueueFull
+from src.jobs.job_store import Job
+from src.outputdata.output_data import TaskExecutionLog, use_execution_log
 from src.webui.components.browser_use_agent_tab import run_agent_task
 
 manager = None
+browser_pool = None
+job_queue = None
+
+# Agent runs allowed at the same time, further requests wait for a free slot
+MAX_CONCURRENT_AGENT_TASKS = int(os.getenv("MAX_CONCURRENT_AGENT_TASKS") or os.getenv("BROWSER_POOL_SIZE") or 1)
+_admission = None
 
 def set_websocket_manager(ws_manager):
     global manager
     manager = ws_manager
 
-async def run_agent_work(query, url, user):
-    try:
-        print("\n DELETING THE AGENT EXECUTION JSON FILE")
-        with open("src/outputdata/agent_execution.json", "w") as file:
-            file.write("")
+def set_browser_pool(pool):
+    global browser_pool
+    browser_pool = pool
 
-        async def message_callback(message: str):
-            if manager:
-                await manager.send_message(message)
+def set_job_queue(queue):
+    global job_queue
+    job_queue = queue
 
-        await run_agent_task(query, url, message_callback=message_callback)
+def _get_admission():
+    global _admission
+    if _admission is None:
+        _admission = asyncio.Semaphore(max(MAX_CONCURRENT_AGENT_TASKS, 1))
+    return _admission
 
-        with open("src/outputdata/agent_execution.json", "r") as file:
-            data = file.read()
+def _message_callback(task_id):
+    """Progress messages of a task go to its WebSocket subscribers (and the clients listening to every task)"""
+    async def message_callback(message: str):
+        if manager:
+            await manager.send_message(message, task_id=task_id)
+    return message_callback
+
+async def _run_task(task_id, query, url):
+    """Run one agent task, returns the agent's final result and the entries of its execution log"""
+    # Every task gets its own execution log, so concurrent runs keep their results apart
+    execution_log = TaskExecutionLog(task_id)
+    async with _get_admission():
+        with use_execution_log(execution_log):
+            result = await run_agent_task(
+                query, url, message_callback=_message_callback(task_id), browser_pool=browser_pool, task_id=task_id
+            )
+    return result.get("final_result"), execution_log.entries
+
+async def run_agent_work(query, url, user):
+    task_id = str(uuid.uuid4())
+    try:
+        _, entries = await _run_task(task_id, query, url)
 
-            if data:
-                print("data found in the agent_execution.json file")
-                print(data)
-                return data
-            else:
-                print("No data found in the agent_execution.json file")
-                return {"message": "no data found"}
+        if entries:
+            print(f"{len(entries)} entries found for task {task_id}")
+            return json.dumps(entries, indent=2, default=str)
+        else:
+            print(f"No data found for task {task_id}")
+            return {"message": "no data found"}
 
     except Exception as e:
         print(f"❌ Agent error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def run_agent_job(job: Job):
+    """Runner of the job queue"""
+    final_result, entries = await _run_task(job.task_id, job.query, job.url)
+    return {"final_result": final_result, "entries": entries}
+
+async def submit_agent_job(query, url, user):
+    try:
+        job = await job_queue.submit(query, url, user.get("sub") if user else None)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return _job_status(job)
+
+async def get_agent_job(task_id):
+    return _job_status(await _get_job(task_id))
+
+async def get_agent_job_result(task_id):
+    job = await _get_job(task_id)
+    if not job.finished:
+        raise HTTPException(status_code=409, detail=f"Job {task_id} is {job.status}")
+    return {**_job_status(job), "result": job.result}
+
+async def cancel_agent_job(task_id):
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue is not running")
+    job = await job_queue.cancel(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {task_id} not found")
+    return _job_status(job)
+
+async def _get_job(task_id):
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue is not running")
+    job = await job_queue.get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {task_id} not found")
+    return job
+
+def _job_status(job):
+    return {
+        "task_id": job.task_id,
+        "status": job.status,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -8,7 +9,42 @@ from pathlib import Path
 
 # Import API routers
 from .Ai_Testing.routes import router as ai_testing_router
+from .Ai_Testing.services import MAX_CONCURRENT_AGENT_TASKS, run_agent_job, set_browser_pool, set_job_queue
+from src.browser.browser_pool import BrowserPool, BrowserPoolConfig
+from src.jobs.job_queue import JobQueue
+from src.jobs.job_store import get_job_store
 from src.websocket.websocket_manager import WebSocketManager
+from src.webui.components.browser_use_agent_tab import build_agent_browser_config, build_agent_context_config
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm browsers for /agent-api/run-agent, BROWSER_POOL_SIZE=0 launches a browser per task instead
+    pool_config = BrowserPoolConfig()
+    pool = None
+    if pool_config.size > 0:
+        pool = BrowserPool(build_agent_browser_config(), build_agent_context_config(), pool_config)
+        await pool.start()
+        set_browser_pool(pool)
+
+    # Jobs submitted to /agent-api/jobs, one worker per agent run the service can afford at once
+    job_queue = JobQueue(
+        run_agent_job,
+        get_job_store(),
+        workers=MAX_CONCURRENT_AGENT_TASKS,
+        max_queued=int(os.getenv("JOB_QUEUE_MAX_QUEUED") or 100),
+    )
+    await job_queue.start()
+    set_job_queue(job_queue)
+    try:
+        yield
+    finally:
+        set_job_queue(None)
+        await job_queue.close()
+        if pool is not None:
+            set_browser_pool(None)
+            await pool.close()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -16,7 +52,8 @@ app = FastAPI(
     description="API for browser automation and AI agent tasks",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -52,6 +89,16 @@ async def websocket_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
+# Progress of a single task, e.g. a job submitted to /agent-api/jobs
+@app.websocket("/ws/{task_id}")
+async def task_websocket_endpoint(websocket: WebSocket, task_id: str):
+    await manager.connect(websocket, task_id=task_id)
+    try:
+        while True:
+            await websocket.receive_text()  # keep alive
+    except WebSocketDisconnect:
+        manager.disconnect(websocket)
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
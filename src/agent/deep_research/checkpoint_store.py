@@ -0,0 +1,242 @@
+import copy
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILENAME = "journal.jsonl"
+PLAN_FILENAME = "research_plan.md"
+SEARCH_INFO_FILENAME = "search_info.json"
+REPORT_FILENAME = "report.md"
+
+
+def render_plan_md(plan: List[Dict[str, Any]]) -> str:
+    """Markdown checklist of a research plan, [x] completed, [ ] pending and [-] failed"""
+    lines = ["# Research Plan", ""]
+    for cat_idx, category in enumerate(plan):
+        lines += [f"## {cat_idx + 1}. {category['category_name']}", ""]
+        for task in category["tasks"]:
+            marker = {"completed": "- [x]", "pending": "- [ ]"}.get(task["status"], "- [-]")
+            lines.append(f"  {marker} {task['task_description']}")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def _write_file_atomic(path: str, content: str):
+    """Readers see the old file or the new one, never a half written one"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+class ResearchCheckpointStore:
+    """
+    Append-only journal of a research task's progress in `<output_dir>/journal.jsonl`.
+
+    Each line is one commit: the new plan, a finished task with its status and search results, or the final report.
+    A commit is a single appended and fsynced line, so a crash loses at most the commit being written, which replay
+    skips. Progress costs the size of the change rather than of everything gathered so far, and resuming reads the
+    journal once. research_plan.md and report.md are rendered from the store as they change, search_info.json when
+    `export_search_results` is called.
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = str(output_dir)
+        self.journal_path = os.path.join(self.output_dir, JOURNAL_FILENAME)
+        self.plan: List[Dict[str, Any]] = []
+        self.report: Optional[str] = None
+        self.commits = 0
+        # results of tasks that ran before the journal existed, then the results of each task
+        self._legacy_results: List[Dict[str, Any]] = []
+        self._task_results: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        if os.path.exists(self.journal_path):
+            self._replay()
+        else:
+            self._import_legacy_files()
+
+    # --- Commits ---
+
+    def commit_plan(self, plan: List[Dict[str, Any]]):
+        """A new plan, it replaces the previous one and its results"""
+        self._commit({"op": "plan", "plan": plan})
+
+    def commit_task(self, key: Tuple[int, int], status: str, result_summary: Optional[str],
+                    search_results: List[Dict[str, Any]]):
+        """A task finished: its status and results are committed together, replacing those of an earlier run"""
+        self._commit({
+            "op": "task",
+            "key": list(key),
+            "status": status,
+            "result_summary": result_summary,
+            "search_results": search_results,
+        })
+
+    def commit_report(self, report: str):
+        self._commit({"op": "report", "report": report})
+
+    # --- Reads ---
+
+    @property
+    def search_results(self) -> List[Dict[str, Any]]:
+        """Every search result, in plan order of the tasks that found them"""
+        return self._legacy_results + [
+            result for key in sorted(self._task_results) for result in self._task_results[key]
+        ]
+
+    def search_results_by_category(self) -> Dict[Optional[int], List[Dict[str, Any]]]:
+        """Search results grouped by the index of the plan category that found them, None for imported results"""
+        grouped: Dict[Optional[int], List[Dict[str, Any]]] = {}
+        if self._legacy_results:
+            grouped[None] = list(self._legacy_results)
+        for (cat_idx, _), results in sorted(self._task_results.items()):
+            if results:
+                grouped.setdefault(cat_idx, []).extend(results)
+        return grouped
+
+    def next_pending_task(self) -> Tuple[int, int]:
+        """(category, task) index of the first pending task, (len(plan), 0) if there is none"""
+        for cat_idx, category in enumerate(self.plan):
+            for task_idx, task in enumerate(category["tasks"]):
+                if task["status"] == "pending":
+                    return cat_idx, task_idx
+        return len(self.plan), 0
+
+    def resume_state(self) -> Dict[str, Any]:
+        """State updates to resume the research from the last commit"""
+        if not self.plan:
+            return {}
+        next_cat_idx, next_task_idx = self.next_pending_task()
+        return {
+            "research_plan": copy.deepcopy(self.plan),
+            "search_results": self.search_results,
+            "current_category_index": next_cat_idx,
+            "current_task_index_in_category": next_task_idx,
+        }
+
+    def export_search_results(self, cache_stats: Optional[Dict[str, Any]] = None):
+        """Writes search_info.json from the store, with the hit rates of the run's research cache"""
+        path = os.path.join(self.output_dir, SEARCH_INFO_FILENAME)
+        content = {"search_results": self.search_results, "cache_stats": cache_stats or {}}
+        try:
+            _write_file_atomic(path, json.dumps(content, indent=2, ensure_ascii=False))
+            logger.info(f"Search results saved to {path}")
+        except Exception as e:
+            logger.error(f"Failed to save search results to {path}: {e}")
+
+    # --- Internals ---
+
+    def _commit(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        try:
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.commits += 1
+        except Exception as e:
+            # the run goes on with the change, only resuming it would lose it
+            logger.error(f"Failed to commit '{record['op']}' to {self.journal_path}: {e}", exc_info=True)
+        # the in-memory state applies the record as it was serialized, as replay will
+        self._apply(json.loads(line))
+        self._render(record["op"])
+
+    def _apply(self, record: Dict[str, Any]):
+        op = record.get("op")
+        if op == "plan":
+            self.plan = record["plan"]
+            self._legacy_results = list(record.get("legacy_results", []))
+            self._task_results = {}
+        elif op == "task":
+            cat_idx, task_idx = record["key"]
+            try:
+                task = self.plan[cat_idx]["tasks"][task_idx]
+            except (IndexError, KeyError, TypeError):
+                logger.warning(f"Journal commit for unknown task {record['key']}, skipping it")
+                return
+            task["status"] = record["status"]
+            task["result_summary"] = record.get("result_summary")
+            # a task run again (e.g. after a resume) replaces the results of its earlier run
+            self._task_results[(cat_idx, task_idx)] = list(record.get("search_results", []))
+        elif op == "report":
+            self.report = record["report"]
+        else:
+            logger.warning(f"Unknown journal commit '{op}', skipping it")
+
+    def _replay(self):
+        valid_size = 0
+        with open(self.journal_path, "rb") as f:
+            for raw_line in f:
+                if not raw_line.endswith(b"\n"):
+                    break  # the commit being written when the process stopped
+                try:
+                    record = json.loads(raw_line)
+                except ValueError:
+                    break
+                self._apply(record)
+                self.commits += 1
+                valid_size += len(raw_line)
+
+        if valid_size < os.path.getsize(self.journal_path):
+            logger.warning(f"Dropping the incomplete last commit of {self.journal_path}")
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(valid_size)
+        logger.info(f"Replayed {self.commits} commits from {self.journal_path}")
+
+    def _import_legacy_files(self):
+        """Journals the plan and results of a task saved before the journal existed, so it can be resumed"""
+        plan_path = os.path.join(self.output_dir, PLAN_FILENAME)
+        if not os.path.exists(plan_path):
+            return
+
+        plan: List[Dict[str, Any]] = []
+        try:
+            with open(plan_path, "r", encoding="utf-8") as f:
+                for line in (line.strip() for line in f):
+                    if line.startswith("## "):
+                        plan.append({"category_name": line[line.find(" ", 3):].strip(), "tasks": []})
+                    elif line[:5] in ("- [ ]", "- [x]", "- [-]") and plan:
+                        status = {"- [x]": "completed", "- [ ]": "pending"}.get(line[:5], "failed")
+                        plan[-1]["tasks"].append({
+                            "task_description": line[5:].strip(),
+                            "status": status,
+                            "queries": None,
+                            "result_summary": None,
+                            "depends_on": None,
+                        })
+        except Exception as e:
+            logger.error(f"Failed to load or parse research plan {plan_path}: {e}", exc_info=True)
+            return
+
+        results = []
+        search_path = os.path.join(self.output_dir, SEARCH_INFO_FILENAME)
+        if os.path.exists(search_path):
+            try:
+                with open(search_path, "r", encoding="utf-8") as f:
+                    results = json.load(f)
+                if isinstance(results, dict):  # exported with cache stats
+                    results = results.get("search_results", [])
+            except Exception as e:
+                logger.error(f"Failed to load search results {search_path}: {e}")
+
+        if plan:
+            logger.info(f"Importing the research plan and {len(results)} search results of {self.output_dir}")
+            self._commit({"op": "plan", "plan": plan, "legacy_results": results})
+
+    def _render(self, op: str):
+        if op in ("plan", "task"):
+            path = os.path.join(self.output_dir, PLAN_FILENAME)
+            content = render_plan_md(self.plan)
+        elif op == "report" and self.report is not None:
+            path = os.path.join(self.output_dir, REPORT_FILENAME)
+            content = self.report
+        else:
+            return
+        try:
+            _write_file_atomic(path, content)
+        except Exception as e:
+            logger.error(f"Failed to render {path}: {e}")
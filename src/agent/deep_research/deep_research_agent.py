@@ -5,7 +5,7 @@ import os
 import threading
 import uuid
 from pathlib import Path
-from typing import Any, Dict, List, Optional, TypedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypedDict
 
 from browser_use.browser.browser import BrowserConfig
 from langchain_community.tools.file_management import (
@@ -22,7 +22,6 @@ from langchain_core.messages import (
     SystemMessage,
     ToolMessage,
 )
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import StructuredTool, Tool
 
 # Langgraph imports
@@ -32,10 +31,15 @@ from pydantic import BaseModel, Field
 from browser_use.browser.context import BrowserContextConfig
 
 from src.agent.browser_use.browser_use_agent import BrowserUseAgent
+from src.agent.deep_research.checkpoint_store import ResearchCheckpointStore
+from src.agent.deep_research.research_cache import ResearchCache
+from src.agent.deep_research.task_scheduler import ResearchTaskScheduler, TaskKey
+from src.browser.browser_pool import BrowserPool, BrowserPoolConfig
 from src.browser.custom_browser import CustomBrowser
 from src.controller.custom_controller import CustomController
 from src.utils.mcp_client import setup_mcp_client_and_tools
 from src.webpage.webpage_checker import WebpageChecker
+from src.websocket.websocket_manager import flush_ws_messages, send_ws_message
 from src.agent.qa_possibilty_checker.agent import QAPossibilityChecker
 from src.agent.prompt_enahncer.agent import PromptEnhancerAgent
 
@@ -43,14 +47,68 @@ from src.agent.prompt_enahncer.agent import PromptEnhancerAgent
 logger = logging.getLogger(__name__)
 
 # Constants
-REPORT_FILENAME = "report.md"
-PLAN_FILENAME = "research_plan.md"
-SEARCH_INFO_FILENAME = "search_info.json"
+# How much of each finding of a task's dependencies goes into its prompt
+DEPENDENCY_FINDING_MAX_CHARS = 2000
+# Most characters of findings in one synthesis prompt, larger sets are condensed in several calls first
+SYNTHESIS_MAX_PROMPT_CHARS = int(os.getenv("DEEP_RESEARCH_SYNTHESIS_MAX_PROMPT_CHARS") or 24000)
+# Rounds of condensing the notes of one part of the research, after that they are cut to fit one last prompt
+SYNTHESIS_MAX_SUMMARY_ROUNDS = 3
 
 _AGENT_STOP_FLAGS = {}
 _BROWSER_AGENT_INSTANCES = {}
 
 
+def _can_pool_browsers(browser_config: Dict[str, Any]) -> bool:
+    """Pooled browsers are launched by Playwright, an own browser or a remote (CDP/WSS) one can't be pooled"""
+    return not (
+            browser_config.get("use_own_browser", False)
+            or browser_config.get("cdp_url")
+            or browser_config.get("wss_url")
+    )
+
+
+def _build_research_browser_configs(browser_config: Dict[str, Any]) -> Tuple[BrowserConfig, BrowserContextConfig]:
+    """Browser and context config of the research browser agents"""
+    headless = browser_config.get("headless", False)
+    window_w = browser_config.get("window_width", 1280)
+    window_h = browser_config.get("window_height", 1100)
+    browser_user_data_dir = browser_config.get("user_data_dir", None)
+    use_own_browser = browser_config.get("use_own_browser", False)
+    browser_binary_path = browser_config.get("browser_binary_path", None)
+    wss_url = browser_config.get("wss_url", None)
+    cdp_url = browser_config.get("cdp_url", None)
+
+    extra_args = []
+    if use_own_browser:
+        browser_binary_path = os.getenv("BROWSER_PATH", None) or browser_binary_path
+        if browser_binary_path == "":
+            browser_binary_path = None
+        browser_user_data = browser_user_data_dir or os.getenv("BROWSER_USER_DATA", None)
+        if browser_user_data:
+            extra_args += [f"--user-data-dir={browser_user_data}"]
+    else:
+        browser_binary_path = None
+
+    bu_browser_config = BrowserConfig(
+        headless=headless,
+        browser_binary_path=browser_binary_path,
+        extra_browser_args=extra_args,
+        wss_url=wss_url,
+        cdp_url=cdp_url,
+        new_context_config=BrowserContextConfig(
+            window_width=window_w,
+            window_height=window_h,
+        )
+    )
+    context_config = BrowserContextConfig(
+        save_downloads_path="./tmp/downloads",
+        window_height=window_h,
+        window_width=window_w,
+        force_new_context=True,
+    )
+    return bu_browser_config, context_config
+
+
 async def run_single_browser_task(
         task_query: str,
         task_id: str,
@@ -58,10 +116,14 @@ async def run_single_browser_task(
         browser_config: Dict[str, Any],
         stop_event: threading.Event,
         use_vision: bool = False,
+        browser_pool: Optional[BrowserPool] = None,
+        research_cache: Optional[ResearchCache] = None,
 ) -> Dict[str, Any]:
     """
     Runs a single BrowserUseAgent task.
-    Manages browser creation and closing for this specific task.
+    With a browser pool the task leases a warm browser and a fresh context (its own cookies and storage) from it,
+    otherwise it creates and closes a browser for this specific task.
+    With a research cache, pages that earlier tasks already extracted for the same goal are not extracted again.
     """
     if not BrowserUseAgent:
         return {
@@ -69,57 +131,24 @@ async def run_single_browser_task(
             "error": "BrowserUseAgent components not available.",
         }
 
-    # --- Browser Setup ---
-    # These should ideally come from the main agent's config
-    headless = browser_config.get("headless", False)
-    window_w = browser_config.get("window_width", 1280)
-    window_h = browser_config.get("window_height", 1100)
-    browser_user_data_dir = browser_config.get("user_data_dir", None)
-    use_own_browser = browser_config.get("use_own_browser", False)
-    browser_binary_path = browser_config.get("browser_binary_path", None)
-    wss_url = browser_config.get("wss_url", None)
-    cdp_url = browser_config.get("cdp_url", None)
-    disable_security = browser_config.get("disable_security", False)
-
     bu_browser = None
     bu_browser_context = None
+    lease = None
+    healthy = True
+    task_key = f"{task_id}_{uuid.uuid4()}"
     try:
         logger.info(f"Starting browser task for query: {task_query}")
-        extra_args = []
-        if use_own_browser:
-            browser_binary_path = os.getenv("BROWSER_PATH", None) or browser_binary_path
-            if browser_binary_path == "":
-                browser_binary_path = None
-            browser_user_data = browser_user_data_dir or os.getenv("BROWSER_USER_DATA", None)
-            if browser_user_data:
-                extra_args += [f"--user-data-dir={browser_user_data}"]
+        if browser_pool is not None:
+            lease = await browser_pool.acquire()
+            bu_browser = lease.browser
+            bu_browser_context = lease.browser_context
         else:
-            browser_binary_path = None
-
-        bu_browser = CustomBrowser(
-            config=BrowserConfig(
-                headless=headless,
-                browser_binary_path=browser_binary_path,
-                extra_browser_args=extra_args,
-                wss_url=wss_url,
-                cdp_url=cdp_url,
-                new_context_config=BrowserContextConfig(
-                    window_width=window_w,
-                    window_height=window_h,
-                )
-            )
-        )
-
-        context_config = BrowserContextConfig(
-            save_downloads_path="./tmp/downloads",
-            window_height=window_h,
-            window_width=window_w,
-            force_new_context=True,
-        )
-        bu_browser_context = await bu_browser.new_context(config=context_config)
+            bu_browser_config, context_config = _build_research_browser_configs(browser_config)
+            bu_browser = CustomBrowser(config=bu_browser_config)
+            bu_browser_context = await bu_browser.new_context(config=context_config)
 
         # Simple controller example, replace with your actual implementation if needed
-        bu_controller = CustomController()
+        bu_controller = CustomController(extraction_cache=research_cache)
 
         # Construct the task prompt for BrowserUseAgent
         # Instruct it to find specific info and return title/URL
@@ -145,7 +174,6 @@ async def run_single_browser_task(
         )
 
         # Store instance for potential stop() call
-        task_key = f"{task_id}_{uuid.uuid4()}"
         _BROWSER_AGENT_INSTANCES[task_key] = bu_agent_instance
 
         # --- Run with Stop Check ---
@@ -176,8 +204,14 @@ async def run_single_browser_task(
         logger.error(
             f"Error during browser task for query '{task_query}': {e}", exc_info=True
         )
+        healthy = False
         return {"query": task_query, "error": str(e), "status": "failed"}
     finally:
+        if lease is not None:
+            # the pool closes the context and keeps the browser for the next task
+            await browser_pool.release(lease, healthy=healthy)
+            bu_browser_context = None
+            bu_browser = None
         if bu_browser_context:
             try:
                 await bu_browser_context.close()
@@ -210,10 +244,15 @@ async def _run_browser_search_tool(
         browser_config: Dict[str, Any],
         stop_event: threading.Event,
         max_parallel_browsers: int = 1,
+        browser_pool: Optional[BrowserPool] = None,
+        browser_semaphore: Optional[asyncio.Semaphore] = None,
+        research_cache: Optional[ResearchCache] = None,
 ) -> List[Dict[str, Any]]:
     """
     Internal function to execute parallel browser searches based on LLM-provided queries.
-    Handles concurrency and stop signals.
+    Handles concurrency and stop signals. `browser_semaphore` is shared by the research tasks running at the same
+    time, so together they don't run more than `max_parallel_browsers` browsers. Queries `research_cache` already
+    has a result for, or is running, don't start a browser.
     """
 
     # Limit queries just in case LLM ignores the description
@@ -223,9 +262,14 @@ async def _run_browser_search_tool(
     )
 
     results = []
-    semaphore = asyncio.Semaphore(max_parallel_browsers)
+    semaphore = browser_semaphore or asyncio.Semaphore(max_parallel_browsers)
 
     async def task_wrapper(query):
+        if research_cache is not None:
+            return await research_cache.search(query, lambda: run_search(query))
+        return await run_search(query)
+
+    async def run_search(query):
         async with semaphore:
             if stop_event.is_set():
                 logger.info(
@@ -240,6 +284,8 @@ async def _run_browser_search_tool(
                 browser_config,
                 stop_event,
                 # use_vision could be added here if needed
+                browser_pool=browser_pool,
+                research_cache=research_cache,
             )
 
     tasks = [task_wrapper(query) for query in queries]
@@ -269,6 +315,10 @@ async def _run_browser_search_tool(
     logger.info(
         f"[Browser Tool {task_id}] Finished search. Results count: {len(processed_results)}"
     )
+    if browser_pool is not None:
+        logger.info(f"[Browser Tool {task_id}] Browser pool: {browser_pool.stats}")
+    if research_cache is not None:
+        logger.info(f"[Browser Tool {task_id}] Research cache: {research_cache.stats}")
     return processed_results
 
 
@@ -278,6 +328,9 @@ def create_browser_search_tool(
         task_id: str,
         stop_event: threading.Event,
         max_parallel_browsers: int = 1,
+        browser_pool: Optional[BrowserPool] = None,
+        browser_semaphore: Optional[asyncio.Semaphore] = None,
+        research_cache: Optional[ResearchCache] = None,
 ) -> StructuredTool:
     """Factory function to create the browser search tool with necessary dependencies."""
     # Use partial to bind the dependencies that aren't part of the LLM call arguments
@@ -290,6 +343,9 @@ def create_browser_search_tool(
         browser_config=browser_config,
         stop_event=stop_event,
         max_parallel_browsers=max_parallel_browsers,
+        browser_pool=browser_pool,
+        browser_semaphore=browser_semaphore,
+        research_cache=research_cache,
     )
 
     return StructuredTool.from_function(
@@ -330,6 +386,7 @@ class ResearchTaskItem(TypedDict):
     status: str  # "pending", "completed", "failed"
     queries: Optional[List[str]]
     result_summary: Optional[str]
+    depends_on: Optional[List[str]]  # "<category number>.<task number>" of the tasks whose findings this one needs
 
 
 class ResearchCategoryItem(TypedDict):
@@ -374,6 +431,10 @@ class DeepResearchState(TypedDict):
     stop_requested: bool
     error_message: Optional[str]
     messages: List[BaseMessage]
+    max_concurrent_tasks: int
+    checkpoint_store: ResearchCheckpointStore
+    on_report_chunk: Optional[Callable[[str], None]]  # receives the report text as it is generated
+    research_cache: ResearchCache
 
 
 # --- Langgraph Nodes ---
@@ -455,129 +516,6 @@ def _QA_possibility_condition(self, state: DeepResearchState):
         
 
 
-def _load_previous_state(task_id: str, output_dir: str) -> Dict[str, Any]:
-    state_updates = {}
-    plan_file = os.path.join(output_dir, PLAN_FILENAME)
-    search_file = os.path.join(output_dir, SEARCH_INFO_FILENAME)
-
-    loaded_plan: List[ResearchCategoryItem] = []
-    next_cat_idx, next_task_idx = 0, 0
-    found_pending = False
-
-    if os.path.exists(plan_file):
-        try:
-            with open(plan_file, "r", encoding="utf-8") as f:
-                current_category: Optional[ResearchCategoryItem] = None
-                lines = f.readlines()
-                cat_counter = 0
-                task_counter_in_cat = 0
-
-                for line_num, line_content in enumerate(lines):
-                    line = line_content.strip()
-                    if line.startswith("## "):  # Category
-                        if current_category:  # Save previous category
-                            loaded_plan.append(current_category)
-                            if not found_pending:  # If previous category was all done, advance cat counter
-                                cat_counter += 1
-                                task_counter_in_cat = 0
-                        category_name = line[line.find(" "):].strip()  # Get text after "## X. "
-                        current_category = ResearchCategoryItem(category_name=category_name, tasks=[])
-                    elif (line.startswith("- [ ]") or line.startswith("- [x]") or line.startswith(
-                            "- [-]")) and current_category:  # Task
-                        status = "pending"
-                        if line.startswith("- [x]"):
-                            status = "completed"
-                        elif line.startswith("- [-]"):
-                            status = "failed"
-
-                        task_desc = line[5:].strip()
-                        current_category["tasks"].append(
-                            ResearchTaskItem(task_description=task_desc, status=status, queries=None,
-                                             result_summary=None)
-                        )
-                        if status == "pending" and not found_pending:
-                            next_cat_idx = cat_counter
-                            next_task_idx = task_counter_in_cat
-                            found_pending = True
-                        if not found_pending:  # only increment if previous tasks were completed/failed
-                            task_counter_in_cat += 1
-
-                if current_category:  # Append last category
-                    loaded_plan.append(current_category)
-
-            if loaded_plan:
-                state_updates["research_plan"] = loaded_plan
-                if not found_pending and loaded_plan:  # All tasks were completed or failed
-                    next_cat_idx = len(loaded_plan)  # Points beyond the last category
-                    next_task_idx = 0
-                state_updates["current_category_index"] = next_cat_idx
-                state_updates["current_task_index_in_category"] = next_task_idx
-                logger.info(
-                    f"Loaded hierarchical research plan from {plan_file}. "
-                    f"Next task: Category {next_cat_idx}, Task {next_task_idx} in category."
-                )
-            else:
-                logger.warning(f"Plan file {plan_file} was empty or malformed.")
-
-        except Exception as e:
-            logger.error(f"Failed to load or parse research plan {plan_file}: {e}", exc_info=True)
-            state_updates["error_message"] = f"Failed to load research plan: {e}"
-    else:
-        logger.info(f"Plan file {plan_file} not found. Will start fresh.")
-
-    if os.path.exists(search_file):
-        try:
-            with open(search_file, "r", encoding="utf-8") as f:
-                state_updates["search_results"] = json.load(f)
-                logger.info(f"Loaded search results from {search_file}")
-        except Exception as e:
-            logger.error(f"Failed to load search results {search_file}: {e}")
-            state_updates["error_message"] = (
-                    state_updates.get("error_message", "") + f" Failed to load search results: {e}").strip()
-
-    return state_updates
-
-
-def _save_plan_to_md(plan: List[ResearchCategoryItem], output_dir: str):
-    plan_file = os.path.join(output_dir, PLAN_FILENAME)
-    try:
-        with open(plan_file, "w", encoding="utf-8") as f:
-            f.write(f"# Research Plan\n\n")
-            for cat_idx, category in enumerate(plan):
-                f.write(f"## {cat_idx + 1}. {category['category_name']}\n\n")
-                for task_idx, task in enumerate(category['tasks']):
-                    marker = "- [x]" if task["status"] == "completed" else "- [ ]" if task[
-                                                                                          "status"] == "pending" else "- [-]"  # [-] for failed
-                    f.write(f"  {marker} {task['task_description']}\n")
-                f.write("\n")
-        logger.info(f"Hierarchical research plan saved to {plan_file}")
-    except Exception as e:
-        logger.error(f"Failed to save research plan to {plan_file}: {e}")
-
-
-def _save_search_results_to_json(results: List[Dict[str, Any]], output_dir: str):
-    """Appends or overwrites search results to a JSON file."""
-    search_file = os.path.join(output_dir, SEARCH_INFO_FILENAME)
-    try:
-        # Simple overwrite for now, could be append
-        with open(search_file, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
-        logger.info(f"Search results saved to {search_file}")
-    except Exception as e:
-        logger.error(f"Failed to save search results to {search_file}: {e}")
-
-
-def _save_report_to_md(report: str, output_dir: Path):
-    """Saves the final report to a markdown file."""
-    report_file = os.path.join(output_dir, REPORT_FILENAME)
-    try:
-        with open(report_file, "w", encoding="utf-8") as f:
-            f.write(report)
-        logger.info(f"Final report saved to {report_file}")
-    except Exception as e:
-        logger.error(f"Failed to save final report to {report_file}: {e}")
-
-
 async def planning_node(state: DeepResearchState) -> Dict[str, Any]:
     logger.info("--- Entering Planning Node ---")
     if state.get("stop_requested"):
@@ -587,13 +525,11 @@ async def planning_node(state: DeepResearchState) -> Dict[str, Any]:
     llm = state["llm"]
     topic = state["topic"]
     existing_plan = state.get("research_plan")
-    output_dir = state["output_dir"]
 
-    if existing_plan and (
-            state.get("current_category_index", 0) > 0 or state.get("current_task_index_in_category", 0) > 0):
+    if existing_plan:
+        # tasks run out of plan order, any plan restored from the checkpoint store is resumed
         logger.info("Resuming with existing plan.")
-        _save_plan_to_md(existing_plan, output_dir)  # Ensure it's saved initially
-        # current_category_index and current_task_index_in_category should be set by _load_previous_state
+        # current_category_index and current_task_index_in_category are set by the store's resume_state
         return {"research_plan": existing_plan}
 
     logger.info(f"Generating new research plan for topic: {topic}")
@@ -603,6 +539,9 @@ The plan should be structured into several main research categories. Each catego
 Format the output as a JSON list of objects. Each object represents a research category and should have:
 1. "category_name": A string for the name of the research category.
 2. "tasks": A list of strings, where each string is a specific research task for that category.
+   Tasks run in parallel. If a task needs the findings of earlier tasks, write it as an object instead:
+   {{"task": "<the task>", "depends_on": ["<category number>.<task number>", ...]}}, numbered from 1 in plan order.
+   Only declare dependencies a task really needs.
 
 Example JSON Output:
 [
@@ -631,7 +570,10 @@ Example JSON Output:
     "category_name": "Challenges, Limitations, and Future Outlook",
     "tasks": [
       "Identify the major challenges and limitations currently facing '{topic}'.",
-      "Explore potential future trends, ethical considerations, and societal impacts of '{topic}'."
+      {{
+        "task": "Explore potential future trends, ethical considerations, and societal impacts of '{topic}'.",
+        "depends_on": ["3.1", "4.1"]
+      }}
     ]
   }}
 ]
@@ -672,6 +614,7 @@ Ensure the output is a valid JSON array.
                             status="pending",
                             queries=None,
                             result_summary=None,
+                            depends_on=None,
                         )
                     )
                 else:  # Sometimes LLM puts tasks as {"task": "description"}
@@ -682,6 +625,7 @@ Ensure the output is a valid JSON array.
                                 status="pending",
                                 queries=None,
                                 result_summary=None,
+                                depends_on=task_desc.get("depends_on"),
                             )
                         )
                     elif isinstance(task_desc, dict) and "task" in task_desc:  # common LLM mistake
@@ -691,6 +635,7 @@ Ensure the output is a valid JSON array.
                                 status="pending",
                                 queries=None,
                                 result_summary=None,
+                                depends_on=task_desc.get("depends_on"),
                             )
                         )
                     else:
@@ -709,7 +654,7 @@ Ensure the output is a valid JSON array.
             return {"error_message": "Failed to generate research plan structure."}
 
         logger.info(f"Generated research plan with {len(new_plan)} categories.")
-        _save_plan_to_md(new_plan, output_dir)  # Save the hierarchical plan
+        state["checkpoint_store"].commit_plan(new_plan)  # Save the hierarchical plan
 
         return {
             "research_plan": new_plan,
@@ -726,57 +671,37 @@ Ensure the output is a valid JSON array.
         return {"error_message": f"LLM Error during planning: {e}"}
 
 
-async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
-    logger.info("--- Entering Research Execution Node ---")
-    if state.get("stop_requested"):
-        logger.info("Stop requested, skipping research execution.")
-        return {
-            "stop_requested": True,
-            "current_category_index": state["current_category_index"],
-            "current_task_index_in_category": state["current_task_index_in_category"],
-        }
-
+def _dependency_findings(dependency_outcomes: Dict[TaskKey, Any], plan: List[ResearchCategoryItem]) -> str:
+    """What the tasks a task depends on found, for its prompt"""
+    findings = ""
+    for (cat_idx, task_idx), outcome in dependency_outcomes.items():
+        task = plan[cat_idx]["tasks"][task_idx]
+        findings += f"\n- Task {cat_idx + 1}.{task_idx + 1}: {task['task_description']}\n"
+        results = outcome.get("search_results", []) if isinstance(outcome, dict) else []
+        for result in results:
+            if result.get("status") == "completed" and (result.get("result") or result.get("output")):
+                finding = str(result.get("result") or result.get("output"))
+                findings += f"  - {finding[:DEPENDENCY_FINDING_MAX_CHARS]}\n"
+    return findings
+
+
+async def _execute_research_task(
+        state: DeepResearchState,
+        key: TaskKey,
+        dependency_outcomes: Dict[TaskKey, Any],
+) -> Dict[str, Any]:
+    """
+    Runs one task of the research plan: the LLM picks the searches and tools, which are executed.
+    Returns the task's new status and summary, the results it gathered and its messages.
+    """
+    cat_idx, task_idx = key
     plan = state["research_plan"]
-    cat_idx = state["current_category_index"]
-    task_idx = state["current_task_index_in_category"]
     llm = state["llm"]
     tools = state["tools"]
-    output_dir = str(state["output_dir"])
     task_id = state["task_id"]  # For _AGENT_STOP_FLAGS
 
-    # This check should ideally be handled by `should_continue`
-    if not plan or cat_idx >= len(plan):
-        logger.info("Research plan complete or categories exhausted.")
-        return {}  # should route to synthesis
-
     current_category = plan[cat_idx]
-    if task_idx >= len(current_category["tasks"]):
-        logger.info(f"All tasks in category '{current_category['category_name']}' completed. Moving to next category.")
-        # This logic is now effectively handled by should_continue and the index updates below
-        # The next iteration will be caught by should_continue or this node with updated indices
-        return {
-            "current_category_index": cat_idx + 1,
-            "current_task_index_in_category": 0,
-            "messages": state["messages"]  # Pass messages along
-        }
-
     current_task = current_category["tasks"][task_idx]
-
-    if current_task["status"] == "completed":
-        logger.info(
-            f"Task '{current_task['task_description']}' in category '{current_category['category_name']}' already completed. Skipping.")
-        # Logic to find next task
-        next_task_idx = task_idx + 1
-        next_cat_idx = cat_idx
-        if next_task_idx >= len(current_category["tasks"]):
-            next_cat_idx += 1
-            next_task_idx = 0
-        return {
-            "current_category_index": next_cat_idx,
-            "current_task_index_in_category": next_task_idx,
-            "messages": state["messages"]  # Pass messages along
-        }
-
     logger.info(
         f"Executing research task: '{current_task['task_description']}' (Category: '{current_category['category_name']}')"
     )
@@ -791,145 +716,264 @@ async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
         "Provide focused search queries relevant ONLY to this task. "
         "If you believe you have sufficient information from previous steps for this specific task, you can indicate that you are ready to summarize or that no further search is needed."
     )
+    if dependency_outcomes:
+        task_prompt_content += (
+            "\n\nThis task builds on the findings of these earlier tasks:"
+            f"{_dependency_findings(dependency_outcomes, plan)}"
+        )
     current_task_message_history = [
         HumanMessage(content=task_prompt_content)
     ]
-    if not state["messages"]:  # First actual execution message
-        invocation_messages = [
-                                  SystemMessage(
-                                      content="You are a research assistant executing one task of a research plan. Focus on the current task only."),
-                              ] + current_task_message_history
-    else:
-        invocation_messages = state["messages"] + current_task_message_history
+    invocation_messages = [
+                              SystemMessage(
+                                  content="You are a research assistant executing one task of a research plan. Focus on the current task only."),
+                          ] + current_task_message_history
 
-    try:
-        logger.info(f"Invoking LLM with tools for task: {current_task['task_description']}")
-        ai_response: BaseMessage = await llm_with_tools.ainvoke(invocation_messages)
-        logger.info("LLM invocation complete.")
+    logger.info(f"Invoking LLM with tools for task: {current_task['task_description']}")
+    ai_response: BaseMessage = await llm_with_tools.ainvoke(invocation_messages)
+    logger.info("LLM invocation complete.")
 
-        tool_results = []
-        executed_tool_names = []
-        current_search_results = state.get("search_results", [])  # Get existing search results
-
-        if not isinstance(ai_response, AIMessage) or not ai_response.tool_calls:
-            logger.warning(
-                f"LLM did not call any tool for task '{current_task['task_description']}'. Response: {ai_response.content[:100]}..."
-            )
-            current_task["status"] = "pending"  # Or "completed_no_tool" if LLM explains it's done
-            current_task["result_summary"] = f"LLM did not use a tool. Response: {ai_response.content}"
-            current_task["current_category_index"] = cat_idx
-            current_task["current_task_index_in_category"] = task_idx
-            return current_task
-            # We still save the plan and advance.
-        else:
-            # Process tool calls
-            for tool_call in ai_response.tool_calls:
-                tool_name = tool_call.get("name")
-                tool_args = tool_call.get("args", {})
-                tool_call_id = tool_call.get("id")
-
-                logger.info(f"LLM requested tool call: {tool_name} with args: {tool_args}")
-                executed_tool_names.append(tool_name)
-                selected_tool = next((t for t in tools if t.name == tool_name), None)
-
-                if not selected_tool:
-                    logger.error(f"LLM called tool '{tool_name}' which is not available.")
-                    tool_results.append(
-                        ToolMessage(content=f"Error: Tool '{tool_name}' not found.", tool_call_id=tool_call_id))
-                    continue
-
-                try:
-                    stop_event = _AGENT_STOP_FLAGS.get(task_id)
-                    if stop_event and stop_event.is_set():
-                        logger.info(f"Stop requested before executing tool: {tool_name}")
-                        current_task["status"] = "pending"  # Or a new "stopped" status
-                        _save_plan_to_md(plan, output_dir)
-                        return {"stop_requested": True, "research_plan": plan, "current_category_index": cat_idx,
-                                "current_task_index_in_category": task_idx}
-
-                    logger.info(f"Executing tool: {tool_name}")
-                    tool_output = await selected_tool.ainvoke(tool_args)
-                    logger.info(f"Tool '{tool_name}' executed successfully.")
-
-                    if tool_name == "parallel_browser_search":
-                        current_search_results.extend(tool_output)  # tool_output is List[Dict]
-                    else:  # For other tools, we might need specific handling or just log
-                        logger.info(f"Result from tool '{tool_name}': {str(tool_output)[:200]}...")
-                        # Storing non-browser results might need a different structure or key in search_results
-                        current_search_results.append(
-                            {"tool_name": tool_name, "args": tool_args, "output": str(tool_output),
-                             "status": "completed"})
-
-                    tool_results.append(ToolMessage(content=json.dumps(tool_output), tool_call_id=tool_call_id))
-
-                except Exception as e:
-                    logger.error(f"Error executing tool '{tool_name}': {e}", exc_info=True)
-                    tool_results.append(
-                        ToolMessage(content=f"Error executing tool {tool_name}: {e}", tool_call_id=tool_call_id))
-                    current_search_results.append(
-                        {"tool_name": tool_name, "args": tool_args, "status": "failed", "error": str(e)})
-
-            # After processing all tool calls for this task
-            step_failed_tool_execution = any("Error:" in str(tr.content) for tr in tool_results)
-            # Consider a task successful if a browser search was attempted and didn't immediately error out during call
-            # The browser search itself returns status for each query.
-            browser_tool_attempted_successfully = "parallel_browser_search" in executed_tool_names and not step_failed_tool_execution
-
-            if step_failed_tool_execution:
-                current_task["status"] = "failed"
-                current_task[
-                    "result_summary"] = f"Tool execution failed. Errors: {[tr.content for tr in tool_results if 'Error' in str(tr.content)]}"
-            elif executed_tool_names:  # If any tool was called
-                current_task["status"] = "completed"
-                current_task["result_summary"] = f"Executed tool(s): {', '.join(executed_tool_names)}."
-                # TODO: Could ask LLM to summarize the tool_results for this task if needed, rather than just listing tools.
-            else:  # No tool calls but AI response had .tool_calls structure (empty)
-                current_task["status"] = "failed"  # Or a more specific status
-                current_task["result_summary"] = "LLM prepared for tool call but provided no tools."
-
-        # Save progress
-        _save_plan_to_md(plan, output_dir)
-        _save_search_results_to_json(current_search_results, output_dir)
-
-        # Determine next indices
-        next_task_idx = task_idx + 1
-        next_cat_idx = cat_idx
-        if next_task_idx >= len(current_category["tasks"]):
-            next_cat_idx += 1
-            next_task_idx = 0
-
-        updated_messages = state["messages"] + current_task_message_history + [ai_response] + tool_results
+    tool_results = []
+    executed_tool_names = []
+    task_search_results = []
 
+    if not isinstance(ai_response, AIMessage) or not ai_response.tool_calls:
+        logger.warning(
+            f"LLM did not call any tool for task '{current_task['task_description']}'. Response: {ai_response.content[:100]}..."
+        )
         return {
-            "research_plan": plan,
-            "search_results": current_search_results,
-            "current_category_index": next_cat_idx,
-            "current_task_index_in_category": next_task_idx,
-            "messages": updated_messages,
+            "status": "pending",  # Or "completed_no_tool" if LLM explains it's done
+            "result_summary": f"LLM did not use a tool. Response: {ai_response.content}",
+            "search_results": [],
+            "messages": current_task_message_history + [ai_response],
         }
 
-    except Exception as e:
-        logger.error(f"Unhandled error during research execution for task '{current_task['task_description']}': {e}",
-                     exc_info=True)
-        current_task["status"] = "failed"
-        _save_plan_to_md(plan, output_dir)
-        # Determine next indices even on error to attempt to move on
-        next_task_idx = task_idx + 1
-        next_cat_idx = cat_idx
-        if next_task_idx >= len(current_category["tasks"]):
-            next_cat_idx += 1
-            next_task_idx = 0
+    # Process tool calls
+    for tool_call in ai_response.tool_calls:
+        tool_name = tool_call.get("name")
+        tool_args = tool_call.get("args", {})
+        tool_call_id = tool_call.get("id")
+
+        logger.info(f"LLM requested tool call: {tool_name} with args: {tool_args}")
+        executed_tool_names.append(tool_name)
+        selected_tool = next((t for t in tools if t.name == tool_name), None)
+
+        if not selected_tool:
+            logger.error(f"LLM called tool '{tool_name}' which is not available.")
+            tool_results.append(
+                ToolMessage(content=f"Error: Tool '{tool_name}' not found.", tool_call_id=tool_call_id))
+            continue
+
+        try:
+            stop_event = _AGENT_STOP_FLAGS.get(task_id)
+            if stop_event and stop_event.is_set():
+                logger.info(f"Stop requested before executing tool: {tool_name}")
+                return {
+                    "status": "pending",  # Or a new "stopped" status
+                    "result_summary": current_task.get("result_summary"),
+                    "search_results": task_search_results,
+                    "messages": [],
+                }
+
+            logger.info(f"Executing tool: {tool_name}")
+            tool_output = await selected_tool.ainvoke(tool_args)
+            logger.info(f"Tool '{tool_name}' executed successfully.")
+
+            if tool_name == "parallel_browser_search":
+                task_search_results.extend(tool_output)  # tool_output is List[Dict]
+            else:  # For other tools, we might need specific handling or just log
+                logger.info(f"Result from tool '{tool_name}': {str(tool_output)[:200]}...")
+                # Storing non-browser results might need a different structure or key in search_results
+                task_search_results.append(
+                    {"tool_name": tool_name, "args": tool_args, "output": str(tool_output),
+                     "status": "completed"})
+
+            tool_results.append(ToolMessage(content=json.dumps(tool_output), tool_call_id=tool_call_id))
+
+        except Exception as e:
+            logger.error(f"Error executing tool '{tool_name}': {e}", exc_info=True)
+            tool_results.append(
+                ToolMessage(content=f"Error executing tool {tool_name}: {e}", tool_call_id=tool_call_id))
+            task_search_results.append(
+                {"tool_name": tool_name, "args": tool_args, "status": "failed", "error": str(e)})
+
+    # After processing all tool calls for this task
+    step_failed_tool_execution = any("Error:" in str(tr.content) for tr in tool_results)
+
+    if step_failed_tool_execution:
+        status = "failed"
+        result_summary = f"Tool execution failed. Errors: {[tr.content for tr in tool_results if 'Error' in str(tr.content)]}"
+    elif executed_tool_names:  # If any tool was called
+        status = "completed"
+        result_summary = f"Executed tool(s): {', '.join(executed_tool_names)}."
+        # TODO: Could ask LLM to summarize the tool_results for this task if needed, rather than just listing tools.
+    else:  # No tool calls but AI response had .tool_calls structure (empty)
+        status = "failed"  # Or a more specific status
+        result_summary = "LLM prepared for tool call but provided no tools."
+
+    return {
+        "status": status,
+        "result_summary": result_summary,
+        "search_results": task_search_results,
+        "messages": current_task_message_history + [ai_response] + tool_results,
+    }
+
+
+async def research_execution_node(state: DeepResearchState) -> Dict[str, Any]:
+    """
+    Runs every pending task of the plan with ResearchTaskScheduler: independent tasks run concurrently, up to
+    `max_concurrent_tasks` at a time. Results and messages are merged in plan order whatever order the tasks finish
+    in, and the plan and results are saved after each task.
+    """
+    logger.info("--- Entering Research Execution Node ---")
+    if state.get("stop_requested"):
+        logger.info("Stop requested, skipping research execution.")
         return {
-            "research_plan": plan,
-            "current_category_index": next_cat_idx,
-            "current_task_index_in_category": next_task_idx,
-            "error_message": f"Core Execution Error on task '{current_task['task_description']}': {e}",
-            "messages": state["messages"] + current_task_message_history  # Preserve messages up to error
+            "stop_requested": True,
+            "current_category_index": state["current_category_index"],
+            "current_task_index_in_category": state["current_task_index_in_category"],
         }
 
+    plan = state["research_plan"]
+    store = state["checkpoint_store"]
+    stop_event = _AGENT_STOP_FLAGS.get(state["task_id"])
+
+    if not plan:
+        logger.info("Research plan is empty.")
+        return {}  # should route to synthesis
+
+    task_messages: Dict[TaskKey, List[BaseMessage]] = {}
+
+    def on_task_done(key: TaskKey, outcome: Any):
+        task = plan[key[0]]["tasks"][key[1]]
+        search_results = []
+        if isinstance(outcome, Exception):
+            task["status"] = "failed"
+            task["result_summary"] = f"Core Execution Error on task '{task['task_description']}': {outcome}"
+        else:
+            task["status"] = outcome["status"]
+            task["result_summary"] = outcome["result_summary"]
+            search_results = outcome["search_results"]
+            task_messages[key] = outcome["messages"]
+        # Save progress, the store keeps the results in plan order
+        store.commit_task(key, task["status"], task["result_summary"], search_results)
+
+    scheduler = ResearchTaskScheduler(
+        plan,
+        run_task=lambda key, dependency_outcomes: _execute_research_task(state, key, dependency_outcomes),
+        max_concurrency=state.get("max_concurrent_tasks") or 1,
+        on_task_done=on_task_done,
+        should_stop=lambda: bool(stop_event and stop_event.is_set()),
+    )
+    await scheduler.run()
+
+    updates = {
+        "research_plan": plan,
+        "search_results": store.search_results,
+        "messages": state["messages"] + [message for key in sorted(task_messages) for message in task_messages[key]],
+        # every task ran, should_continue routes to synthesis
+        "current_category_index": len(plan),
+        "current_task_index_in_category": 0,
+    }
+    if stop_event and stop_event.is_set():
+        next_pending = next(
+            (key for key, task in sorted(scheduler.tasks.items()) if task["status"] == "pending"), (len(plan), 0)
+        )
+        updates["stop_requested"] = True
+        updates["current_category_index"], updates["current_task_index_in_category"] = next_pending
+    return updates
+
+
+def _format_finding(result_entry: Dict[str, Any]) -> str:
+    """One search result as a markdown block for the synthesis prompts, empty if it found nothing"""
+    query = result_entry.get("query", "Unknown Query")  # From parallel_browser_search
+    tool_name = result_entry.get("tool_name")  # From other tools
+    status = result_entry.get("status", "unknown")
+    result_data = result_entry.get("result")  # From BrowserUseAgent's final_result
+    tool_output_str = result_entry.get("output")  # From other tools
+
+    if tool_name is None and status == "completed" and result_data:
+        # result_data is the summary from BrowserUseAgent
+        return f'### Finding from Web Search Query: "{query}"\n- **Summary:**\n{result_data}\n---\n'
+    if tool_name is not None and status == "completed" and tool_output_str:
+        return (f'### Finding from Tool: "{tool_name}" (Args: {result_entry.get("args")})\n'
+                f"- **Output:**\n{tool_output_str}\n---\n")
+    if status == "failed":
+        q_or_t = f"Query: \"{query}\"" if query != "Unknown Query" else f"Tool: \"{tool_name}\""
+        return f'### Failed {q_or_t}\n- **Error:** {result_entry.get("error")}\n---\n'
+    return ""
+
+
+def _message_text(content: Any) -> str:
+    """Text of a message or chunk content, which some providers return as a list of parts"""
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content or [])
+
+
+def _split_into_batches(texts: List[str], max_chars: int) -> List[str]:
+    """Joins consecutive texts into batches of at most `max_chars`, a text longer than that is cut"""
+    batches, current = [], ""
+    for text in texts:
+        text = text[:max_chars]
+        if current and len(current) + len(text) > max_chars:
+            batches.append(current)
+            current = ""
+        current += text
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _summarize_findings(
+        llm: Any, topic: str, scope: str, texts: List[str], semaphore: asyncio.Semaphore
+) -> str:
+    """
+    Map step of the synthesis: condenses the findings of one part of the research into notes of at most
+    SYNTHESIS_MAX_PROMPT_CHARS. Findings that don't fit one prompt are summarized in batches, concurrently, and the
+    batch notes are summarized again until they fit. When a round doesn't reduce the number of batches (the model
+    doesn't condense), or after SYNTHESIS_MAX_SUMMARY_ROUNDS, each note is cut to an equal share of one last prompt.
+    """
+    rounds = 0
+    previous_batch_count = None
+    while True:
+        batches = _split_into_batches(texts, SYNTHESIS_MAX_PROMPT_CHARS)
+        rounds += 1
+        if previous_batch_count is not None and (
+                len(batches) >= previous_batch_count or rounds > SYNTHESIS_MAX_SUMMARY_ROUNDS
+        ):
+            logger.warning(f"Notes on '{scope}' are not getting shorter, cutting them to fit one prompt")
+            share = max(SYNTHESIS_MAX_PROMPT_CHARS // len(texts), 1)
+            batches = ["".join(text[:share] for text in texts)]
+
+        async def summarize(batch: str) -> str:
+            async with semaphore:
+                response = await llm.ainvoke([
+                    SystemMessage(content=(
+                        "You are a research assistant condensing collected findings into notes for a report writer. "
+                        "Keep every fact, figure, name, source and disagreement that matters to the research topic, "
+                        "drop repetition and irrelevant detail. Answer in Markdown bullet points only."
+                    )),
+                    HumanMessage(content=(
+                        f"**Research Topic:** {topic}\n**Part of the research:** {scope}\n\n"
+                        f"**Findings:**\n{batch}"
+                    )),
+                ])
+                return _message_text(response.content).strip() + "\n"
+
+        notes = await asyncio.gather(*(summarize(batch) for batch in batches))
+        if len(notes) == 1:
+            return notes[0]
+        previous_batch_count = len(batches)
+        texts = list(notes)
+
 
 async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
-    """Synthesizes the final report from the collected search results."""
+    """
+    Synthesizes the final report from the collected search results, map-reduce style: the findings of each plan
+    category are condensed concurrently, then the report is written from those notes and streamed as it is generated.
+    No prompt exceeds about SYNTHESIS_MAX_PROMPT_CHARS of findings, however many results the research gathered.
+    """
     logger.info("--- Entering Synthesis Node ---")
     if state.get("stop_requested"):
         logger.info("Stop requested, skipping synthesis.")
@@ -938,48 +982,22 @@ async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
     llm = state["llm"]
     topic = state["topic"]
     search_results = state.get("search_results", [])
-    output_dir = state["output_dir"]
     plan = state["research_plan"]  # Include plan for context
+    store = state["checkpoint_store"]
+    on_report_chunk = state.get("on_report_chunk") or (lambda text: None)
+    stop_event = _AGENT_STOP_FLAGS.get(state["task_id"])
 
     if not search_results:
         logger.warning("No search results found to synthesize report.")
         report = f"# Research Report: {topic}\n\nNo information was gathered during the research process."
-        _save_report_to_md(report, output_dir)
+        on_report_chunk(report)
+        store.commit_report(report)
         return {"final_report": report}
 
     logger.info(
         f"Synthesizing report from {len(search_results)} collected search result entries."
     )
-
-    # Prepare context for the LLM
-    # Format search results nicely, maybe group by query or original plan step
-    formatted_results = ""
     references = {}
-    ref_count = 1
-    for i, result_entry in enumerate(search_results):
-        query = result_entry.get("query", "Unknown Query")  # From parallel_browser_search
-        tool_name = result_entry.get("tool_name")  # From other tools
-        status = result_entry.get("status", "unknown")
-        result_data = result_entry.get("result")  # From BrowserUseAgent's final_result
-        tool_output_str = result_entry.get("output")  # From other tools
-
-        if tool_name == "parallel_browser_search" and status == "completed" and result_data:
-            # result_data is the summary from BrowserUseAgent
-            formatted_results += f'### Finding from Web Search Query: "{query}"\n'
-            formatted_results += f"- **Summary:**\n{result_data}\n"  # result_data is already a summary string here
-            # If result_data contained title/URL, you'd format them here.
-            # The current BrowserUseAgent returns a string summary directly as 'final_data' in run_single_browser_task
-            formatted_results += "---\n"
-        elif tool_name != "parallel_browser_search" and status == "completed" and tool_output_str:
-            formatted_results += f'### Finding from Tool: "{tool_name}" (Args: {result_entry.get("args")})\n'
-            formatted_results += f"- **Output:**\n{tool_output_str}\n"
-            formatted_results += "---\n"
-        elif status == "failed":
-            error = result_entry.get("error")
-            q_or_t = f"Query: \"{query}\"" if query != "Unknown Query" else f"Tool: \"{tool_name}\""
-            formatted_results += f'### Failed {q_or_t}\n'
-            formatted_results += f"- **Error:** {error}\n"
-            formatted_results += "---\n"
 
     # Prepare the research plan context
     plan_summary = "\nResearch Plan Followed:\n"
@@ -989,11 +1007,44 @@ async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
             marker = "[x]" if task["status"] == "completed" else "[ ]" if task["status"] == "pending" else "[-]"
             plan_summary += f"  - {marker} {task['task_description']}\n"
 
-    synthesis_prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                """You are a professional researcher tasked with writing a comprehensive and well-structured report based on collected findings.
+    try:
+        # --- Map: condense the findings of each category, concurrently ---
+        semaphore = asyncio.Semaphore(state.get("max_concurrent_tasks") or 1)
+        # the same finding reached by several tasks is summarized once, in the first category that found it
+        tagged_results = [
+            {**result, "category_index": cat_idx}
+            for cat_idx, results in store.search_results_by_category().items() for result in results
+        ]
+        grouped_results: Dict[Optional[int], List[Dict[str, Any]]] = {}
+        for result in state["research_cache"].collapse_near_duplicates(tagged_results):
+            grouped_results.setdefault(result["category_index"], []).append(result)
+
+        scopes, summaries = [], []
+        for cat_idx, results in grouped_results.items():
+            findings = [finding for finding in (_format_finding(result) for result in results) if finding]
+            if not findings:
+                continue
+            scope = f"Category {cat_idx + 1}: {plan[cat_idx]['category_name']}" if cat_idx is not None \
+                else "Findings of earlier runs"
+            scopes.append(scope)
+            summaries.append(_summarize_findings(llm, topic, scope, findings, semaphore))
+        logger.info(f"Summarizing the findings of {len(summaries)} categories.")
+        category_notes = await asyncio.gather(*summaries)
+
+        if stop_event and stop_event.is_set():
+            logger.info("Stop requested, skipping the report.")
+            return {"stop_requested": True}
+
+        # --- Reduce: write the report from the category notes ---
+        formatted_results = "".join(f"## {scope}\n{notes}\n" for scope, notes in zip(scopes, category_notes))
+        if len(formatted_results) > SYNTHESIS_MAX_PROMPT_CHARS:
+            formatted_results = await _summarize_findings(
+                llm, topic, "All categories", [f"## {scope}\n{notes}\n" for scope, notes in zip(scopes, category_notes)],
+                semaphore,
+            )
+
+        synthesis_messages = [
+            SystemMessage(content="""You are a professional researcher tasked with writing a comprehensive and well-structured report based on collected findings.
         The report should address the research topic thoroughly, synthesizing the information gathered from various sources.
         Structure the report logically:
         1.  Briefly introduce the topic and the report's scope (mentioning the research plan followed, including categories and tasks, is good).
@@ -1002,35 +1053,30 @@ async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
 
         Ensure the tone is objective and professional.
         If findings are contradictory or incomplete, acknowledge this.
-        """,  # Removed citation part for simplicity for now, as browser agent returns summaries.
-            ),
-            (
-                "human",
-                f"""
+        """),  # Removed citation part for simplicity for now, as browser agent returns summaries.
+            HumanMessage(content=f"""
             **Research Topic:** {topic}
 
             {plan_summary}
 
-            **Collected Findings:**
+            **Collected Findings (condensed per research category):**
             ```
             {formatted_results}
             ```
 
             Please generate the final research report in Markdown format based **only** on the information above.
-            """,
-            ),
+            """),
         ]
-    )
 
-    try:
-        response = await llm.ainvoke(
-            synthesis_prompt.format_prompt(
-                topic=topic,
-                plan_summary=plan_summary,
-                formatted_results=formatted_results,
-            ).to_messages()
-        )
-        final_report_md = response.content
+        final_report_md = ""
+        async for chunk in llm.astream(synthesis_messages):
+            text = _message_text(chunk.content)
+            if text:
+                final_report_md += text
+                on_report_chunk(text)
+            if stop_event and stop_event.is_set():
+                logger.info("Stop requested while writing the report.")
+                return {"stop_requested": True}
 
         # Append the reference list automatically to the end of the generated markdown
         if references:
@@ -1042,9 +1088,12 @@ async def synthesis_node(state: DeepResearchState) -> Dict[str, Any]:
                     f"[{ref['id']}] {ref['title']} - {ref['url']}\n"
                 )
             final_report_md += report_references_section
+            on_report_chunk(report_references_section)
+        if not final_report_md.endswith("\n"):
+            on_report_chunk("\n")  # sends the last line
 
         logger.info("Successfully synthesized the final report.")
-        _save_report_to_md(final_report_md, output_dir)
+        store.commit_report(final_report_md)
         return {"final_report": final_report_md}
 
     except Exception as e:
@@ -1105,6 +1154,7 @@ class DeepResearchAgent:
             llm: Any,
             browser_config: Dict[str, Any],
             mcp_server_config: Optional[Dict[str, Any]] = None,
+            browser_pool: Optional[BrowserPool] = None,
     ):
         """
         Initializes the DeepSearchAgent.
@@ -1114,19 +1164,26 @@ class DeepResearchAgent:
             browser_config: Configuration dictionary for the BrowserUseAgent tool.
                             Example: {"headless": True, "window_width": 1280, ...}
             mcp_server_config: Optional configuration for the MCP client.
+            browser_pool: Optional pool the browser searches lease their browsers from. If None, each run starts its
+                          own pool of `max_parallel_browsers` browsers and closes it when it ends.
         """
         self.llm = llm
         self.browser_config = browser_config
         self.mcp_server_config = mcp_server_config
+        self.browser_pool = browser_pool
+        self._owns_browser_pool = browser_pool is None
         self.mcp_client = None
         self.stopped = False
+        # the report of the current run so far, while it is being written
+        self.partial_report = ""
         self.graph = self._compile_graph()
         self.current_task_id: Optional[str] = None
         self.stop_event: Optional[threading.Event] = None
         self.runner: Optional[asyncio.Task] = None  # To hold the asyncio task for run
 
     async def _setup_tools(
-            self, task_id: str, stop_event: threading.Event, max_parallel_browsers: int = 1
+            self, task_id: str, stop_event: threading.Event, max_parallel_browsers: int = 1,
+            research_cache: Optional[ResearchCache] = None,
     ) -> List[Tool]:
         """Sets up the basic tools (File I/O) and optional MCP tools."""
         tools = [
@@ -1140,6 +1197,10 @@ class DeepResearchAgent:
             task_id=task_id,
             stop_event=stop_event,
             max_parallel_browsers=max_parallel_browsers,
+            browser_pool=await self._get_browser_pool(max_parallel_browsers),
+            # research tasks running side by side share the browser budget
+            browser_semaphore=asyncio.Semaphore(max_parallel_browsers),
+            research_cache=research_cache,
         )
         tools += [browser_use_tool]
         # Add MCP tools if config is provided
@@ -1162,6 +1223,34 @@ class DeepResearchAgent:
         tools_map = {tool.name: tool for tool in tools}
         return tools_map.values()
 
+    async def _get_browser_pool(self, size: int) -> Optional[BrowserPool]:
+        """Pool of long-lived browsers shared by all the searches of a run, None if the browser can't be pooled"""
+        if not _can_pool_browsers(self.browser_config):
+            return None
+        if self.browser_pool is not None:
+            if not self._owns_browser_pool or self.browser_pool.pool_config.size >= size:
+                return self.browser_pool
+            # this run searches with more browsers in parallel than the pool has
+            await self.browser_pool.close()
+
+        bu_browser_config, context_config = _build_research_browser_configs(self.browser_config)
+        self.browser_pool = BrowserPool(
+            bu_browser_config,
+            context_config,
+            BrowserPoolConfig(size=max(size, 1), video_dir=os.path.join("./tmp/deep_research", "videos")),
+        )
+        try:
+            await self.browser_pool.start()
+        except Exception as e:
+            logger.error(f"Failed to start the research browser pool, searches launch their own browsers: {e}")
+            self.browser_pool = None
+        return self.browser_pool
+
+    async def close_browser_pool(self):
+        if self.browser_pool is not None and self._owns_browser_pool:
+            await self.browser_pool.close()
+            self.browser_pool = None
+
     async def close_mcp_client(self):
         if self.mcp_client:
             await self.mcp_client.__aexit__(None, None, None)
@@ -1244,6 +1333,8 @@ class DeepResearchAgent:
             task_id: Optional[str] = None,
             save_dir: str = "./tmp/deep_research",
             max_parallel_browsers: int = 1,
+            max_concurrent_tasks: Optional[int] = None,
+            message_callback: Optional[Callable[[str], Awaitable[None]]] = None,
     ) -> Dict[str, Any]:
         """
         Starts the deep research process.
@@ -1255,6 +1346,10 @@ class DeepResearchAgent:
             task_id: Optional existing task ID to resume. If None, a new ID is generated.
             save_dir: Directory to save research results.
             max_parallel_browsers: Maximum number of parallel browser instances.
+            max_concurrent_tasks: Maximum number of independent plan tasks researched at the same time, each making
+                                  its own LLM calls. Defaults to max_parallel_browsers.
+            message_callback: Optional async callback (e.g. a WebSocket sender) that gets the report line by line
+                              as it is written. `partial_report` holds the report written so far.
 
         Returns:
             Dictionary containing the research results and status.
@@ -1289,9 +1384,13 @@ class DeepResearchAgent:
 
         self.stop_event = threading.Event()
         _AGENT_STOP_FLAGS[self.current_task_id] = self.stop_event
+        checkpoint_store = ResearchCheckpointStore(output_dir)
+        # searches of an earlier run of this task are not repeated on resume
+        research_cache = ResearchCache(checkpoint_store.search_results)
         agent_tools = await self._setup_tools(
-            self.current_task_id, self.stop_event, max_parallel_browsers
+            self.current_task_id, self.stop_event, max_parallel_browsers, research_cache
         )
+        self.partial_report = ""
         initial_state: DeepResearchState = {
             "task_id": self.current_task_id,
             "topic": topic,
@@ -1309,6 +1408,10 @@ class DeepResearchAgent:
             "current_task_index_in_category": 0,
             "stop_requested": False,
             "error_message": None,
+            "max_concurrent_tasks": max_concurrent_tasks or max_parallel_browsers,
+            "checkpoint_store": checkpoint_store,
+            "research_cache": research_cache,
+            "on_report_chunk": self._report_chunk_handler(message_callback),
 
                 # Initialize the new fields
             "intent_check": False,
@@ -1326,7 +1429,7 @@ class DeepResearchAgent:
 
         if task_id:
             logger.info(f"Attempting to resume task {task_id}...")
-            loaded_state = _load_previous_state(task_id, output_dir)
+            loaded_state = checkpoint_store.resume_state()
             initial_state.update(loaded_state)
             if loaded_state.get("research_plan"):
                 logger.info(
@@ -1384,6 +1487,12 @@ class DeepResearchAgent:
         finally:
             logger.info(f"Cleaning up resources for task {self.current_task_id}")
             task_id_to_clean = self.current_task_id
+            checkpoint_store.export_search_results(cache_stats=research_cache.stats)
+            if message_callback is not None:
+                # the last line of the report has no line break to send it
+                if self.partial_report and not self.partial_report.endswith("\n"):
+                    send_ws_message(message_callback, self.partial_report.rsplit("\n", 1)[-1])
+                await flush_ws_messages(message_callback)
 
             self.stop_event = None
             self.current_task_id = None
@@ -1391,16 +1500,41 @@ class DeepResearchAgent:
             if self.mcp_client:
                 await self.mcp_client.__aexit__(None, None, None)
 
+            browser_pool_stats = self.browser_pool.stats if self.browser_pool is not None else None
+            if browser_pool_stats is not None:
+                logger.info(f"Browser pool after task {task_id_to_clean}: {browser_pool_stats}")
+            # the agent outlives its runs (e.g. in the web UI), its own browsers must not
+            await self.close_browser_pool()
+
             # Return a result dictionary including the status and the final state if available
             return {
                 "status": status,
                 "message": message,
                 "task_id": task_id_to_clean,  # Use the stored task_id
+                "browser_pool": browser_pool_stats,
+                "research_cache": research_cache.stats,
                 "final_state": final_state
                 if final_state
                 else {},  # Return the final state dict
             }
 
+    def _report_chunk_handler(
+            self, message_callback: Optional[Callable[[str], Awaitable[None]]]
+    ) -> Callable[[str], None]:
+        """Collects the streamed report in `partial_report` and sends every completed line to `message_callback`"""
+        pending_line = ""
+
+        def on_report_chunk(text: str):
+            nonlocal pending_line
+            self.partial_report += text
+            if message_callback is None:
+                return
+            *lines, pending_line = (pending_line + text).split("\n")
+            for line in lines:
+                send_ws_message(message_callback, line)
+
+        return on_report_chunk
+
     async def _stop_lingering_browsers(self, task_id):
         """Attempts to stop any BrowserUseAgent instances associated with the task_id."""
         keys_to_stop = [
@@ -0,0 +1,176 @@
+import asyncio
+import copy
+import hashlib
+import logging
+import re
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.utils.preflight_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that track the visitor and don't change the page
+_TRACKING_PARAMS = re.compile(r"^(utm_.*|gclid|fbclid|msclkid|mc_cid|mc_eid|ref|ref_src|_ga)$", re.IGNORECASE)
+# Results sharing at least this fraction of their word shingles are the same finding
+NEAR_DUPLICATE_SIMILARITY = 0.8
+SHINGLE_SIZE = 3
+
+
+def query_key(query: str) -> str:
+    """Normalized query: case, spacing and trailing punctuation don't matter, word order and repeated words do"""
+    return normalize_query(query)
+
+
+def canonical_url(url: str) -> str:
+    """URL without fragment, tracking parameters, default port and trailing slash, with sorted query parameters"""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    host = (parts.hostname or "").lower()
+    if parts.port and (parts.scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(name)
+    ))
+    return urlunsplit((parts.scheme.lower(), host, parts.path.rstrip("/") or "/", query, ""))
+
+
+def _shingles(text: str) -> Set[str]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _finding_text(result: Dict[str, Any]) -> Optional[str]:
+    if result.get("status") != "completed":
+        return None
+    text = result.get("result") or result.get("output")
+    return str(text) if text else None
+
+
+class ResearchCache:
+    """
+    Cache shared by every task of one research run.
+
+    Searches are keyed by normalized query: a query that already completed returns its result, and one that is
+    running is awaited instead of started again. Page extractions of the browser agents are keyed by canonical URL,
+    a hash of the page text and the extraction goal, so a page visited again reuses the earlier extraction unless it
+    changed. `stats` counts the hits, and is saved with the search results.
+    """
+
+    def __init__(self, search_results: Iterable[Dict[str, Any]] = ()):
+        self._searches: Dict[str, Dict[str, Any]] = {}
+        self._running_searches: Dict[str, asyncio.Future] = {}
+        self._extractions: Dict[str, Any] = {}
+        self.search_hits = 0
+        self.search_misses = 0
+        self.extraction_hits = 0
+        self.extraction_misses = 0
+        self.duplicates_collapsed = 0
+        # results of earlier runs of the task, a resumed run doesn't search them again
+        for result in search_results:
+            if result.get("query") and result.get("status") == "completed" and not result.get("tool_name"):
+                self._searches.setdefault(query_key(result["query"]), result)
+
+    async def search(self, query: str, run: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Result of a search, from the cache, from an identical running search, or from `run`.
+
+        When the running search fails (or is stopped), one of its waiters searches again and the others wait for that
+        retry. If the retry fails too, the remaining waiters get its failed result rather than searching once more.
+        """
+        key = query_key(query)
+        is_retry = False
+        while True:
+            cached = self._searches.get(key)
+            if cached is not None:
+                self.search_hits += 1
+                logger.info(f"Research cache hit for query '{query}' (same as '{cached.get('query')}')")
+                return {**copy.deepcopy(cached), "query": query, "cached": True}
+            running = self._running_searches.get(key)
+            if running is None:
+                break
+            outcome, outcome_was_retry = await asyncio.shield(running)
+            if outcome.get("status") != "completed" and outcome_was_retry:
+                return {**copy.deepcopy(outcome), "query": query}
+            # completed: cached by now. Failed: this waiter retries, unless another one already does
+            is_retry = True
+
+        self.search_misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._running_searches[key] = future
+        result: Dict[str, Any] = {"query": query, "status": "failed", "error": "Search did not finish"}
+        try:
+            result = await run()
+            return result
+        except BaseException as e:
+            result = {"query": query, "status": "failed", "error": str(e) or type(e).__name__}
+            raise
+        finally:
+            self._running_searches.pop(key, None)
+            # failed and stopped searches are worth trying again
+            if result.get("status") == "completed":
+                self._searches[key] = result
+            future.set_result((result, is_retry))
+
+    async def extract(self, url: str, page_text: str, goal: str, options: Any,
+                      run: Callable[[], Awaitable[Any]], is_reusable: Callable[[Any], bool] = bool) -> Any:
+        """Extraction of a page for a goal, from the cache or from `run`. Only results `is_reusable` accepts are kept"""
+        content_hash = hashlib.sha256(page_text.encode()).hexdigest()
+        key = hashlib.sha256(
+            f"{canonical_url(url)}\n{content_hash}\n{normalize_query(goal)}\n{options}".encode()
+        ).hexdigest()
+        if key in self._extractions:
+            self.extraction_hits += 1
+            logger.info(f"Research cache hit for the extraction of {url}")
+            return copy.deepcopy(self._extractions[key])
+
+        self.extraction_misses += 1
+        result = await run()
+        if is_reusable(result):
+            self._extractions[key] = copy.deepcopy(result)
+        return result
+
+    def collapse_near_duplicates(self, search_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Search results without the findings that repeat an earlier one (same text, or nearly: most of their word
+        shingles shared). The first of each group is kept, with the queries of the others in `duplicate_queries`.
+        """
+        kept: List[Dict[str, Any]] = []
+        kept_shingles: List[Set[str]] = []
+        for result in search_results:
+            text = _finding_text(result)
+            shingles = _shingles(text) if text else set()
+            duplicate_of = next((
+                i for i, other in enumerate(kept_shingles)
+                if shingles and other and len(shingles & other) / len(shingles | other) >= NEAR_DUPLICATE_SIMILARITY
+            ), None)
+            if duplicate_of is None:
+                kept.append(dict(result))
+                kept_shingles.append(shingles)
+            else:
+                duplicates = kept[duplicate_of].setdefault("duplicate_queries", [])
+                duplicates.append(result.get("query") or result.get("tool_name"))
+                self.duplicates_collapsed += 1
+        if len(kept) < len(search_results):
+            logger.info(f"Collapsed {len(search_results) - len(kept)} near duplicate search results")
+        return kept
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        def hit_rate(hits: int, misses: int) -> float:
+            return round(hits / (hits + misses), 3) if hits + misses else 0.0
+
+        return {
+            "search_hits": self.search_hits,
+            "search_misses": self.search_misses,
+            "search_hit_rate": hit_rate(self.search_hits, self.search_misses),
+            "extraction_hits": self.extraction_hits,
+            "extraction_misses": self.extraction_misses,
+            "extraction_hit_rate": hit_rate(self.extraction_hits, self.extraction_misses),
+            "duplicates_collapsed": self.duplicates_collapsed,
+        }
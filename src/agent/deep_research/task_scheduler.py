@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (category index, task index) of a task in the research plan
+TaskKey = Tuple[int, int]
+
+# Runs one task and returns its outcome, it may raise
+TaskRunner = Callable[[TaskKey, Dict[TaskKey, Any]], Awaitable[Any]]
+
+
+def parse_task_reference(reference: Any) -> Optional[TaskKey]:
+    """Task key of a "<category number>.<task number>" reference (1-based, as the plan is numbered), None if invalid"""
+    match = re.fullmatch(r"\s*(\d+)\s*\.\s*(\d+)\s*", str(reference))
+    if not match:
+        return None
+    return int(match.group(1)) - 1, int(match.group(2)) - 1
+
+
+class ResearchTaskScheduler:
+    """
+    Runs the pending tasks of a research plan as a dependency graph.
+
+    A task starts as soon as the tasks it depends on are finished (completed or failed) and one of the
+    `max_concurrency` slots is free, so independent tasks of any category run side by side and a plan takes about as
+    long as its critical path. `run_task` gets the outcomes of the task's dependencies, and `on_task_done` is called
+    once per finished task, in completion order, so the caller can merge and checkpoint as the plan progresses.
+    """
+
+    def __init__(
+            self,
+            plan: List[Dict[str, Any]],
+            run_task: TaskRunner,
+            max_concurrency: int = 1,
+            on_task_done: Optional[Callable[[TaskKey, Any], None]] = None,
+            should_stop: Optional[Callable[[], bool]] = None,
+    ):
+        self.run_task = run_task
+        self.max_concurrency = max(max_concurrency, 1)
+        self.on_task_done = on_task_done
+        self.should_stop = should_stop or (lambda: False)
+
+        self.tasks: Dict[TaskKey, Dict[str, Any]] = {
+            (cat_idx, task_idx): task
+            for cat_idx, category in enumerate(plan)
+            for task_idx, task in enumerate(category["tasks"])
+        }
+        self.dependencies: Dict[TaskKey, Set[TaskKey]] = {}
+        for key, task in self.tasks.items():
+            dependencies = set()
+            for reference in task.get("depends_on") or []:
+                dependency = parse_task_reference(reference)
+                if dependency in self.tasks and dependency != key:
+                    dependencies.add(dependency)
+                else:
+                    logger.warning(f"Ignoring invalid dependency '{reference}' of research task {key}")
+            self.dependencies[key] = dependencies
+
+    def critical_path_length(self) -> int:
+        """Number of tasks on the longest dependency chain of the plan"""
+        lengths: Dict[TaskKey, int] = {}
+
+        def length(key: TaskKey, visiting: Set[TaskKey]) -> int:
+            if key not in lengths:
+                if key in visiting:  # cycle, counted once
+                    return 0
+                visiting.add(key)
+                lengths[key] = 1 + max((length(dep, visiting) for dep in self.dependencies[key]), default=0)
+                visiting.discard(key)
+            return lengths[key]
+
+        return max((length(key, set()) for key in self.tasks), default=0)
+
+    async def run(self) -> Dict[TaskKey, Any]:
+        """Run every pending task whose dependencies can be met, returns the outcome of each task that ran"""
+        pending = sorted(key for key, task in self.tasks.items() if task.get("status") == "pending")
+        finished: Set[TaskKey] = set(self.tasks) - set(pending)
+        outcomes: Dict[TaskKey, Any] = {}
+        running: Dict[asyncio.Task, TaskKey] = {}
+
+        logger.info(
+            f"Scheduling {len(pending)} research tasks with up to {self.max_concurrency} at a time "
+            f"(critical path: {self.critical_path_length()} tasks)"
+        )
+        try:
+            while pending or running:
+                if not self.should_stop():
+                    # plan order among the ready tasks, so runs of the same plan start tasks in the same order
+                    for key in [key for key in pending if self.dependencies[key] <= finished]:
+                        if len(running) >= self.max_concurrency:
+                            break
+                        pending.remove(key)
+                        dependency_outcomes = {dep: outcomes.get(dep) for dep in sorted(self.dependencies[key])}
+                        running[asyncio.create_task(self.run_task(key, dependency_outcomes))] = key
+
+                if not running:
+                    if pending and not self.should_stop():
+                        logger.warning(f"Research tasks {pending} have circular dependencies, leaving them pending")
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: running[t]):
+                    key = running.pop(task)
+                    try:
+                        outcome = task.result()
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        logger.error(f"Research task {key} failed: {e}", exc_info=True)
+                        outcome = e
+                    outcomes[key] = outcome
+                    finished.add(key)
+                    if self.on_task_done is not None:
+                        self.on_task_done(key, outcome)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return outcomes
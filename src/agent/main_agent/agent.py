@@ -1,5 +1,6 @@
 from ...models.models import AIModel
 from typing import Optional, Any
+import hashlib
 import json
 import time
 import os
@@ -8,8 +9,9 @@ from langchain_openai import ChatOpenAI
 from langchain_ollama.chat_models import ChatOllama
 from dotenv import load_dotenv
 from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate, AIMessagePromptTemplate
-from ...outputdata.output_data import write_data_to_file
-from ...websocket.websocket_manager import send_ws_message
+from ...outputdata.output_data import awrite_data_to_file
+from ...websocket.websocket_manager import flush_ws_messages, send_ws_message
+from ...utils.preflight_cache import get_preflight_cache, normalize_query
 load_dotenv()
 
 import logging
@@ -53,9 +55,23 @@ async def run_main_agent(
     input_to_prompt: dict,
     model_name: Optional[str] ,
     message_callback=None,  # Add message callback
+    cache_scope: Optional[dict] = None,  # url and screenshot_hash of the page, enables the preflight cache
 ) -> Any:
     llm_model = get_llm_model(model_name, output_pydantic_class)
     logger.info(f"Running agent '{agents_name}' with model: {model_name}")
+
+    cache = get_preflight_cache() if cache_scope is not None else None
+    cache_key = None
+    if cache is not None:
+        # the uploaded image's file id changes with every upload, the screenshot hash identifies the page instead
+        cache_key = {
+            "prompt": hashlib.sha256(agents_prompt.encode()).hexdigest(),
+            "inputs": {
+                key: normalize_query(value) if isinstance(value, str) else value
+                for key, value in input_to_prompt.items() if key != "image_file_id"
+            },
+            "url": cache_scope.get("url"),
+        }
     
     
     # Notify WebSocket clients about the agent starting
@@ -68,6 +84,16 @@ async def run_main_agent(
     output = None
     should_retry = True  # Ensure first attempt runs
     start_time = time.time()
+
+    cache_hit = False
+    if cache is not None:
+        cached = await cache.get(agents_name, cache_key, cache_scope.get("screenshot_hash"))
+        if cached is not None:
+            output = output_pydantic_class.model_validate(cached)
+            should_retry = False
+            cache_hit = True
+            if message_callback:
+                await message_callback(f"♻️ Reusing the cached output of {agents_name}")
     
     while attempt < max_attempts and should_retry:
         attempt += 1
@@ -80,7 +106,7 @@ async def run_main_agent(
             # Build and execute the chain
             chat_prompt = get_chatprompt_templates(current_prompt, list(input_to_prompt.keys()))
             chain = chat_prompt | llm_model
-            output = chain.invoke(input_to_prompt)
+            output = await chain.ainvoke(input_to_prompt)
 
             # Simplified validation handling
             validation_result = output.custom_validate() 
@@ -99,16 +125,26 @@ async def run_main_agent(
     # Final reporting
     end_time = time.time()
     time_taken = end_time - start_time
-    logger.info(f"Completed in {time_taken:.2f}s with {attempt} attempts")
+    if cache_hit:
+        logger.info(f"Completed in {time_taken:.2f}s from the preflight cache")
+    else:
+        logger.info(f"Completed in {time_taken:.2f}s with {attempt} attempts")
+
+    # only outputs that passed validation are worth reusing
+    if cache is not None and attempt and output is not None and not should_retry:
+        await cache.put(
+            agents_name, cache_key, output.model_dump(mode="json"), time_taken, cache_scope.get("screenshot_hash")
+        )
     
     
     logger.info(f"Writing data to file for agent '{agents_name}'")
-    write_data_to_file(
+    await awrite_data_to_file(
         agents_name=agents_name,
         number_of_tries=attempt,
         time_taken=time_taken,
         user_input=input_to_prompt,
         output=output,
+        cache_hit=cache_hit,
     )
     # if message_callback:
     #     await message_callback(f"🎯 Output for  {agents_name}: {output}")
@@ -122,5 +158,7 @@ async def run_main_agent(
         if getattr(output, "enhanced_prompt", ""):     
            await message_callback(f"- enhanced_prompt: {output}")
     # Send the final output via WebSocket
+    # the error messages of failed attempts go out before the output is returned
+    await flush_ws_messages(message_callback)
 
     return output
\ No newline at end of file
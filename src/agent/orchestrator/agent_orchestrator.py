@@ -1,13 +1,17 @@
 import logging
 from langgraph.graph import StateGraph, START, END
 import os
-from typing import TypedDict, Any, Dict
+from typing import TypedDict, Any, Dict, Optional
 from browser_use.agent.views import AgentHistoryList
 from src.webpage.webpage_checker import WebpageChecker
 from src.agent.qa_possibilty_checker.agent import QAPossibilityChecker
 from src.agent.prompt_enahncer.agent import PromptEnhancerAgent
 from src.agent.browser_use.browser_use_agent import BrowserUseAgent
+from src.utils.preflight_cache import screenshot_hash
 import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from browser_use.browser.page_load_wait import SETTLE_PROBE_JS
 from playwright.async_api import async_playwright
 from openai import OpenAI
 
@@ -31,6 +35,7 @@ class State(TypedDict):
     webpage_msg: str
 
     screenshot_taken: bool
+    screenshot_hash: str
     image_fileId: str
 
     extracted_snippet_agent_msg: str
@@ -61,7 +66,8 @@ class AgentOrchestrator:
         extend_system_prompt: Any = None,
         planner_llm: Any = None,
         use_vision_for_planner: bool = False,
-        message_callback=None
+        message_callback=None,
+        browser_pool: Any = None
     ):
         
         self.llm = llm
@@ -78,39 +84,24 @@ class AgentOrchestrator:
         self.planner_llm = planner_llm
         self.use_vision_for_planner = use_vision_for_planner
         self.message_callback = message_callback
+        # Used to lease a browser when run() is not given one
+        self.browser_pool = browser_pool
+        # One file per run, runs can happen concurrently
+        self.screenshot_path = os.path.join("/app", "src", "outputdata", f"screenshot_{uuid.uuid4().hex}.png")
         self.client = OpenAI()
 
         self.builder = StateGraph(State)
 
-        self.builder.add_node("webpage_checker", self.webpage_checker)
-        self.builder.add_node("take_screenshot", self.take_screenshot)
-        self.builder.add_node("get_image_fileId", self.get_image_fileId)
+        self.builder.add_node("preflight", self.preflight)
         self.builder.add_node("QA_possibility", self.QA_possibility)
         self.builder.add_node("prompt_enhancer", self.prompt_enhancer)
         self.builder.add_node("browser_ui", self.browser_ui)
 
-        self.builder.add_edge(START, "webpage_checker")
+        self.builder.add_edge(START, "preflight")
 
         self.builder.add_conditional_edges(
-            "webpage_checker",
-            self._webpage_condition,
-            {
-                "take_screenshot": "take_screenshot",
-                "__end__": END
-            }
-        )                        
-
-        self.builder.add_conditional_edges(
-            "take_screenshot",
-            self._take_screenshot_condition,
-            {
-                "get_image_fileId": "get_image_fileId",
-                "__end__": END
-            }
-        )
-        self.builder.add_conditional_edges(
-            "get_image_fileId",
-            self._get_image_fileId_condition,
+            "preflight",
+            self._preflight_condition,
             {
                 "QA_possibility": "QA_possibility",
                 "__end__": END
@@ -155,6 +146,35 @@ class AgentOrchestrator:
             state["webpage_check"] = False
         return state
 
+    async def preflight(self, state: State) -> State:
+        """
+        Webpage check, in parallel with the screenshot and its upload. The screenshot is abandoned as soon as the check
+        says the page doesn't exist.
+        """
+        logger.info("\n\n PREFLIGHT: WEBPAGE CHECKER + SCREENSHOT...\n")
+
+        async def capture():
+            await self.take_screenshot(state)
+            if state.get("screenshot_taken"):
+                await self.get_image_fileId(state)
+
+        capture_task = asyncio.create_task(capture())
+        try:
+            await self.webpage_checker(state)
+            if state.get("webpage_check"):
+                await capture_task
+        finally:
+            if not capture_task.done():
+                capture_task.cancel()
+                await asyncio.gather(capture_task, return_exceptions=True)
+        return state
+
+    def _cache_scope(self, state: State) -> Optional[Dict[str, Any]]:
+        """What identifies the page for the preflight cache besides the query, None (no caching) without a screenshot hash"""
+        if not state.get("screenshot_hash"):
+            return None
+        return {"url": self.url, "screenshot_hash": state["screenshot_hash"]}
+
     def _get_output_value(self, output, key, default=None):
         if isinstance(output, dict):
             return output.get(key, default)
@@ -162,12 +182,7 @@ class AgentOrchestrator:
 
 
     async def take_screenshot(self, state: State) -> State:
-
-        # Paths for local development
-        # save_path = "screenshot.png"
-        
-        # Paths for Dockerized application
-        save_path = "/app/src/outputdata/screenshot.png"
+        save_path = self.screenshot_path
         
         # Debug: Print screenshot path info
         print(f"📸 Screenshot path: {save_path}")
@@ -181,10 +196,7 @@ class AgentOrchestrator:
                 await self.message_callback("----------------------------")
                 await self.message_callback("📸 Starting screenshot agent.")
             
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page()
-                
+            async with self._screenshot_page(state.get("browser")) as page:
                 try:
                     await page.goto(self.url, timeout=30000, wait_until="networkidle")
                 except Exception:
@@ -195,46 +207,80 @@ class AgentOrchestrator:
                     await self.message_callback("✅ Page loaded successfully.")
                 print(f"✅ Page loaded successfully")
                 
-                # Wait for 2 seconds to ensure proper page rendering
+                # Wait until the page is rendered instead of a fixed time
                 if self.message_callback:
                     await self.message_callback("⏳ Waiting for page to render properly...")
                 print("⏳ Waiting for page to render properly...")
-                await asyncio.sleep(2)
-                
-                #await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                await asyncio.sleep(1)
+                await self._wait_for_rendered(page)
 
-                #scroll multiple times for infinite scrolling pages
+                # scroll for infinite scrolling / lazy loaded pages, until the bottom or at most 6 times
                 for _ in range(6):
                     await page.mouse.wheel(0, 1000)
-                    await asyncio.sleep(1)
+                    await self._wait_for_rendered(page)
+                    if await page.evaluate(
+                        "window.innerHeight + window.scrollY >= document.documentElement.scrollHeight - 2"
+                    ):
+                        break
 
                 print(f"📸 Taking screenshot and saving to: {save_path}")
                 if self.message_callback:
                    await self.message_callback("📸 Taking screenshot of the page...")
 
                 await page.screenshot(path=save_path, full_page=True)
-                await browser.close()
-                logger.info(f"Screenshot saved at: {save_path}")
+            logger.info(f"Screenshot saved at: {save_path}")
                 
-                # Debug: Verify screenshot was actually saved
-                if os.path.exists(save_path):
-                    file_size = os.path.getsize(save_path)
-                    print(f"✅ Screenshot saved successfully! Size: {file_size} bytes")
-                    if self.message_callback:
-                       await self.message_callback(f"✅ Screenshot saved successfully! Size: {file_size} bytes")
-                    state["screenshot_taken"] = True
-                else:
-                    if self.message_callback:
-                       await self.message_callback(f"❌ Screenshot file not found at: {save_path}")
-                    state["screenshot_taken"] = False
+            # Debug: Verify screenshot was actually saved
+            if os.path.exists(save_path):
+                file_size = os.path.getsize(save_path)
+                print(f"✅ Screenshot saved successfully! Size: {file_size} bytes")
+                if self.message_callback:
+                   await self.message_callback(f"✅ Screenshot saved successfully! Size: {file_size} bytes")
+                state["screenshot_taken"] = True
+                state["screenshot_hash"] = await asyncio.to_thread(screenshot_hash, save_path)
+            else:
+                if self.message_callback:
+                   await self.message_callback(f"❌ Screenshot file not found at: {save_path}")
+                state["screenshot_taken"] = False
         except Exception as e:
             logger.error(f"Error taking screenshot: {e}")
             if self.message_callback:
                await self.message_callback(f"❌ Error taking screenshot: {e}")
             state["screenshot_taken"] = False
-        await self.message_callback("----------------------------")
+        if self.message_callback:
+            await self.message_callback("----------------------------")
         return state    
+
+    @asynccontextmanager
+    async def _screenshot_page(self, browser: Any):
+        """
+        A page in a throwaway context of the task's (usually pooled, already running) browser. The context is not the
+        agent's, so the screenshot visit is neither recorded nor seen by the agent. Without a running browser a
+        headless one is launched, as before.
+        """
+        playwright_browser = getattr(browser, "playwright_browser", None)
+        if playwright_browser is not None and playwright_browser.is_connected():
+            context = await playwright_browser.new_context()
+            try:
+                yield await context.new_page()
+            finally:
+                await context.close()
+            return
+
+        async with async_playwright() as p:
+            headless_browser = await p.chromium.launch(headless=True)
+            try:
+                yield await headless_browser.new_page()
+            finally:
+                await headless_browser.close()
+
+    async def _wait_for_rendered(self, page, timeout: float = 5.0):
+        """Wait for the load event, web fonts and a short quiet period without DOM mutations (lazy content)"""
+        try:
+            await page.wait_for_load_state("load", timeout=timeout * 1000)
+            await page.evaluate("document.fonts ? document.fonts.ready.then(() => true) : true")
+            await page.evaluate(SETTLE_PROBE_JS, {"quietMs": 300, "maxMs": timeout * 1000})
+        except Exception as e:
+            logger.debug(f"Page did not settle: {e}")
     
     async def get_image_fileId(self, state: State) -> State:
         logger.info("Extracting image file ID...")
@@ -243,10 +289,14 @@ class AgentOrchestrator:
         try:
             # Paths for local development
             # with open("screenshot.png", "rb") as image_file:
-            
+
             # Paths for Dockerized application
-            with open("/app/src/outputdata/screenshot.png", "rb") as image_file:
-                image_file_id = self.client.files.create(file=image_file, purpose="vision").id
+            # Not cached: an uploaded file can expire or be deleted on the OpenAI side, a reused id would fail the
+            # vision call of the next stages
+            with open(self.screenshot_path, "rb") as image_file:
+                # the OpenAI client is synchronous, keep the upload off the event loop
+                uploaded = await asyncio.to_thread(self.client.files.create, file=image_file, purpose="vision")
+                image_file_id = uploaded.id
                 logger.info(f"Image file ID extracted: {image_file_id}")
                 state["image_fileId"] = image_file_id
         except Exception as e:
@@ -266,7 +316,8 @@ class AgentOrchestrator:
                 llm=self.llm,
                 user_prompt=user_prompt,
                 image_file_id=state["image_fileId"],
-                message_callback=self.message_callback
+                message_callback=self.message_callback,
+                cache_scope=self._cache_scope(state)
             ).run_agent()
             
             print(f"QA possibility output: {output}")
@@ -314,7 +365,8 @@ class AgentOrchestrator:
             llm=self.llm,
             user_prompt=user_prompt,
             image_file_id=state['image_fileId'],
-            message_callback=self.message_callback
+            message_callback=self.message_callback,
+            cache_scope=self._cache_scope(state)
         ).run_agent()
         
         # Handle enhanced prompt
@@ -370,13 +422,9 @@ class AgentOrchestrator:
     def _intent_condition(self, state: State) -> Any:
         return "webpage_checker" if state.get("intent_check") else END
 
-    def _webpage_condition(self, state: State) -> Any:
-        return "take_screenshot" if state.get("webpage_check") else END
-
-    def _take_screenshot_condition(self, state: State) -> Any:
-        return "get_image_fileId" if state.get("screenshot_taken") else END
-    
-    def _get_image_fileId_condition(self, state: State) -> Any:
+    def _preflight_condition(self, state: State) -> Any:
+        if not state.get("webpage_check") or not state.get("screenshot_taken"):
+            return END
         return "QA_possibility" if state.get("image_fileId") else END
 
     def _QA_possibility_condition(self, state: State) -> Any:
@@ -405,6 +453,12 @@ class AgentOrchestrator:
         return "browser_ui" if state.get("enhanced_prompt") else END
 
     async def run(self, task: str, browser: Any = None, browser_context: Any = None, controller: Any = None) -> AgentHistoryList:
+        lease = None
+        if browser_context is None and self.browser_pool is not None:
+            lease = await self.browser_pool.acquire()
+            browser, browser_context = lease.browser, lease.browser_context
+
+        succeeded = False
         try:
             initial_state = {
                 "user_query": task,
@@ -415,6 +469,7 @@ class AgentOrchestrator:
             }
             
             final_state = await self.graph.ainvoke(initial_state)
+            succeeded = True
             
             # Check if intent classification or QA possibility failed
             intent_check = final_state.get("intent_check", False)
@@ -574,6 +629,11 @@ class AgentOrchestrator:
         except Exception as e:
             logger.error(f"Error in agent orchestration: {e}")
             raise
+        finally:
+            if os.path.exists(self.screenshot_path):
+                os.remove(self.screenshot_path)
+            if lease is not None:
+                await self.browser_pool.release(lease, healthy=succeeded)
 
     def _store_graph_image(self, graph, output_path=None):
         try:
@@ -6,7 +6,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 class PromptEnhancerAgent:
-    def __init__(self,llm: str, user_prompt: str, image_file_id: str,message_callback=None) -> None:
+    def __init__(self,llm: str, user_prompt: str, image_file_id: str,message_callback=None, cache_scope=None) -> None:
         logger.info("Initializing PromptEnhancerAgent...")
         self.output_pydantic_class = PromptEnhancerOutput
         self.user_prompt = user_prompt
@@ -14,6 +14,7 @@ class PromptEnhancerAgent:
         self.image_file_id = image_file_id
         self.llm = llm,
         self.message_callback = message_callback
+        self.cache_scope = cache_scope
 
     async def run_agent(self) -> PromptEnhancerOutput: 
         if self.message_callback:
@@ -29,7 +30,8 @@ class PromptEnhancerAgent:
                 "image_file_id": self.image_file_id
             },
             model_name=self.llm,
-            message_callback=self.message_callback
+            message_callback=self.message_callback,
+            cache_scope=self.cache_scope
         )
         
         if self.message_callback:
@@ -17,7 +17,8 @@ class QAPossibilityChecker:
     def __init__(self, llm: str, 
                  user_prompt: str, 
                  image_file_id: str,
-                 message_callback=None
+                 message_callback=None,
+                 cache_scope=None
                  ) -> None:
         logger.info("Initializing QAPossibilityChecker")
         self.output_pydantic_class = QAPossibilityCheckerOutput
@@ -26,6 +27,7 @@ class QAPossibilityChecker:
         self.image_file_id = image_file_id 
         self.llm = llm,
         self.message_callback = message_callback
+        self.cache_scope = cache_scope
 
     async def run_agent(self) -> QAPossibilityCheckerOutput:
 
@@ -43,7 +45,8 @@ class QAPossibilityChecker:
                 "image_file_id": self.image_file_id
             },
             model_name=self.llm,
-            message_callback=self.message_callback
+            message_callback=self.message_callback,
+            cache_scope=self.cache_scope
         )
 
         # Log the intent classification and QA possibility results
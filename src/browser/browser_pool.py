@@ -0,0 +1,347 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from browser_use.browser.browser import BrowserConfig
+from browser_use.browser.context import BrowserContextConfig
+from playwright.async_api import Playwright, async_playwright
+
+from .custom_browser import CustomBrowser
+from .custom_context import CustomBrowserContext
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# Switch Chromium ignores, it only lets us find the process of a pooled browser to measure its memory
+POOL_MARKER_ARG = "--browser-pool-slot"
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+@dataclass
+class BrowserPoolConfig:
+    """Size and recycling rules of the browser pool, the defaults come from the BROWSER_POOL_* env variables"""
+
+    size: int = field(default_factory=lambda: _env_int("BROWSER_POOL_SIZE", 1))
+    # Relaunch a browser after it ran this many tasks
+    max_tasks_per_browser: int = field(default_factory=lambda: _env_int("BROWSER_POOL_MAX_TASKS", 20))
+    # Relaunch a browser when it (with all its child processes) uses more memory than this, needs psutil
+    max_memory_mb: Optional[int] = field(default_factory=lambda: _env_int("BROWSER_POOL_MAX_MEMORY_MB", None))
+    health_check_interval: float = field(default_factory=lambda: _env_float("BROWSER_POOL_HEALTH_CHECK_INTERVAL", 30.0))
+    health_check_timeout: float = 5.0
+    acquire_timeout: float = field(default_factory=lambda: _env_float("BROWSER_POOL_ACQUIRE_TIMEOUT", 300.0))
+    video_dir: str = os.path.join("/app", "src", "outputdata", "videos")
+
+
+@dataclass
+class BrowserLease:
+    """A warm browser and a fresh context that belong to the caller until the lease is returned to the pool"""
+
+    browser: CustomBrowser
+    browser_context: CustomBrowserContext
+    slot_id: int
+
+
+class _PoolSlot:
+    def __init__(self, slot_id: int):
+        self.slot_id = slot_id
+        self.marker = f"{POOL_MARKER_ARG}={uuid.uuid4().hex}"
+        self.browser: Optional[CustomBrowser] = None
+        self.context: Optional[CustomBrowserContext] = None
+        self.tasks = 0
+
+
+class BrowserPool:
+    """
+    Keeps `size` Chromium processes running, each with an isolated context that is created before it is needed.
+
+    A lease hands out one browser with its context. When the lease is returned the context is closed (which saves its
+    videos), the browser is relaunched if it ran too many tasks, uses too much memory or is unhealthy, and a new context
+    is created in the background. Idle browsers are health checked every `health_check_interval` seconds.
+    """
+
+    def __init__(
+            self,
+            browser_config: BrowserConfig,
+            context_config: BrowserContextConfig | None = None,
+            pool_config: BrowserPoolConfig | None = None,
+    ):
+        self.browser_config = browser_config
+        self.context_config = context_config
+        self.pool_config = pool_config or BrowserPoolConfig()
+
+        self._playwright: Optional[Playwright] = None
+        self._slots: List[_PoolSlot] = []
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._broken: List[_PoolSlot] = []
+        self._resets: Set[asyncio.Task] = set()
+        self._monitor: Optional[asyncio.Task] = None
+        # Launches one browser at a time, so two browsers never race for the remote debugging port
+        self._launch_lock = asyncio.Lock()
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self._started_at: Optional[float] = None
+        # Slot ids of the leases that are out, with the time they were handed out
+        self._leased_at: Dict[int, float] = {}
+        self.leases = 0
+        self.recycles = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    async def start(self):
+        async with self._start_lock:
+            if self._started:
+                return
+            self._playwright = await async_playwright().start()
+            for slot_id in range(self.pool_config.size):
+                slot = _PoolSlot(slot_id)
+                self._slots.append(slot)
+                try:
+                    await self._launch(slot)
+                    self._idle.put_nowait(slot)
+                except Exception as e:
+                    logger.error(f"Failed to launch pooled browser {slot_id}: {e}")
+                    self._broken.append(slot)
+            self._monitor = asyncio.create_task(self._monitor_loop())
+            self._started = True
+            self._started_at = time.monotonic()
+            logger.info(f"Browser pool started with {self._idle.qsize()}/{self.pool_config.size} warm browsers")
+
+    async def acquire(self) -> BrowserLease:
+        """Wait for a healthy idle browser, relaunching the ones that fail their health check"""
+        await self.start()
+        loop = asyncio.get_running_loop()
+        requested_at = time.monotonic()
+        deadline = loop.time() + self.pool_config.acquire_timeout
+        while True:
+            slot = await asyncio.wait_for(self._idle.get(), max(deadline - loop.time(), 0))
+            try:
+                if await self._is_healthy(slot):
+                    break
+                await self._recycle(slot, "failed health check")
+                break
+            except asyncio.CancelledError:
+                # the slot goes back, the next acquire checks it again (and relaunches it if it was half recycled)
+                self._idle.put_nowait(slot)
+                raise
+            except Exception as e:
+                logger.error(f"Failed to relaunch pooled browser {slot.slot_id}: {e}")
+                self._broken.append(slot)
+
+        self.leases += 1
+        now = time.monotonic()
+        self.wait_seconds += now - requested_at
+        self._leased_at[slot.slot_id] = now
+        return BrowserLease(browser=slot.browser, browser_context=slot.context, slot_id=slot.slot_id)
+
+    async def release(self, lease: BrowserLease, healthy: bool = True):
+        """Return a lease, the slot is reset in the background and becomes available again afterwards"""
+        slot = self._slots[lease.slot_id]
+        leased_at = self._leased_at.pop(lease.slot_id, None)
+        if leased_at is not None:
+            self.busy_seconds += time.monotonic() - leased_at
+        task = asyncio.create_task(self._reset(slot, healthy))
+        self._resets.add(task)
+        task.add_done_callback(self._resets.discard)
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[BrowserLease]:
+        lease = await self.acquire()
+        healthy = True
+        try:
+            yield lease
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            await self.release(lease, healthy=healthy)
+
+    async def close(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        if self._resets:
+            await asyncio.gather(*self._resets, return_exceptions=True)
+        for slot in self._slots:
+            await self._close_slot(slot)
+        self._slots.clear()
+        self._broken.clear()
+        self._idle = asyncio.Queue()
+        self._leased_at.clear()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        self._started = False
+
+    @property
+    def stats(self) -> dict:
+        """Counters of the pool, utilization is the share of browser time spent leased since the pool started"""
+        utilization = 0.0
+        if self._started_at is not None and self.pool_config.size:
+            now = time.monotonic()
+            busy = self.busy_seconds + sum(now - leased_at for leased_at in self._leased_at.values())
+            uptime = now - self._started_at
+            utilization = busy / (uptime * self.pool_config.size) if uptime > 0 else 0.0
+        return {
+            "size": self.pool_config.size,
+            "idle": self._idle.qsize(),
+            "in_use": len(self._leased_at),
+            "broken": len(self._broken),
+            "leases": self.leases,
+            "recycles": self.recycles,
+            "utilization": round(utilization, 3),
+            "avg_wait_seconds": round(self.wait_seconds / self.leases, 3) if self.leases else 0.0,
+        }
+
+    async def _launch(self, slot: _PoolSlot):
+        browser_config = self.browser_config.model_copy(
+            update={"extra_browser_args": [*self.browser_config.extra_browser_args, slot.marker]}
+        )
+        browser = CustomBrowser(config=browser_config)
+        async with self._launch_lock:
+            await browser._setup_builtin_browser(self._playwright)
+        slot.browser = browser
+        slot.tasks = 0
+        await self._prepare_context(slot)
+
+    async def _prepare_context(self, slot: _PoolSlot):
+        slot_video_dir = os.path.join(self.pool_config.video_dir, f"pool_{slot.slot_id:02d}")
+        context = await slot.browser.new_context(
+            config=self.context_config,
+            video_dir=slot_video_dir,
+            merged_video_path=os.path.join(self.pool_config.video_dir, f"merged_pool_{slot.slot_id:02d}.webm"),
+        )
+        # Creates the Playwright context and its first page now instead of on the first step of the next task
+        await context.get_session()
+        slot.context = context
+
+    async def _reset(self, slot: _PoolSlot, healthy: bool):
+        try:
+            if slot.context is not None:
+                try:
+                    await slot.context.close()
+                except Exception as e:
+                    logger.warning(f"Failed to close pooled browser context {slot.slot_id}: {e}")
+                slot.context = None
+            slot.tasks += 1
+
+            reason = self._recycle_reason(slot, healthy)
+            if reason:
+                await self._recycle(slot, reason)
+            else:
+                await self._prepare_context(slot)
+            self._idle.put_nowait(slot)
+        except Exception as e:
+            logger.error(f"Failed to reset pooled browser {slot.slot_id}: {e}")
+            self._broken.append(slot)
+
+    def _recycle_reason(self, slot: _PoolSlot, healthy: bool) -> Optional[str]:
+        if not healthy:
+            return "task failed"
+        if slot.browser is None or slot.browser.playwright_browser is None:
+            return "browser is gone"
+        if not slot.browser.playwright_browser.is_connected():
+            return "browser disconnected"
+        if slot.tasks >= self.pool_config.max_tasks_per_browser:
+            return f"ran {slot.tasks} tasks"
+        if self.pool_config.max_memory_mb:
+            memory_mb = self._memory_mb(slot)
+            if memory_mb is not None and memory_mb > self.pool_config.max_memory_mb:
+                return f"uses {memory_mb:.0f}MB of memory"
+        return None
+
+    async def _recycle(self, slot: _PoolSlot, reason: str):
+        logger.info(f"Recycling pooled browser {slot.slot_id}: {reason}")
+        await self._close_slot(slot)
+        await self._launch(slot)
+        self.recycles += 1
+
+    async def _close_slot(self, slot: _PoolSlot):
+        if slot.context is not None:
+            try:
+                await slot.context.close()
+            except Exception as e:
+                logger.debug(f"Failed to close pooled browser context {slot.slot_id}: {e}")
+            slot.context = None
+        if slot.browser is not None:
+            await slot.browser.close()
+            slot.browser = None
+
+    async def _is_healthy(self, slot: _PoolSlot) -> bool:
+        if slot.browser is None or slot.context is None or slot.browser.playwright_browser is None:
+            return False
+        if not slot.browser.playwright_browser.is_connected():
+            return False
+        try:
+            page = await slot.context.get_current_page()
+            await asyncio.wait_for(page.evaluate("1"), self.pool_config.health_check_timeout)
+        except Exception as e:
+            logger.warning(f"Pooled browser {slot.slot_id} failed its health check: {e}")
+            return False
+        return True
+
+    def _memory_mb(self, slot: _PoolSlot) -> Optional[float]:
+        """Resident memory of the browser process and its children (renderers, GPU process), None without psutil"""
+        if psutil is None:
+            return None
+        for proc in psutil.process_iter(["cmdline"]):
+            cmdline = proc.info["cmdline"] or []
+            if slot.marker not in cmdline or any(arg.startswith("--type=") for arg in cmdline):
+                continue
+            try:
+                processes = [proc, *proc.children(recursive=True)]
+                return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+            except psutil.Error:
+                return None
+        return None
+
+    async def _monitor_loop(self):
+        while True:
+            await asyncio.sleep(self.pool_config.health_check_interval)
+            try:
+                await self._check_idle_slots()
+            except Exception as e:
+                logger.error(f"Browser pool health check failed: {e}")
+
+    async def _check_idle_slots(self):
+        # Slots that could not be launched or reset are retried here
+        broken, self._broken = self._broken, []
+        for slot in broken:
+            try:
+                await self._recycle(slot, "relaunching broken browser")
+                self._idle.put_nowait(slot)
+            except Exception as e:
+                logger.error(f"Failed to relaunch pooled browser {slot.slot_id}: {e}")
+                self._broken.append(slot)
+
+        for _ in range(self._idle.qsize()):
+            try:
+                slot = self._idle.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            reason = self._recycle_reason(slot, True) if await self._is_healthy(slot) else "failed health check"
+            if reason:
+                try:
+                    await self._recycle(slot, reason)
+                except Exception as e:
+                    logger.error(f"Failed to relaunch pooled browser {slot.slot_id}: {e}")
+                    self._broken.append(slot)
+                    continue
+            self._idle.put_nowait(slot)
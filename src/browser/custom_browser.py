@@ -36,12 +36,22 @@ class CustomBrowser(Browser):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-    async def new_context(self, config: BrowserContextConfig | None = None) -> CustomBrowserContext:
+    async def new_context(
+            self,
+            config: BrowserContextConfig | None = None,
+            video_dir: str | None = None,
+            merged_video_path: str | None = None,
+    ) -> CustomBrowserContext:
         """Create a browser context"""
         browser_config = self.config.model_dump() if self.config else {}
         context_config = config.model_dump() if config else {}
         merged_config = {**browser_config, **context_config}
-        return CustomBrowserContext(config=BrowserContextConfig(**merged_config), browser=self)
+        return CustomBrowserContext(
+            config=BrowserContextConfig(**merged_config),
+            browser=self,
+            video_dir=video_dir,
+            merged_video_path=merged_video_path,
+        )
 
     async def _setup_builtin_browser(self, playwright: Playwright) -> PlaywrightBrowser:
         """Sets up and returns a Playwright Browser instance with anti-detection measures."""
@@ -19,12 +19,16 @@ logger = logging.getLogger(__name__)
 class CustomBrowserContext(BrowserContext):
     def __init__(self, browser: 'Browser',
                  config: BrowserContextConfig | None = None,
-                 state: Optional[BrowserContextState] = None):
+                 state: Optional[BrowserContextState] = None,
+                 video_dir: Optional[str] = None,
+                 merged_video_path: Optional[str] = None):
         super().__init__(browser=browser, config=config, state=state)
         self._playwright_context: Optional[PlaywrightBrowserContext] = None
         self._playwright_contexts: List[PlaywrightBrowserContext] = []
         self._handled_pages: Set = set()
-        self._base_video_dir = os.path.join("/app", "src", "outputdata", "videos")
+        # Contexts that record at the same time (e.g. pooled browsers) need their own directories
+        self._base_video_dir = video_dir or os.path.join("/app", "src", "outputdata", "videos")
+        self._merged_video_output = merged_video_path or os.path.join("/app", "src", "outputdata", "merged.webm")
 
         self.tab_counter = 0
         self.tab_records: dict = {}
@@ -202,7 +206,7 @@ class CustomBrowserContext(BrowserContext):
         try:
             self._merged_video_path = merge_videos_in_order(
                 base_videos_dir=self._base_video_dir,
-                output_path="/app/src/outputdata/merged.webm"
+                output_path=self._merged_video_output
             )
             if self._merged_video_path:
                 logger.info(f"[DEBUG] Merged video created: {self._merged_video_path}")
@@ -11,6 +11,7 @@ from langchain_core.messages import (
 )
 from pydantic import BaseModel
 
+from browser_use.agent.message_manager.token_counter import TokenCounter, get_token_counter
 from browser_use.agent.message_manager.views import MessageMetadata
 from browser_use.agent.prompts import AgentMessagePrompt
 from browser_use.agent.views import ActionResult, AgentOutput, AgentStepInfo, MessageManagerState
@@ -28,6 +29,8 @@ class MessageManagerSettings(BaseModel):
 	message_context: str | None = None
 	sensitive_data: dict[str, str] | None = None
 	available_file_paths: list[str] | None = None
+	# Picks the tokenizer used to count tokens, the character estimate is used for unknown models
+	model_name: str | None = None
 
 
 class MessageManager:
@@ -37,11 +40,17 @@ class MessageManager:
 		system_message: SystemMessage,
 		settings: MessageManagerSettings = MessageManagerSettings(),
 		state: MessageManagerState = MessageManagerState(),
+		token_counter: TokenCounter | None = None,
 	):
 		self.task = task
 		self.settings = settings
 		self.state = state
 		self.system_prompt = system_message
+		self.token_counter = token_counter or get_token_counter(
+			settings.model_name, settings.estimated_characters_per_token
+		)
+		# Prompt and message of the last state message, lets cut_messages render the state again with fewer elements
+		self._last_state: tuple[AgentMessagePrompt, BaseMessage] | None = None
 
 		# Only initialize messages if state is empty
 		if len(self.state.history.messages) == 0:
@@ -146,13 +155,22 @@ class MessageManager:
 					result = None  # if result in history, we dont want to add it again
 
 		# otherwise add state message and result to next message (which will not stay in memory)
-		state_message = AgentMessagePrompt(
+		prompt = AgentMessagePrompt(
 			state,
 			result,
 			include_attributes=self.settings.include_attributes,
 			step_info=step_info,
-		).get_user_message(use_vision)
+		)
+		# the elements that fit in what is left of the input budget, the least relevant ones are dropped. The screenshot
+		# is not counted here: when the message is over budget, cut_messages drops the image before any text
+		budget = self.settings.max_input_tokens - self.state.history.current_tokens
+		state_message = prompt.get_user_message(
+			use_vision, max_tokens=budget if budget > 0 else None, count_tokens=self._count_line_tokens
+		)
 		self._add_message_with_tokens(state_message)
+		self._last_state = (prompt, state_message)
+		if self.state.history.current_tokens > self.settings.max_input_tokens:
+			self.cut_messages()
 
 	def add_model_output(self, model_output: AgentOutput) -> None:
 		"""Add model output as AI message"""
@@ -191,6 +209,7 @@ class MessageManager:
 			total_input_tokens += m.metadata.tokens
 			logger.debug(f'{m.message.__class__.__name__} - Token count: {m.metadata.tokens}')
 		logger.debug(f'Total input tokens: {total_input_tokens}')
+		logger.debug(f'Token counter: {self.token_counter.stats}')
 
 		return msg
 
@@ -258,8 +277,10 @@ class MessageManager:
 
 	def _count_text_tokens(self, text: str) -> int:
 		"""Count tokens in a text string"""
-		tokens = len(text) // self.settings.estimated_characters_per_token  # Rough estimate if no tokenizer available
-		return tokens
+		return self.token_counter.count(text)
+
+	def _count_line_tokens(self, text: str) -> int:
+		return self.token_counter.count(text, memoize=False)
 
 	def cut_messages(self):
 		"""Get current message list, potentially trimmed to max tokens"""
@@ -289,8 +310,7 @@ class MessageManager:
 		if diff <= 0:
 			return None
 
-		# if still over, remove text from state message proportionally to the number of tokens needed with buffer
-		# Calculate the proportion of content to remove
+		# if still over, cut the state message down to the number of tokens that still fits
 		proportion_to_remove = diff / msg.metadata.tokens
 		if proportion_to_remove > 0.99:
 			raise ValueError(
@@ -298,12 +318,18 @@ class MessageManager:
 				f'proportion_to_remove: {proportion_to_remove}'
 			)
 		logger.debug(
-			f'Removing {proportion_to_remove * 100:.2f}% of the last message  {proportion_to_remove * msg.metadata.tokens:.2f} / {msg.metadata.tokens:.2f} tokens)'
+			f'Removing {proportion_to_remove * 100:.2f}% of the last message  {diff} / {msg.metadata.tokens} tokens)'
 		)
 
-		content = msg.message.content
-		characters_to_remove = int(len(content) * proportion_to_remove)
-		content = content[:-characters_to_remove]
+		max_tokens = msg.metadata.tokens - diff
+		if self._last_state is not None and self._last_state[1] is msg.message:
+			# render the state again without its least relevant elements
+			prompt, _ = self._last_state
+			content = prompt.get_user_message(use_vision=False, max_tokens=max_tokens, count_tokens=self._count_line_tokens).content
+		else:
+			content = msg.message.content
+		# what is left over (e.g. long action results) is cut from the end
+		content = self.token_counter.truncate(content, max_tokens)
 
 		# remove tokens and old long message
 		self.state.history.remove_last_state_message()
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from functools import cache
+
+logger = logging.getLogger(__name__)
+
+# Families whose tokenizer can be loaded from `<BROWSER_USE_TOKENIZERS_DIR>/<family>.json` (a Hugging Face tokenizer.json)
+TOKENIZER_FAMILIES = ('deepseek', 'qwen', 'llama', 'mistral', 'gemma', 'claude', 'gemini')
+
+
+class TokenCounter:
+	"""
+	Counts the tokens of message text, memoized by text so a message that is counted again costs a dict lookup.
+
+	The base class estimates from the number of characters, subclasses use a real tokenizer. `stats` keeps the
+	counting cost and, for tokenizers, how far the character estimate would have been off.
+	"""
+
+	name = 'estimate'
+
+	def __init__(self, estimated_characters_per_token: int = 3, memo_size: int = 256):
+		self.estimated_characters_per_token = estimated_characters_per_token
+		self.memo_size = memo_size
+		self._memo: OrderedDict[str, int] = OrderedDict()
+		self.calls = 0
+		self.memo_hits = 0
+		self.seconds = 0.0
+		self.estimate_error = 0.0  # sum of |estimate - tokens| / tokens over the counted texts
+		self.counted = 0
+
+	def count(self, text: str, memoize: bool = True) -> int:
+		"""Tokens of `text`, pass memoize=False for one-off texts (e.g. single DOM lines) that would flush the memo"""
+		self.calls += 1
+		tokens = self._memo.get(text)
+		if tokens is not None:
+			self.memo_hits += 1
+			self._memo.move_to_end(text)
+			return tokens
+
+		start = time.perf_counter()
+		tokens = self._count(text)
+		self.seconds += time.perf_counter() - start
+		if tokens:
+			self.counted += 1
+			self.estimate_error += abs(self.estimate(text) - tokens) / tokens
+
+		if memoize:
+			self._memo[text] = tokens
+			if len(self._memo) > self.memo_size:
+				self._memo.popitem(last=False)
+		return tokens
+
+	def truncate(self, text: str, max_tokens: int) -> str:
+		"""Longest prefix of `text` that has at most `max_tokens` tokens"""
+		return text[: max(max_tokens, 0) * self.estimated_characters_per_token]
+
+	def estimate(self, text: str) -> int:
+		return len(text) // self.estimated_characters_per_token
+
+	@property
+	def stats(self) -> dict:
+		return {
+			'counter': self.name,
+			'calls': self.calls,
+			'memo_hits': self.memo_hits,
+			'seconds': round(self.seconds, 4),
+			'estimate_error': round(self.estimate_error / self.counted, 3) if self.counted else 0.0,
+		}
+
+	def _count(self, text: str) -> int:
+		return self.estimate(text)
+
+
+class TiktokenCounter(TokenCounter):
+	def __init__(self, encoding, **kwargs):
+		super().__init__(**kwargs)
+		self.encoding = encoding
+		self.name = f'tiktoken:{encoding.name}'
+
+	def truncate(self, text: str, max_tokens: int) -> str:
+		tokens = self.encoding.encode(text, disallowed_special=())
+		return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[: max(max_tokens, 0)])
+
+	def _count(self, text: str) -> int:
+		return len(self.encoding.encode(text, disallowed_special=()))
+
+
+class HuggingFaceTokenCounter(TokenCounter):
+	def __init__(self, tokenizer, name: str, **kwargs):
+		super().__init__(**kwargs)
+		self.tokenizer = tokenizer
+		self.name = f'tokenizers:{name}'
+
+	def truncate(self, text: str, max_tokens: int) -> str:
+		encoding = self.tokenizer.encode(text, add_special_tokens=False)
+		if len(encoding.ids) <= max_tokens:
+			return text
+		if max_tokens <= 0:
+			return ''
+		return text[: encoding.offsets[max_tokens - 1][1]]
+
+	def _count(self, text: str) -> int:
+		return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def _tiktoken_cache_path(encoding_name: str) -> str | None:
+	"""Where tiktoken caches the BPE file of an encoding (see tiktoken.load.read_file_cached), None without a cache"""
+	import hashlib
+	import tempfile
+
+	cache_dir = os.getenv('TIKTOKEN_CACHE_DIR', os.getenv('DATA_GYM_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'data-gym-cache')))
+	if not cache_dir:
+		return None
+	blobpath = f'https://openaipublic.blob.core.windows.net/encodings/{encoding_name}.tiktoken'
+	return os.path.join(cache_dir, hashlib.sha1(blobpath.encode()).hexdigest())
+
+
+@cache
+def _tiktoken_encoding(model_name: str):
+	"""
+	Encoding of an OpenAI model if it is available offline. tiktoken downloads missing BPE files, which would block the
+	event loop the agent runs on, so an encoding that is neither loaded nor in tiktoken's cache is left out
+	"""
+	try:
+		import tiktoken
+		from tiktoken.model import encoding_name_for_model
+		from tiktoken.registry import ENCODINGS
+
+		encoding_name = encoding_name_for_model(model_name)
+		if encoding_name not in ENCODINGS:
+			cache_path = _tiktoken_cache_path(encoding_name)
+			if cache_path is None or not os.path.exists(cache_path):
+				logger.debug(f'tiktoken encoding {encoding_name} of {model_name} is not cached, set TIKTOKEN_CACHE_DIR to a warm cache')
+				return None
+		return tiktoken.get_encoding(encoding_name)
+	except Exception as e:
+		# unknown model, tiktoken not installed, or an unreadable cache
+		logger.debug(f'No tiktoken encoding for {model_name}: {e}')
+		return None
+
+
+@cache
+def _hf_tokenizer(path: str):
+	try:
+		from tokenizers import Tokenizer
+
+		return Tokenizer.from_file(path)
+	except Exception as e:
+		logger.debug(f'Could not load tokenizer {path}: {e}')
+		return None
+
+
+def get_token_counter(model_name: str | None, estimated_characters_per_token: int = 3) -> TokenCounter:
+	"""
+	Token counter for a model: tiktoken for OpenAI models, a local Hugging Face tokenizer from
+	BROWSER_USE_TOKENIZERS_DIR for the other families, and the character estimate when neither is available offline
+	"""
+	name = (model_name or '').lower()
+	if name and name != 'unknown':
+		encoding = _tiktoken_encoding(name)
+		if encoding is not None:
+			return TiktokenCounter(encoding, estimated_characters_per_token=estimated_characters_per_token)
+
+		tokenizers_dir = os.getenv('BROWSER_USE_TOKENIZERS_DIR')
+		family = next((family for family in TOKENIZER_FAMILIES if family in name), None)
+		if tokenizers_dir and family:
+			tokenizer = _hf_tokenizer(os.path.join(tokenizers_dir, f'{family}.json'))
+			if tokenizer is not None:
+				return HuggingFaceTokenCounter(tokenizer, family, estimated_characters_per_token=estimated_characters_per_token)
+
+	return TokenCounter(estimated_characters_per_token=estimated_characters_per_token)
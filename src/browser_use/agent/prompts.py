@@ -1,9 +1,13 @@
 import importlib.resources
+from collections.abc import Callable
 from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 
 from langchain_core.messages import HumanMessage, SystemMessage
 
+from browser_use.browser.screenshot import screenshot_mime_type
+from browser_use.dom.trimming import trim_clickable_elements
+
 if TYPE_CHECKING:
 	from browser_use.agent.views import ActionResult, AgentStepInfo
 	from browser_use.browser.views import BrowserState
@@ -72,9 +76,44 @@ class AgentMessagePrompt:
 		self.include_attributes = include_attributes or []
 		self.step_info = step_info
 
-	def get_user_message(self, use_vision: bool = True) -> HumanMessage:
+	def get_user_message(
+		self,
+		use_vision: bool = True,
+		max_tokens: int | None = None,
+		count_tokens: Callable[[str], int] | None = None,
+	) -> HumanMessage:
+		"""State message, its text held to `max_tokens` by dropping the least relevant elements when a counter is given"""
 		elements_text = self.state.element_tree.clickable_elements_to_string(include_attributes=self.include_attributes)
+		state_description = self._state_description(elements_text)
+
+		if max_tokens is not None and count_tokens is not None:
+			overflow = count_tokens(state_description) - max_tokens
+			if overflow > 0:
+				elements_text = trim_clickable_elements(
+					self.state.element_tree,
+					count_tokens(elements_text) - overflow,
+					count_tokens,
+					include_attributes=self.include_attributes,
+				)
+				state_description = self._state_description(elements_text)
+
+		if self.state.screenshot and use_vision is True:
+			# Format message for vision model
+			return HumanMessage(
+				content=[
+					{'type': 'text', 'text': state_description},
+					{
+						'type': 'image_url',
+						'image_url': {
+							'url': f'data:{screenshot_mime_type(self.state.screenshot)};base64,{self.state.screenshot}'
+						},  # , 'detail': 'low'
+					},
+				]
+			)
 
+		return HumanMessage(content=state_description)
+
+	def _state_description(self, elements_text: str) -> str:
 		has_content_above = (self.state.pixels_above or 0) > 0
 		has_content_below = (self.state.pixels_below or 0) > 0
 
@@ -122,19 +161,7 @@ Interactive elements from top layer of the current page inside the viewport:
 					error = result.error.split('\n')[-1]
 					state_description += f'\nAction error {i + 1}/{len(self.result)}: ...{error}'
 
-		if self.state.screenshot and use_vision is True:
-			# Format message for vision model
-			return HumanMessage(
-				content=[
-					{'type': 'text', 'text': state_description},
-					{
-						'type': 'image_url',
-						'image_url': {'url': f'data:image/png;base64,{self.state.screenshot}'},  # , 'detail': 'low'
-					},
-				]
-			)
-
-		return HumanMessage(content=state_description)
+		return state_description
 
 
 class PlannerPrompt(SystemPrompt):
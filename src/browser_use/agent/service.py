@@ -62,7 +62,7 @@ from browser_use.telemetry.views import (
 )
 from browser_use.utils import check_env_variables, time_execution_async, time_execution_sync
 
-from src.outputdata.output_data import write_data_to_file
+from src.outputdata.output_data import awrite_data_to_file
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -72,7 +72,7 @@ logger = logging.getLogger(__name__)
 SKIP_LLM_API_KEY_VERIFICATION = os.environ.get('SKIP_LLM_API_KEY_VERIFICATION', 'false').lower()[0] in 'ty1'
 
 
-def log_response(response: AgentOutput) -> None:
+async def log_response(response: AgentOutput) -> None:
 	"""Utility function to log the model's response."""
 	logger.info(f"🔄 [DEBUG] log_response function ENTERED")
 
@@ -118,8 +118,8 @@ def log_response(response: AgentOutput) -> None:
 				break
 		
 		logger.info(f"[SERVICE] Writing data to file for agent 'Browser Use Agent'")
-		logger.info(f"[SERVICE] Function type: {type(write_data_to_file)}")
-		write_data_to_file(
+		# the execution log is rewritten on every step, off the event loop
+		await awrite_data_to_file(
 			agents_name="Browser Use Agent",
 			evaluation=response.current_state.evaluation_previous_goal,
 			memory=response.current_state.memory,
@@ -306,6 +306,7 @@ class Agent(Generic[Context]):
 				message_context=self.settings.message_context,
 				sensitive_data=sensitive_data,
 				available_file_paths=self.settings.available_file_paths,
+				model_name=self.model_name,
 			),
 			state=self.state.message_manager_state,
 		)
@@ -814,7 +815,7 @@ class Agent(Generic[Context]):
 			parsed.action = parsed.action[: self.settings.max_actions_per_step]
 
 		if not (hasattr(self.state, 'paused') and (self.state.paused or self.state.stopped)):
-			log_response(parsed)
+			await log_response(parsed)
 
 		return parsed
 
@@ -3,7 +3,6 @@ Playwright browser on steroids.
 """
 
 import asyncio
-import base64
 import gc
 import json
 import logging
@@ -11,8 +10,10 @@ import os
 import re
 import time
 import uuid
+import weakref
+from collections.abc import Awaitable
 from dataclasses import dataclass
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal, TypeVar
 
 import anyio
 from playwright._impl._errors import TimeoutError
@@ -27,6 +28,9 @@ from playwright.async_api import (
 )
 from pydantic import BaseModel, ConfigDict, Field
 
+from browser_use.browser.network_idle import NetworkIdleTracker
+from browser_use.browser.page_load_wait import PageLoadWaitPolicy, get_page_load_wait_policy
+from browser_use.browser.screenshot import ScreenshotMetrics, is_pillow_available, process_screenshot
 from browser_use.browser.views import (
 	BrowserError,
 	BrowserState,
@@ -34,8 +38,8 @@ from browser_use.browser.views import (
 	URLNotAllowedError,
 )
 from browser_use.dom.clickable_element_processor.service import ClickableElementProcessor
-from browser_use.dom.service import DomService
-from browser_use.dom.views import DOMElementNode, SelectorMap
+from browser_use.dom.service import DomService, get_build_dom_tree_init_script
+from browser_use.dom.views import DOMElementNode, DOMTreeCache, SelectorMap
 from browser_use.utils import time_execution_async, time_execution_sync
 
 if TYPE_CHECKING:
@@ -45,6 +49,8 @@ logger = logging.getLogger(__name__)
 
 import platform
 
+T = TypeVar('T')
+
 BROWSER_NAVBAR_HEIGHT = {
 	'windows': 85,
 	'darwin': 80,
@@ -52,6 +58,7 @@ BROWSER_NAVBAR_HEIGHT = {
 }.get(platform.system().lower(), 85)
 
 _GLOB_WARNING_SHOWN = False
+_PILLOW_WARNING_SHOWN = False
 
 
 class BrowserContextConfig(BaseModel):
@@ -75,6 +82,9 @@ class BrowserContextConfig(BaseModel):
 	    maximum_wait_page_load_time: 5.0
 	        Maximum time to wait for page load before proceeding anyway
 
+	    page_load_wait_policy: 'fixed'
+	        How long to wait for the page once the network is idle. 'fixed' waits until minimum_wait_page_load_time has passed. 'adaptive' waits for the DOM to stop changing, bounded by the settle times observed on the domain, and skips the wait entirely when the last action changed neither the document, the DOM nor the network. Pass a PageLoadWaitPolicy instance to plug in your own policy, policies report the wait time they saved (saved_seconds).
+
 	    wait_between_actions: 1.0
 	        Time to wait between multiple per step actions
 
@@ -104,9 +114,27 @@ class BrowserContextConfig(BaseModel):
 	    highlight_elements: True
 	        Highlight elements in the DOM on the screen
 
+	    screenshot_format: 'png'
+	        Image format of the screenshots sent to the LLM: 'png', 'jpeg' or 'webp'. webp (and any resizing) needs pillow.
+
+	    screenshot_quality: None
+	        Quality (0-100) for jpeg and webp screenshots. None uses the encoder default.
+
+	    screenshot_max_dimension: None
+	        Downscale screenshots so that their longest side is at most this many pixels, e.g. 1280 for a 1920x1080 window.
+
+	    screenshot_reuse_threshold: None
+	        Send the previous screenshot again if the perceptual hash (256 bits) of the viewport differs in at most this many bits from the last one on the same URL. 0 only reuses frames that look identical at thumbnail size. None always sends a fresh screenshot. Size and encode time of the screenshots are recorded in BrowserContext.screenshot_metrics.
+
 	    viewport_expansion: 0
 	        Viewport expansion in pixels. This amount will increase the number of elements which are included in the state what the LLM will see. If set to -1, all elements will be included (this leads to high token usage). If set to 0, only the elements which are visible in the viewport will be included.
 
+	    incremental_dom_snapshots: False
+	        Keep a snapshot agent with a MutationObserver alive in every page. The page then only sends the nodes that changed since the previous snapshot (keyed by stable node ids) and the cached DOM tree is patched in place. Snapshots of an unchanged page skip the DOM traversal entirely.
+
+	    dom_transfer_format: 'json'
+	        How the DOM snapshot is sent from the page. 'json' sends one object per node. 'packed' sends interned strings and typed-array columns (flags, parent indices, ...) and only keeps attributes of highlighted elements and file inputs, which is much cheaper to serialize and parse on large pages. Ignored when incremental_dom_snapshots is enabled.
+
 	    allowed_domains: None
 	        List of allowed domains that can be accessed. If None, all domains are allowed.
 	        Example: ['example.com', 'api.example.com']
@@ -150,6 +178,7 @@ class BrowserContextConfig(BaseModel):
 	minimum_wait_page_load_time: float = 0.25
 	wait_for_network_idle_page_load_time: float = 0.5
 	maximum_wait_page_load_time: float = 5
+	page_load_wait_policy: Literal['fixed', 'adaptive'] | PageLoadWaitPolicy = 'fixed'
 	wait_between_actions: float = 0.5
 
 	disable_security: bool = False  # disable_security=True is dangerous as any malicious URL visited could embed an iframe for the user's bank, and use their cookies to steal money
@@ -166,7 +195,13 @@ class BrowserContextConfig(BaseModel):
 	user_agent: str | None = None
 
 	highlight_elements: bool = True
+	screenshot_format: Literal['png', 'jpeg', 'webp'] = 'png'
+	screenshot_quality: int | None = Field(default=None, ge=0, le=100)
+	screenshot_max_dimension: int | None = Field(default=None, gt=0)
+	screenshot_reuse_threshold: int | None = Field(default=None, ge=0)
 	viewport_expansion: int = 0
+	incremental_dom_snapshots: bool = False
+	dom_transfer_format: Literal['json', 'packed'] = 'json'
 	allowed_domains: list[str] | None = None
 	include_dynamic_attributes: bool = True
 	http_credentials: dict[str, str] | None = None
@@ -203,6 +238,15 @@ class BrowserSession:
 
 		self.cached_state_clickable_elements_hashes: CachedStateClickableElementsHashes | None = None
 
+		# Per-page mirrors of the in-page DOM snapshot agent (only used with incremental_dom_snapshots)
+		self.dom_tree_caches: weakref.WeakKeyDictionary[Page, DOMTreeCache] = weakref.WeakKeyDictionary()
+
+		# (url, perceptual hash, base64 image) of the last viewport screenshot, only kept with screenshot_reuse_threshold
+		self.last_screenshot: tuple[str, int, str] | None = None
+
+		# Per-page in-flight request tracking, the listeners live as long as the page
+		self.network_idle_trackers: weakref.WeakKeyDictionary[Page, NetworkIdleTracker] = weakref.WeakKeyDictionary()
+
 
 @dataclass
 class BrowserContextState:
@@ -230,6 +274,13 @@ class BrowserContext:
 		# Initialize these as None - they'll be set up when needed
 		self.session: BrowserSession | None = None
 
+		self.page_load_wait_policy = get_page_load_wait_policy(self.config.page_load_wait_policy)
+
+		self.screenshot_metrics = ScreenshotMetrics()
+
+		# Seconds spent in each probe of the last state update
+		self.state_probe_timings: dict[str, float] = {}
+
 		# Tab references - separate concepts for agent intent and browser state
 		self.agent_current_page: Page | None = None  # The tab the agent intends to interact with
 		self.human_current_page: Page | None = None  # The tab currently shown in the browser UI
@@ -308,6 +359,9 @@ class BrowserContext:
 		context = await self._create_context(playwright_browser)
 		self._page_event_handler = None
 
+		# parse buildDomTree.js once per document instead of shipping the source with every state request
+		await context.add_init_script(get_build_dom_tree_init_script())
+
 		# auto-attach the foregrounding-detection listener to all new pages opened
 		context.on('page', self._add_tab_foregrounding_listener)
 
@@ -319,6 +373,9 @@ class BrowserContext:
 			cached_state=None,
 		)
 
+		# track the network of new pages from their first request on
+		context.on('page', self._get_network_idle_tracker)
+
 		current_page = None
 		if self.browser.config.cdp_url:
 			# If we have a saved target ID, try to find and activate it
@@ -740,186 +797,47 @@ class BrowserContext:
 		except Exception as e:
 			logger.debug(f'Failed to set viewport size for page: {e}')
 
+	def _get_network_idle_tracker(self, page: Page) -> NetworkIdleTracker:
+		"""Get the network idle tracker of a page, attaching its listeners the first time"""
+		session = self.session
+		assert session is not None
+		tracker = session.network_idle_trackers.get(page)
+		if tracker is None:
+			tracker = NetworkIdleTracker(idle_time=self.config.wait_for_network_idle_page_load_time)
+			tracker.attach(page)
+			session.network_idle_trackers[page] = tracker
+		return tracker
+
 	async def _wait_for_stable_network(self):
 		page = await self.get_agent_current_page()
+		tracker = self._get_network_idle_tracker(page)
 
-		pending_requests = set()
-		last_activity = asyncio.get_event_loop().time()
-
-		# Define relevant resource types and content types
-		RELEVANT_RESOURCE_TYPES = {
-			'document',
-			'stylesheet',
-			'image',
-			'font',
-			'script',
-			'iframe',
-		}
-
-		RELEVANT_CONTENT_TYPES = {
-			'text/html',
-			'text/css',
-			'application/javascript',
-			'image/',
-			'font/',
-			'application/json',
-		}
-
-		# Additional patterns to filter out
-		IGNORED_URL_PATTERNS = {
-			# Analytics and tracking
-			'analytics',
-			'tracking',
-			'telemetry',
-			'beacon',
-			'metrics',
-			# Ad-related
-			'doubleclick',
-			'adsystem',
-			'adserver',
-			'advertising',
-			# Social media widgets
-			'facebook.com/plugins',
-			'platform.twitter',
-			'linkedin.com/embed',
-			# Live chat and support
-			'livechat',
-			'zendesk',
-			'intercom',
-			'crisp.chat',
-			'hotjar',
-			# Push notifications
-			'push-notifications',
-			'onesignal',
-			'pushwoosh',
-			# Background sync/heartbeat
-			'heartbeat',
-			'ping',
-			'alive',
-			# WebRTC and streaming
-			'webrtc',
-			'rtmp://',
-			'wss://',
-			# Common CDNs for dynamic content
-			'cloudfront.net',
-			'fastly.net',
-		}
-
-		async def on_request(request):
-			# Filter by resource type
-			if request.resource_type not in RELEVANT_RESOURCE_TYPES:
-				return
-
-			# Filter out streaming, websocket, and other real-time requests
-			if request.resource_type in {
-				'websocket',
-				'media',
-				'eventsource',
-				'manifest',
-				'other',
-			}:
-				return
-
-			# Filter out by URL patterns
-			url = request.url.lower()
-			if any(pattern in url for pattern in IGNORED_URL_PATTERNS):
-				return
-
-			# Filter out data URLs and blob URLs
-			if url.startswith(('data:', 'blob:')):
-				return
-
-			# Filter out requests with certain headers
-			headers = request.headers
-			if headers.get('purpose') == 'prefetch' or headers.get('sec-fetch-dest') in [
-				'video',
-				'audio',
-			]:
-				return
-
-			nonlocal last_activity
-			pending_requests.add(request)
-			last_activity = asyncio.get_event_loop().time()
-			# logger.debug(f'Request started: {request.url} ({request.resource_type})')
-
-		async def on_response(response):
-			request = response.request
-			if request not in pending_requests:
-				return
-
-			# Filter by content type if available
-			content_type = response.headers.get('content-type', '').lower()
-
-			# Skip if content type indicates streaming or real-time data
-			if any(
-				t in content_type
-				for t in [
-					'streaming',
-					'video',
-					'audio',
-					'webm',
-					'mp4',
-					'event-stream',
-					'websocket',
-					'protobuf',
-				]
-			):
-				pending_requests.remove(request)
-				return
-
-			# Only process relevant content types
-			if not any(ct in content_type for ct in RELEVANT_CONTENT_TYPES):
-				pending_requests.remove(request)
-				return
-
-			# Skip if response is too large (likely not essential for page load)
-			content_length = response.headers.get('content-length')
-			if content_length and int(content_length) > 5 * 1024 * 1024:  # 5MB
-				pending_requests.remove(request)
-				return
-
-			nonlocal last_activity
-			pending_requests.remove(request)
-			last_activity = asyncio.get_event_loop().time()
-			# logger.debug(f'Request resolved: {request.url} ({content_type})')
-
-		# Attach event listeners
-		page.on('request', on_request)
-		page.on('response', on_response)
-
-		try:
-			# Wait for idle time
-			start_time = asyncio.get_event_loop().time()
-			while True:
-				await asyncio.sleep(0.1)
-				now = asyncio.get_event_loop().time()
-				if len(pending_requests) == 0 and (now - last_activity) >= self.config.wait_for_network_idle_page_load_time:
-					break
-				if now - start_time > self.config.maximum_wait_page_load_time:
-					logger.debug(
-						f'Network timeout after {self.config.maximum_wait_page_load_time}s with {len(pending_requests)} '
-						f'pending requests: {[r.url for r in pending_requests]}'
-					)
-					break
-
-		finally:
-			# Clean up event listeners
-			page.remove_listener('request', on_request)
-			page.remove_listener('response', on_response)
+		if not await tracker.wait_for_idle(timeout=self.config.maximum_wait_page_load_time):
+			return
 
 		logger.debug(f'⚖️  Network stabilized for {self.config.wait_for_network_idle_page_load_time} seconds')
 
 	async def _wait_for_page_and_frames_load(self, timeout_overwrite: float | None = None):
 		"""
 		Ensures page is fully loaded before continuing.
-		Waits for either network to be idle or minimum WAIT_TIME, whichever is longer.
+		Waits for either network to be idle or minimum WAIT_TIME, whichever is longer (see page_load_wait_policy).
 		Also checks if the loaded URL is allowed.
 		"""
 		# Start timing
 		start_time = time.time()
+		minimum_wait = timeout_overwrite or self.config.minimum_wait_page_load_time
 
 		# Wait for page load
+		page = None
+		tracker = None
 		try:
+			page = await self.get_agent_current_page()
+			tracker = self._get_network_idle_tracker(page)
+			if await self.page_load_wait_policy.can_skip_wait(page, tracker, minimum_wait):
+				# nothing changed since the last state, the page is as loaded as it was then
+				await self._check_and_handle_navigation(page)
+				return
+
 			await self._wait_for_stable_network()
 
 			# Check if the loaded URL is allowed
@@ -931,15 +849,13 @@ class BrowserContext:
 			logger.warning('⚠️  Page load failed, continuing...')
 			pass
 
-		# Calculate remaining time to meet minimum WAIT_TIME
-		elapsed = time.time() - start_time
-		remaining = max((timeout_overwrite or self.config.minimum_wait_page_load_time) - elapsed, 0)
-
-		logger.debug(f'--Page loaded in {elapsed:.2f} seconds, waiting for additional {remaining:.2f} seconds')
-
-		# Sleep remaining time if needed
-		if remaining > 0:
-			await asyncio.sleep(remaining)
+		await self.page_load_wait_policy.wait(
+			page,
+			tracker,
+			elapsed=time.time() - start_time,
+			minimum_wait=minimum_wait,
+			maximum_wait=self.config.maximum_wait_page_load_time,
+		)
 
 	def _is_url_allowed(self, url: str) -> bool:
 		"""
@@ -1219,15 +1135,42 @@ class BrowserContext:
 			raise BrowserError('Browser closed: no valid pages available')
 
 		try:
-			await self.remove_highlights()
-			dom_service = DomService(page)
-			content = await dom_service.get_clickable_elements(
-				focus_element=focus_element,
-				viewport_expansion=self.config.viewport_expansion,
-				highlight_elements=self.config.highlight_elements,
-			)
-
-			tabs_info = await self.get_tabs_info()
+			timings: dict[str, float] = {}
+			tree_cache = session.dom_tree_caches.setdefault(page, DOMTreeCache()) if self.config.incremental_dom_snapshots else None
+			dom_service = DomService(page, tree_cache=tree_cache, packed=self.config.dom_transfer_format == 'packed')
+
+			async def get_content_and_screenshot():
+				# the screenshot has to show the highlights drawn while collecting the clickable elements
+				await self._timed_probe(timings, 'remove_highlights', self.remove_highlights())
+				content = await self._timed_probe(
+					timings,
+					'clickable_elements',
+					dom_service.get_clickable_elements(
+						focus_element=focus_element,
+						viewport_expansion=self.config.viewport_expansion,
+						highlight_elements=self.config.highlight_elements,
+					),
+				)
+				screenshot_b64 = await self._timed_probe(timings, 'screenshot', self.take_screenshot())
+				return content, screenshot_b64
+
+			# The other probes don't depend on the DOM, run them while it is being collected
+			probes = [
+				asyncio.ensure_future(get_content_and_screenshot()),
+				asyncio.ensure_future(self._timed_probe(timings, 'tabs_info', self.get_tabs_info())),
+				asyncio.ensure_future(self._timed_probe(timings, 'scroll_info', self.get_scroll_info(page))),
+				asyncio.ensure_future(self._timed_probe(timings, 'title', page.title())),
+			]
+			try:
+				(content, screenshot_b64), tabs_info, (pixels_above, pixels_below), title = await asyncio.gather(*probes)
+			except BaseException:
+				# a failed probe must not leave the others running against the page
+				for probe in probes:
+					probe.cancel()
+				await asyncio.gather(*probes, return_exceptions=True)
+				raise
+			self.state_probe_timings = timings
+			logger.debug('State probe timings: ' + ', '.join(f'{name} {seconds:.2f}s' for name, seconds in timings.items()))
 
 			# Get all cross-origin iframes within the page and open them in new tabs
 			# mark the titles of the new tabs so the LLM knows to check them for additional content
@@ -1249,9 +1192,6 @@ class BrowserContext:
 			# 		)
 			# 	)
 
-			screenshot_b64 = await self.take_screenshot()
-			pixels_above, pixels_below = await self.get_scroll_info(page)
-
 			# Find the agent's active tab ID
 			agent_current_page_id = 0
 			if self.agent_current_page:
@@ -1264,7 +1204,7 @@ class BrowserContext:
 				element_tree=content.element_tree,
 				selector_map=content.selector_map,
 				url=page.url,
-				title=await page.title(),
+				title=title,
 				tabs=tabs_info,
 				screenshot=screenshot_b64,
 				pixels_above=pixels_above,
@@ -1279,29 +1219,80 @@ class BrowserContext:
 				return self.current_state
 			raise
 
+	@staticmethod
+	async def _timed_probe(timings: dict[str, float], name: str, probe: Awaitable[T]) -> T:
+		start_time = time.time()
+		try:
+			return await probe
+		finally:
+			timings[name] = time.time() - start_time
+
 	# region - Browser Actions
 	@time_execution_async('--take_screenshot')
 	async def take_screenshot(self, full_page: bool = False) -> str:
 		"""
 		Returns a base64 encoded screenshot of the current page.
+
+		Format, size and reuse of unchanged frames follow the screenshot_* options of the config.
 		"""
 		page = await self.get_agent_current_page()
+		session = await self.get_session()
 
 		# We no longer force tabs to the foreground as it disrupts user focus
 		# await page.bring_to_front()
 		await page.wait_for_load_state()
 
+		image_format = self.config.screenshot_format
+		# playwright only captures png and jpeg at full resolution, everything else is done by pillow
+		reencode = image_format == 'webp' or self.config.screenshot_max_dimension is not None
+		reuse_threshold = self.config.screenshot_reuse_threshold if not full_page else None
+		if (reencode or reuse_threshold is not None) and not is_pillow_available():
+			global _PILLOW_WARNING_SHOWN
+			if not _PILLOW_WARNING_SHOWN:
+				logger.warning('⚠️  Pillow is not installed, screenshots are not resized, re-encoded or reused')
+				_PILLOW_WARNING_SHOWN = True
+			image_format = 'png' if image_format == 'webp' else image_format
+			reencode = False
+			reuse_threshold = None
+
+		capture_format = 'png' if reencode else image_format
 		screenshot = await page.screenshot(
 			full_page=full_page,
 			animations='disabled',
 			caret='initial',
+			type=capture_format,
+			quality=self.config.screenshot_quality if capture_format == 'jpeg' else None,
+		)
+
+		previous = session.last_screenshot if reuse_threshold is not None else None
+		start_time = time.time()
+		processed = await asyncio.to_thread(
+			process_screenshot,
+			screenshot,
+			image_format,
+			self.config.screenshot_quality,
+			self.config.screenshot_max_dimension,
+			reencode,
+			previous_hash=previous[1] if previous and previous[0] == page.url else None,
+			reuse_threshold=reuse_threshold,
 		)
+		encode_seconds = time.time() - start_time
 
-		screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
+		if processed.screenshot_b64 is None:
+			# the viewport looks the same as in the previous screenshot, send that one again
+			assert previous is not None
+			self.screenshot_metrics.record(0, encode_seconds, reused=True)
+			logger.debug(f'📸 Screenshot unchanged, reusing the previous one ({encode_seconds:.2f}s to compare)')
+			return previous[2]
+
+		if processed.perceptual_hash is not None:
+			session.last_screenshot = (page.url, processed.perceptual_hash, processed.screenshot_b64)
+		self.screenshot_metrics.record(processed.size, encode_seconds, reused=False)
+		logger.debug(f'📸 Screenshot: {processed.size / 1024:.0f} KB {image_format}, encoded in {encode_seconds:.2f}s')
 
 		# await self.remove_highlights()
 
-		return screenshot_b64
+		return processed.screenshot_b64
 
 	@time_execution_async('--remove_highlights')
 	async def remove_highlights(self):
@@ -1764,18 +1755,17 @@ class BrowserContext:
 		"""Get information about all tabs"""
 		session = await self.get_session()
 
-		tabs_info = []
-		for page_id, page in enumerate(session.context.pages):
+		async def get_tab_info(page_id: int, page: Page) -> TabInfo:
 			try:
-				tab_info = TabInfo(page_id=page_id, url=page.url, title=await asyncio.wait_for(page.title(), timeout=1))
-			except TimeoutError:
+				return TabInfo(page_id=page_id, url=page.url, title=await asyncio.wait_for(page.title(), timeout=1))
+			except (TimeoutError, asyncio.TimeoutError):
 				# page.title() can hang forever on tabs that are crashed/disappeared/about:blank
 				# we dont want to try automating those tabs because they will hang the whole script
 				logger.debug('⚠  Failed to get tab info for tab #%s: %s (ignoring)', page_id, page.url)
-				tab_info = TabInfo(page_id=page_id, url='about:blank', title='ignore this tab and do not use it')
-			tabs_info.append(tab_info)
+				return TabInfo(page_id=page_id, url='about:blank', title='ignore this tab and do not use it')
 
-		return tabs_info
+		# titles are independent round trips, a hanging tab then costs the timeout once instead of once per tab
+		return list(await asyncio.gather(*(get_tab_info(page_id, page) for page_id, page in enumerate(session.context.pages))))
 
 	@time_execution_async('--switch_to_tab')
 	async def switch_to_tab(self, page_id: int) -> None:
@@ -1904,9 +1894,9 @@ class BrowserContext:
 
 	async def get_scroll_info(self, page: Page) -> tuple[int, int]:
 		"""Get scroll position information for the current page."""
-		scroll_y = await page.evaluate('window.scrollY')
-		viewport_height = await page.evaluate('window.innerHeight')
-		total_height = await page.evaluate('document.documentElement.scrollHeight')
+		scroll_y, viewport_height, total_height = await page.evaluate(
+			'[window.scrollY, window.innerHeight, document.documentElement.scrollHeight]'
+		)
 		pixels_above = scroll_y
 		pixels_below = total_height - (scroll_y + viewport_height)
 		return pixels_above, pixels_below
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import re
+
+from playwright.async_api import Page, Request, Response
+
+logger = logging.getLogger(__name__)
+
+# Define relevant resource types and content types
+RELEVANT_RESOURCE_TYPES = frozenset(
+	{
+		'document',
+		'stylesheet',
+		'image',
+		'font',
+		'script',
+		'iframe',
+	}
+)
+
+RELEVANT_CONTENT_TYPES = (
+	'text/html',
+	'text/css',
+	'application/javascript',
+	'image/',
+	'font/',
+	'application/json',
+)
+
+# Content types that indicate streaming or real-time data
+IGNORED_CONTENT_TYPES = (
+	'streaming',
+	'video',
+	'audio',
+	'webm',
+	'mp4',
+	'event-stream',
+	'websocket',
+	'protobuf',
+)
+
+# Additional patterns to filter out
+IGNORED_URL_PATTERNS = (
+	# Analytics and tracking
+	'analytics',
+	'tracking',
+	'telemetry',
+	'beacon',
+	'metrics',
+	# Ad-related
+	'doubleclick',
+	'adsystem',
+	'adserver',
+	'advertising',
+	# Social media widgets
+	'facebook.com/plugins',
+	'platform.twitter',
+	'linkedin.com/embed',
+	# Live chat and support
+	'livechat',
+	'zendesk',
+	'intercom',
+	'crisp.chat',
+	'hotjar',
+	# Push notifications
+	'push-notifications',
+	'onesignal',
+	'pushwoosh',
+	# Background sync/heartbeat
+	'heartbeat',
+	'ping',
+	'alive',
+	# WebRTC and streaming
+	'webrtc',
+	'rtmp://',
+	'wss://',
+	# Common CDNs for dynamic content
+	'cloudfront.net',
+	'fastly.net',
+)
+
+# One pass over the url instead of a substring check per pattern, data and blob urls are filtered out as well
+_IGNORED_URL_RE = re.compile('^(?:data|blob):|' + '|'.join(re.escape(pattern) for pattern in IGNORED_URL_PATTERNS))
+
+# Responses larger than this are likely not essential for page load
+MAX_RELEVANT_CONTENT_LENGTH = 5 * 1024 * 1024  # 5MB
+
+
+def is_relevant_request(request: Request) -> bool:
+	"""Whether a request should keep the page from being considered network idle"""
+	# Filter by resource type (streaming, websocket, and other real-time requests are not in the set)
+	if request.resource_type not in RELEVANT_RESOURCE_TYPES:
+		return False
+
+	# Filter out by URL patterns
+	if _IGNORED_URL_RE.search(request.url.lower()):
+		return False
+
+	# Filter out requests with certain headers
+	headers = request.headers
+	if headers.get('purpose') == 'prefetch' or headers.get('sec-fetch-dest') in ('video', 'audio'):
+		return False
+
+	return True
+
+
+def is_relevant_response(response: Response) -> bool:
+	"""Whether a response counts as page activity (streaming, unknown content types and large downloads don't)"""
+	content_type = response.headers.get('content-type', '').lower()
+	if any(t in content_type for t in IGNORED_CONTENT_TYPES):
+		return False
+
+	if not any(ct in content_type for ct in RELEVANT_CONTENT_TYPES):
+		return False
+
+	content_length = response.headers.get('content-length')
+	if content_length and content_length.isdigit() and int(content_length) > MAX_RELEVANT_CONTENT_LENGTH:
+		return False
+
+	return True
+
+
+class NetworkIdleTracker:
+	"""
+	Tracks the relevant in-flight requests of one page and signals when its network has been idle for `idle_time` seconds.
+
+	The listeners stay attached for the life of the page, so a step only awaits an event instead of polling and
+	attaching/removing listeners every time.
+	"""
+
+	def __init__(self, idle_time: float):
+		self.idle_time = idle_time
+		self._pending: dict[Request, float] = {}
+		self._last_activity = 0.0
+		# Number of relevant requests seen so far, lets callers tell whether an action caused any network activity
+		self.request_count = 0
+		self._idle = asyncio.Event()
+		self._timer: asyncio.TimerHandle | None = None
+
+	def attach(self, page: Page) -> None:
+		page.on('request', self._on_request)
+		page.on('response', self._on_response)
+		page.on('requestfailed', self._on_request_failed)
+
+	@property
+	def pending_urls(self) -> list[str]:
+		return [request.url for request in self._pending]
+
+	async def wait_for_idle(self, timeout: float) -> bool:
+		"""
+		Wait until no relevant request is pending and nothing happened for `idle_time` seconds.
+
+		The start of the wait counts as activity, so requests triggered by the action that preceded it get `idle_time`
+		seconds to show up. Returns False if the network did not settle within `timeout` seconds, requests that were
+		already pending when the wait started are forgotten then, so a request that never finishes only delays one step.
+		"""
+		loop = asyncio.get_running_loop()
+		started = loop.time()
+		self._mark_activity()
+		try:
+			await asyncio.wait_for(self._idle.wait(), timeout)
+			return True
+		except asyncio.TimeoutError:
+			logger.debug(
+				f'Network timeout after {timeout}s with {len(self._pending)} pending requests: {self.pending_urls}'
+			)
+			for request, request_started in list(self._pending.items()):
+				if request_started <= started:
+					del self._pending[request]
+			return False
+
+	def _on_request(self, request: Request) -> None:
+		if not is_relevant_request(request):
+			return
+
+		self._pending[request] = asyncio.get_running_loop().time()
+		self.request_count += 1
+		self._mark_activity()
+
+	def _on_response(self, response: Response) -> None:
+		request = response.request
+		if request not in self._pending:
+			return
+
+		del self._pending[request]
+		if is_relevant_response(response):
+			self._mark_activity()
+		else:
+			self._schedule_idle()
+
+	def _on_request_failed(self, request: Request) -> None:
+		if self._pending.pop(request, None) is not None:
+			self._schedule_idle()
+
+	def _mark_activity(self) -> None:
+		self._last_activity = asyncio.get_running_loop().time()
+		self._idle.clear()
+		self._schedule_idle()
+
+	def _schedule_idle(self) -> None:
+		if self._timer is not None:
+			self._timer.cancel()
+			self._timer = None
+		if not self._pending:
+			self._timer = asyncio.get_running_loop().call_at(self._last_activity + self.idle_time, self._set_idle)
+
+	def _set_idle(self) -> None:
+		self._timer = None
+		if not self._pending:
+			self._idle.set()
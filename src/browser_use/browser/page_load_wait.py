@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import weakref
+from abc import ABC, abstractmethod
+from collections import deque
+from urllib.parse import urlparse
+
+from playwright.async_api import Page
+
+from browser_use.browser.network_idle import NetworkIdleTracker
+
+logger = logging.getLogger(__name__)
+
+# Counts DOM mutations of the page (ignoring our own highlights) and waits until the DOM has been quiet for quietMs,
+# at most maxMs. The observer is installed on first use and lives as long as the document.
+SETTLE_PROBE_JS = """async ({ quietMs, maxMs }) => {
+  const HIGHLIGHT_CONTAINER_ID = 'playwright-highlight-container';
+
+  let clock = window.__browserUseMutationClock;
+  if (!clock) {
+    clock = { count: 0, last: 0 };
+    const isOwnMutation = (mutation) => {
+      if (mutation.type === 'attributes' && mutation.attributeName === 'browser-user-highlight-id') return true;
+      const container = document.getElementById(HIGHLIGHT_CONTAINER_ID);
+      const target = mutation.target;
+      if (target && (target.id === HIGHLIGHT_CONTAINER_ID || (container && container.contains(target)))) return true;
+      if (mutation.type === 'childList') {
+        const nodes = [...mutation.addedNodes, ...mutation.removedNodes];
+        return nodes.length > 0 && nodes.every(n => n.id === HIGHLIGHT_CONTAINER_ID);
+      }
+      return false;
+    };
+    new MutationObserver((mutations) => {
+      for (const mutation of mutations) {
+        if (isOwnMutation(mutation)) continue;
+        clock.count++;
+        clock.last = performance.now();
+      }
+    }).observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+    window.__browserUseMutationClock = clock;
+  }
+
+  const start = performance.now();
+  while (true) {
+    const now = performance.now();
+    const quietFor = now - clock.last;
+    const waited = now - start;
+    if (quietFor >= quietMs || waited >= maxMs) {
+      return {
+        mutations: clock.count,
+        waited: waited / 1000,
+        quiet: quietFor / 1000,
+        timeOrigin: performance.timeOrigin,
+      };
+    }
+    await new Promise(resolve => setTimeout(resolve, Math.min(quietMs - quietFor, maxMs - waited)));
+  }
+}"""
+
+
+async def _wait_for_minimum(elapsed: float, minimum_wait: float) -> None:
+	# Calculate remaining time to meet minimum WAIT_TIME
+	remaining = max(minimum_wait - elapsed, 0)
+
+	logger.debug(f'--Page loaded in {elapsed:.2f} seconds, waiting for additional {remaining:.2f} seconds')
+
+	# Sleep remaining time if needed
+	if remaining > 0:
+		await asyncio.sleep(remaining)
+
+
+class PageLoadWaitPolicy(ABC):
+	"""
+	Decides how long a step keeps waiting for the page once its network is idle.
+
+	Pass an instance as `BrowserContextConfig.page_load_wait_policy` to plug in another policy. The policy also keeps
+	track of how much wait time it saved compared to always waiting `minimum_wait_page_load_time`.
+	"""
+
+	def __init__(self):
+		self.waits = 0
+		self.skipped_waits = 0
+		self.saved_seconds = 0.0
+
+	async def can_skip_wait(self, page: Page, tracker: NetworkIdleTracker, minimum_wait: float) -> bool:
+		"""Whether the whole wait (network idle included) can be skipped because the last action changed nothing"""
+		return False
+
+	@abstractmethod
+	async def wait(
+		self,
+		page: Page | None,
+		tracker: NetworkIdleTracker | None,
+		elapsed: float,
+		minimum_wait: float,
+		maximum_wait: float,
+	) -> None:
+		"""Wait for the page after the network was idle, `elapsed` seconds have already passed"""
+
+	def _record_wait(self, saved: float, skipped: bool = False) -> None:
+		# a wait that ran past the fixed wait saved nothing, it isn't counted against the policy either
+		saved = max(saved, 0.0)
+		self.waits += 1
+		self.skipped_waits += skipped
+		self.saved_seconds += saved
+		logger.debug(
+			f'⏱️  Page load wait {"skipped" if skipped else "done"}, saved {saved:.2f}s '
+			f'({self.saved_seconds:.2f}s over {self.waits} waits, {self.skipped_waits} skipped)'
+		)
+
+
+class FixedPageLoadWaitPolicy(PageLoadWaitPolicy):
+	"""Always wait until `minimum_wait_page_load_time` has passed"""
+
+	async def wait(
+		self,
+		page: Page | None,
+		tracker: NetworkIdleTracker | None,
+		elapsed: float,
+		minimum_wait: float,
+		maximum_wait: float,
+	) -> None:
+		await _wait_for_minimum(elapsed, minimum_wait)
+
+
+class AdaptivePageLoadWaitPolicy(PageLoadWaitPolicy):
+	"""
+	Waits for the DOM to stop changing instead of a fixed time, bounded by the settle times observed on the domain.
+
+	- If neither the document, the DOM nor the network changed since the previous wait on the page, nothing is awaited
+	- Otherwise it waits until the DOM had no mutations for `quiet_window` seconds. The budget is the `percentile` of the
+	  settle times (from the start of the wait until the last mutation) seen on the domain, times `headroom`. Until
+	  `min_samples` settle times are known the budget is `minimum_wait_page_load_time`.
+	"""
+
+	def __init__(
+		self,
+		quiet_window: float = 0.1,
+		percentile: float = 0.9,
+		headroom: float = 1.5,
+		min_samples: int = 5,
+		history_size: int = 50,
+	):
+		super().__init__()
+		self.quiet_window = quiet_window
+		self.percentile = percentile
+		self.headroom = headroom
+		self.min_samples = min_samples
+		self.history_size = history_size
+		self.settle_times: dict[str, deque[float]] = {}
+		# (url, document time origin, DOM mutation count, network request count) after the last wait on each page
+		self._last_seen: weakref.WeakKeyDictionary[Page, tuple[str, float, int, int]] = weakref.WeakKeyDictionary()
+
+	async def can_skip_wait(self, page: Page, tracker: NetworkIdleTracker, minimum_wait: float) -> bool:
+		last_seen = self._last_seen.get(page)
+		if last_seen is None:
+			return False
+
+		try:
+			probe = await page.evaluate(SETTLE_PROBE_JS, {'quietMs': 0, 'maxMs': 0})
+		except Exception as e:
+			logger.debug(f'Settle probe failed: {e}')
+			return False
+
+		if (page.url, probe['timeOrigin'], probe['mutations'], tracker.request_count) != last_seen:
+			return False
+
+		# a fixed wait takes at least the network idle window or the minimum wait, whichever is longer
+		self._record_wait(max(minimum_wait, tracker.idle_time), skipped=True)
+		return True
+
+	async def wait(
+		self,
+		page: Page | None,
+		tracker: NetworkIdleTracker | None,
+		elapsed: float,
+		minimum_wait: float,
+		maximum_wait: float,
+	) -> None:
+		fixed_remaining = max(minimum_wait - elapsed, 0)
+
+		if page is None:
+			await _wait_for_minimum(elapsed, minimum_wait)
+			self._record_wait(0.0)
+			return
+
+		samples = self.settle_times.setdefault(urlparse(page.url).hostname or '', deque(maxlen=self.history_size))
+		budget = self._budget(samples, minimum_wait, maximum_wait)
+
+		try:
+			probe = await page.evaluate(
+				SETTLE_PROBE_JS,
+				{'quietMs': self.quiet_window * 1000, 'maxMs': max(budget - elapsed, 0) * 1000},
+			)
+		except Exception as e:
+			# e.g. the page navigated while we were waiting for it
+			logger.debug(f'Settle probe failed, falling back to the fixed wait: {e}')
+			await _wait_for_minimum(elapsed, minimum_wait)
+			self._record_wait(0.0)
+			return
+
+		samples.append(max(elapsed + probe['waited'] - probe['quiet'], 0.0))
+		if tracker is not None:
+			self._last_seen[page] = (page.url, probe['timeOrigin'], probe['mutations'], tracker.request_count)
+
+		logger.debug(f'--Page loaded in {elapsed:.2f} seconds, DOM settled after additional {probe["waited"]:.2f} seconds')
+		self._record_wait(fixed_remaining - probe['waited'])
+
+	def _budget(self, samples: deque[float], minimum_wait: float, maximum_wait: float) -> float:
+		if len(samples) < self.min_samples:
+			return minimum_wait
+
+		ordered = sorted(samples)
+		settle_time = ordered[min(int(self.percentile * len(ordered)), len(ordered) - 1)]
+		return min(settle_time * self.headroom + self.quiet_window, maximum_wait)
+
+
+def get_page_load_wait_policy(policy: 'str | PageLoadWaitPolicy') -> PageLoadWaitPolicy:
+	if isinstance(policy, PageLoadWaitPolicy):
+		return policy
+	if policy == 'adaptive':
+		return AdaptivePageLoadWaitPolicy()
+	return FixedPageLoadWaitPolicy()
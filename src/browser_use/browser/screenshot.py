@@ -0,0 +1,109 @@
+import base64
+import io
+import logging
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Side of the grayscale thumbnail used for the perceptual hash (PERCEPTUAL_HASH_SIZE ** 2 bits)
+PERCEPTUAL_HASH_SIZE = 16
+
+
+def screenshot_mime_type(screenshot_b64: str) -> str:
+	"""Mime type of a base64 encoded screenshot, from the magic bytes of the image"""
+	if screenshot_b64.startswith('/9j/'):
+		return 'image/jpeg'
+	if screenshot_b64.startswith('UklGR'):
+		return 'image/webp'
+	return 'image/png'
+
+
+@dataclass
+class ScreenshotMetrics:
+	"""Size and encoding cost of the screenshots taken by a browser context"""
+
+	screenshots: int = 0
+	reused: int = 0
+	last_bytes: int = 0
+	total_bytes: int = 0
+	last_encode_seconds: float = 0.0
+	total_encode_seconds: float = 0.0
+
+	def record(self, size: int, encode_seconds: float, reused: bool) -> None:
+		self.screenshots += 1
+		self.reused += reused
+		self.last_bytes = size
+		self.total_bytes += size
+		self.last_encode_seconds = encode_seconds
+		self.total_encode_seconds += encode_seconds
+
+
+@dataclass
+class ProcessedScreenshot:
+	screenshot_b64: str | None  # None if the previous screenshot can be reused
+	size: int
+	perceptual_hash: int | None = None
+
+
+def is_pillow_available() -> bool:
+	try:
+		import PIL  # noqa: F401
+	except ImportError:
+		return False
+	return True
+
+
+def perceptual_hash(image) -> int:
+	"""Difference hash: one bit per pair of horizontally adjacent pixels of a grayscale thumbnail"""
+	from PIL import Image
+
+	size = PERCEPTUAL_HASH_SIZE
+	pixels = list(image.convert('L').resize((size + 1, size), Image.Resampling.BILINEAR).getdata())
+
+	value = 0
+	for row in range(size):
+		offset = row * (size + 1)
+		for col in range(size):
+			value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+	return value
+
+
+def process_screenshot(
+	raw: bytes,
+	image_format: str,
+	quality: int | None,
+	max_dimension: int | None,
+	reencode: bool,
+	previous_hash: int | None = None,
+	reuse_threshold: int | None = None,
+) -> ProcessedScreenshot:
+	"""
+	Downscale, re-encode, hash and base64-encode a captured screenshot.
+
+	Runs in a worker thread, everything here is CPU bound.
+	"""
+	if not reencode and reuse_threshold is None:
+		return ProcessedScreenshot(base64.b64encode(raw).decode('utf-8'), len(raw))
+
+	from PIL import Image
+
+	image = Image.open(io.BytesIO(raw))
+
+	image_hash = None
+	if reuse_threshold is not None:
+		image_hash = perceptual_hash(image)
+		if previous_hash is not None and (image_hash ^ previous_hash).bit_count() <= reuse_threshold:
+			return ProcessedScreenshot(None, 0, image_hash)
+
+	if reencode:
+		if max_dimension and max(image.size) > max_dimension:
+			image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+		if image_format == 'jpeg' and image.mode != 'RGB':
+			image = image.convert('RGB')
+
+		save_kwargs = {'quality': quality} if quality is not None and image_format != 'png' else {}
+		buffer = io.BytesIO()
+		image.save(buffer, format=image_format.upper(), **save_kwargs)
+		raw = buffer.getvalue()
+
+	return ProcessedScreenshot(base64.b64encode(raw).decode('utf-8'), len(raw), image_hash)
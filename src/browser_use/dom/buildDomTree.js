@@ -4,9 +4,15 @@
     focusHighlightIndex: -1,
     viewportExpansion: 0,
     debugMode: false,
+    incremental: false,
+    knownEpoch: null,
+    packed: false,
   }
 ) => {
   const { doHighlightElements, focusHighlightIndex, viewportExpansion, debugMode } = args;
+  const incremental = args.incremental ?? false;
+  const knownEpoch = args.knownEpoch ?? null;
+  const packed = args.packed ?? false;
   let highlightIndex = 0; // Reset highlight index
 
   // Add timing stack to handle recursion
@@ -214,6 +220,104 @@
 
   const HIGHLIGHT_CONTAINER_ID = "playwright-highlight-container";
 
+  /**
+   * Persistent in-page snapshot agent used in incremental mode.
+   *
+   * It lives on the window for the lifetime of the document, hands out stable node ids
+   * and uses a MutationObserver to remember whether (and where) the DOM changed since
+   * the previous snapshot. Mutations caused by our own highlight overlays are ignored.
+   */
+  const SNAPSHOT_AGENT = incremental ? getSnapshotAgent() : null;
+
+  // Highlighted elements of this snapshot, kept so a clean page can be re-highlighted without a traversal
+  const HIGHLIGHTED_ELEMENTS = [];
+
+  function isOwnMutation(mutation) {
+    if (mutation.type === 'attributes' && mutation.attributeName === 'browser-user-highlight-id') return true;
+
+    const container = document.getElementById(HIGHLIGHT_CONTAINER_ID);
+    const target = mutation.target;
+    if (target && (target.id === HIGHLIGHT_CONTAINER_ID || (container && container.contains(target)))) return true;
+
+    if (mutation.type === 'childList') {
+      const nodes = [...mutation.addedNodes, ...mutation.removedNodes];
+      return nodes.length > 0 && nodes.every(n => n.id === HIGHLIGHT_CONTAINER_ID);
+    }
+    return false;
+  }
+
+  function getSnapshotAgent() {
+    let agent = window.__browserUseSnapshotAgent;
+    if (agent) return agent;
+
+    agent = {
+      epoch: `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`,
+      nodeIds: new WeakMap(),
+      nextId: 0,
+      lastSent: new Map(),
+      lastSignature: null,
+      rootId: null,
+      dirty: true,
+      dirtyTargets: new Set(),
+      highlighted: [],
+      observed: new WeakSet(),
+      observer: null,
+    };
+    agent.observer = new MutationObserver((mutations) => {
+      for (const mutation of mutations) {
+        if (isOwnMutation(mutation)) continue;
+        agent.dirty = true;
+        agent.dirtyTargets.add(mutation.target);
+      }
+    });
+    window.__browserUseSnapshotAgent = agent;
+    observeRoot(agent, document);
+    return agent;
+  }
+
+  // Events that change what is visible or scrolled without mutating the DOM: scrolling any container,
+  // interaction (:hover, :focus, form state) and CSS transitions and animations
+  const DIRTYING_EVENTS = [
+    'scroll', 'wheel', 'resize', 'input', 'change', 'focusin', 'focusout', 'pointerdown', 'pointerup',
+    'pointerover', 'pointerout', 'keydown', 'transitionend', 'animationend', 'animationiteration', 'load',
+  ];
+
+  /**
+   * Starts watching a document or shadow root for mutations and for the events in
+   * DIRTYING_EVENTS. Shadow roots and iframe documents are not covered by the observer
+   * and listeners of the main document.
+   */
+  function observeRoot(agent, root) {
+    if (!root || agent.observed.has(root)) return;
+    try {
+      agent.observer.observe(root, { subtree: true, childList: true, attributes: true, characterData: true });
+      const markDirty = () => { agent.dirty = true; };
+      for (const type of DIRTYING_EVENTS) {
+        // capture, so events that don't bubble (scroll of inner containers, load) are seen too
+        root.addEventListener(type, markDirty, { capture: true, passive: true });
+      }
+      agent.observed.add(root);
+    } catch (e) {
+      // Cross-origin or detached roots cannot be observed, force a fresh snapshot next time
+      agent.dirty = true;
+    }
+  }
+
+  /**
+   * Returns the id of a node in the hash map. In incremental mode ids are stable across
+   * snapshots of the same document, otherwise they are assigned sequentially.
+   */
+  function getNodeId(node) {
+    if (!SNAPSHOT_AGENT) return `${ID.current++}`;
+
+    let id = SNAPSHOT_AGENT.nodeIds.get(node);
+    if (id === undefined) {
+      id = `${SNAPSHOT_AGENT.nextId++}`;
+      SNAPSHOT_AGENT.nodeIds.set(node, id);
+    }
+    return id;
+  }
+
   // Add a WeakMap cache for XPath strings
   const xpathCache = new WeakMap();
 
@@ -977,6 +1081,18 @@
     return false; // No rects were found in the viewport
   }
 
+  /**
+   * Vertical distance in pixels between an element and the viewport, 0 when they overlap.
+   * Lets the agent's prompt trimming keep the elements closest to what the user sees.
+   */
+  function viewportDistance(element) {
+    const rect = getCachedBoundingRect(element);
+    if (!rect) return -1;
+    if (rect.bottom < 0) return Math.round(-rect.bottom);
+    if (rect.top > window.innerHeight) return Math.round(rect.top - window.innerHeight);
+    return 0;
+  }
+
   // Add this new helper function
   function getEffectiveScroll(element) {
     let currentEl = element;
@@ -1128,6 +1244,8 @@
       // regardless of viewport status
       if (nodeData.isInViewport || viewportExpansion === -1) {
         nodeData.highlightIndex = highlightIndex++;
+        nodeData.viewportDistance = viewportDistance(node);
+        if (SNAPSHOT_AGENT) HIGHLIGHTED_ELEMENTS.push({ element: node, index: nodeData.highlightIndex, parentIframe });
 
         if (doHighlightElements) {
           if (focusHighlightIndex >= 0) {
@@ -1180,7 +1298,7 @@
         if (domElement) nodeData.children.push(domElement);
       }
 
-      const id = `${ID.current++}`;
+      const id = getNodeId(node);
       DOM_HASH_MAP[id] = nodeData;
       if (debugMode) PERF_METRICS.nodeMetrics.processedNodes++;
       return id;
@@ -1207,7 +1325,7 @@
         return null;
       }
 
-      const id = `${ID.current++}`;
+      const id = getNodeId(node);
       DOM_HASH_MAP[id] = {
         type: "TEXT_NODE",
         text: textContent,
@@ -1287,6 +1405,7 @@
         try {
           const iframeDoc = node.contentDocument || node.contentWindow?.document;
           if (iframeDoc) {
+            if (SNAPSHOT_AGENT) observeRoot(SNAPSHOT_AGENT, iframeDoc);
             for (const child of iframeDoc.childNodes) {
               const domElement = buildDomTree(child, node, false);
               if (domElement) nodeData.children.push(domElement);
@@ -1314,6 +1433,7 @@
         // Handle shadow DOM
         if (node.shadowRoot) {
           nodeData.shadowRoot = true;
+          if (SNAPSHOT_AGENT) observeRoot(SNAPSHOT_AGENT, node.shadowRoot);
           for (const child of node.shadowRoot.childNodes) {
             const domElement = buildDomTree(child, parentIframe, nodeWasHighlighted);
             if (domElement) nodeData.children.push(domElement);
@@ -1335,12 +1455,123 @@
       return null;
     }
 
-    const id = `${ID.current++}`;
+    const id = getNodeId(node);
     DOM_HASH_MAP[id] = nodeData;
     if (debugMode) PERF_METRICS.nodeMetrics.processedNodes++;
     return id;
   }
 
+  // Bit flags of the packed transfer format, keep in sync with PackedNodeFlags in dom/service.py
+  const PACKED_FLAGS = {
+    text: 1,
+    visible: 2,
+    interactive: 4,
+    topElement: 8,
+    inViewport: 16,
+    shadowRoot: 32,
+  };
+
+  /**
+   * Base64 encodes the raw bytes of a typed array, so it crosses the CDP boundary as a single string.
+   */
+  function encodeColumn(typedArray) {
+    const bytes = new Uint8Array(typedArray.buffer, typedArray.byteOffset, typedArray.byteLength);
+    let binary = '';
+    for (let i = 0; i < bytes.length; i += 0x8000) {
+      binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+    }
+    return btoa(binary);
+  }
+
+  /**
+   * Converts DOM_HASH_MAP into a columnar format: interned strings, typed-array columns for
+   * flags, names, xpaths, highlight indices and parent indices, and attributes only for
+   * highlighted nodes (and file inputs, which are needed to detect upload targets).
+   *
+   * Node ids are assigned in post-order, so the index of a node in the columns equals its id,
+   * children come before their parent and siblings keep their document order.
+   */
+  function packDomHashMap(rootId) {
+    const ids = Object.keys(DOM_HASH_MAP);
+    const count = ids.length;
+    const indexById = new Map(ids.map((id, i) => [id, i]));
+
+    const strings = [];
+    const stringIndex = new Map();
+    const intern = (value) => {
+      let index = stringIndex.get(value);
+      if (index === undefined) {
+        index = strings.length;
+        strings.push(value);
+        stringIndex.set(value, index);
+      }
+      return index;
+    };
+
+    const flags = new Uint8Array(count);
+    const names = new Int32Array(count);
+    const xpaths = new Int32Array(count).fill(-1);
+    const highlightIndices = new Int32Array(count).fill(-1);
+    const viewportDistances = new Int32Array(count).fill(-1);
+    const parents = new Int32Array(count).fill(-1);
+    const attributeOffsets = new Int32Array(count + 1);
+    const attributes = [];
+
+    ids.forEach((id, i) => {
+      const nodeData = DOM_HASH_MAP[id];
+      attributeOffsets[i] = attributes.length;
+
+      if (nodeData.type === 'TEXT_NODE') {
+        flags[i] = PACKED_FLAGS.text | (nodeData.isVisible ? PACKED_FLAGS.visible : 0);
+        names[i] = intern(nodeData.text);
+        return;
+      }
+
+      flags[i] =
+        (nodeData.isVisible ? PACKED_FLAGS.visible : 0) |
+        (nodeData.isInteractive ? PACKED_FLAGS.interactive : 0) |
+        (nodeData.isTopElement ? PACKED_FLAGS.topElement : 0) |
+        (nodeData.isInViewport ? PACKED_FLAGS.inViewport : 0) |
+        (nodeData.shadowRoot ? PACKED_FLAGS.shadowRoot : 0);
+      names[i] = intern(nodeData.tagName);
+      xpaths[i] = intern(nodeData.xpath);
+
+      const isHighlighted = nodeData.highlightIndex !== undefined && nodeData.highlightIndex !== null;
+      if (isHighlighted) {
+        highlightIndices[i] = nodeData.highlightIndex;
+        viewportDistances[i] = nodeData.viewportDistance ?? -1;
+      }
+
+      for (const childId of nodeData.children) {
+        const childIndex = indexById.get(childId);
+        if (childIndex !== undefined) parents[childIndex] = i;
+      }
+
+      const nodeAttributes = nodeData.attributes || {};
+      const isFileInput = nodeData.tagName === 'input' && (nodeAttributes.type === 'file' || 'accept' in nodeAttributes);
+      if (isHighlighted || isFileInput) {
+        for (const [name, value] of Object.entries(nodeAttributes)) {
+          attributes.push(intern(name), intern(value ?? ''));
+        }
+      }
+    });
+    attributeOffsets[count] = attributes.length;
+
+    return {
+      count,
+      root: indexById.get(rootId) ?? -1,
+      strings,
+      flags: encodeColumn(flags),
+      names: encodeColumn(names),
+      xpaths: encodeColumn(xpaths),
+      highlightIndices: encodeColumn(highlightIndices),
+      viewportDistances: encodeColumn(viewportDistances),
+      parents: encodeColumn(parents),
+      attributeOffsets: encodeColumn(attributeOffsets),
+      attributes: encodeColumn(Int32Array.from(attributes)),
+    };
+  }
+
   // After all functions are defined, wrap them with performance measurement
   // Remove buildDomTree from here as we measure it separately
   highlightElement = measureTime(highlightElement);
@@ -1351,6 +1582,30 @@
   isTextNodeVisible = measureTime(isTextNodeVisible);
   getEffectiveScroll = measureTime(getEffectiveScroll);
 
+  // Everything besides DOM mutations and DIRTYING_EVENTS that influences visibility, viewport checks and highlight indices
+  const snapshotSignature = JSON.stringify([
+    location.href, window.scrollX, window.scrollY, window.innerWidth, window.innerHeight,
+    viewportExpansion, focusHighlightIndex, doHighlightElements,
+  ]);
+
+  // Nothing changed since the last snapshot of this document: skip the traversal entirely
+  if (
+    SNAPSHOT_AGENT &&
+    SNAPSHOT_AGENT.epoch === knownEpoch &&
+    !SNAPSHOT_AGENT.dirty &&
+    SNAPSHOT_AGENT.rootId !== null &&
+    SNAPSHOT_AGENT.lastSignature === snapshotSignature
+  ) {
+    if (doHighlightElements) {
+      for (const { element, index, parentIframe } of SNAPSHOT_AGENT.highlighted) {
+        if (!element.isConnected) continue;
+        if (focusHighlightIndex >= 0 && focusHighlightIndex !== index) continue;
+        highlightElement(element, index, parentIframe);
+      }
+    }
+    return { rootId: SNAPSHOT_AGENT.rootId, map: {}, removed: [], epoch: SNAPSHOT_AGENT.epoch, full: false, dirtySubtrees: 0 };
+  }
+
   const rootId = buildDomTree(document.body);
 
   // Clear the cache before starting
@@ -1406,6 +1661,37 @@
     }
   }
 
+  if (SNAPSHOT_AGENT) {
+    // Only ship nodes whose serialized data changed since the last snapshot of this document
+    const full = SNAPSHOT_AGENT.epoch !== knownEpoch;
+    const sent = new Map();
+    const changed = {};
+    for (const [id, nodeData] of Object.entries(DOM_HASH_MAP)) {
+      const serialized = JSON.stringify(nodeData);
+      sent.set(id, serialized);
+      if (full || SNAPSHOT_AGENT.lastSent.get(id) !== serialized) changed[id] = nodeData;
+    }
+    const removed = full ? [] : [...SNAPSHOT_AGENT.lastSent.keys()].filter(id => !sent.has(id));
+    const dirtySubtrees = SNAPSHOT_AGENT.dirtyTargets.size;
+
+    SNAPSHOT_AGENT.lastSent = sent;
+    SNAPSHOT_AGENT.lastSignature = snapshotSignature;
+    SNAPSHOT_AGENT.rootId = rootId;
+    SNAPSHOT_AGENT.highlighted = HIGHLIGHTED_ELEMENTS;
+    SNAPSHOT_AGENT.dirty = false;
+    SNAPSHOT_AGENT.dirtyTargets.clear();
+
+    const delta = { rootId, map: changed, removed, epoch: SNAPSHOT_AGENT.epoch, full, dirtySubtrees };
+    if (debugMode) delta.perfMetrics = PERF_METRICS;
+    return delta;
+  }
+
+  if (packed) {
+    return debugMode ?
+      { rootId, packed: packDomHashMap(rootId), perfMetrics: PERF_METRICS } :
+      { rootId, packed: packDomHashMap(rootId) };
+  }
+
   return debugMode ?
     { rootId, map: DOM_HASH_MAP, perfMetrics: PERF_METRICS } :
     { rootId, map: DOM_HASH_MAP };
@@ -0,0 +1,112 @@
+"""
+Hashing of DOM elements, shared by the clickable element processor and the history tree processor.
+
+Hashes are only compared within one process (history elements are stored unhashed and hashed again on replay), so a fast
+non-cryptographic digest is enough. Branch path hashes are chained: the hash of an element is the hash of its parent's
+branch path hash and its own tag name, so they are computed top-down and cached on the nodes.
+"""
+
+import hashlib
+
+from browser_use.dom.history_tree_processor.view import DOMHistoryElement, HashedDomElement
+from browser_use.dom.views import DOMElementNode
+
+try:
+	import xxhash
+except ImportError:
+	xxhash = None
+
+
+def hash_string(string: str) -> str:
+	if xxhash is not None:
+		return xxhash.xxh3_128_hexdigest(string.encode())
+	return hashlib.blake2b(string.encode(), digest_size=16).hexdigest()
+
+
+# Branch path hash of the root element (its own tag is not part of the path)
+EMPTY_BRANCH_PATH_HASH = hash_string('')
+
+
+def extend_branch_path_hash(parent_branch_path_hash: str, tag_name: str) -> str:
+	# the parent hash has a fixed length, so the separator can't be confused with a tag name
+	return hash_string(f'{parent_branch_path_hash}/{tag_name}')
+
+
+def branch_path_hash(branch_path: list[str]) -> str:
+	"""Hash of a branch path as stored in the history (tag names from below the root down to the element)"""
+	path_hash = EMPTY_BRANCH_PATH_HASH
+	for tag_name in branch_path:
+		path_hash = extend_branch_path_hash(path_hash, tag_name)
+	return path_hash
+
+
+def element_branch_path_hash(dom_element: DOMElementNode) -> str:
+	"""Branch path hash of an element, reusing (and filling) the hashes cached on its ancestors"""
+	if dom_element._branch_path_hash is not None:
+		return dom_element._branch_path_hash
+
+	uncached: list[DOMElementNode] = []
+	current: DOMElementNode | None = dom_element
+	while current is not None and current._branch_path_hash is None:
+		uncached.append(current)
+		current = current.parent
+
+	path_hash = current._branch_path_hash if current is not None else EMPTY_BRANCH_PATH_HASH
+	for node in reversed(uncached):
+		if node.parent is not None:
+			path_hash = extend_branch_path_hash(path_hash, node.tag_name)
+		node._branch_path_hash = path_hash
+
+	return path_hash
+
+
+def attributes_hash(attributes: dict[str, str]) -> str:
+	return hash_string(''.join(f'{key}={value}' for key, value in attributes.items()))
+
+
+def xpath_hash(xpath: str) -> str:
+	return hash_string(xpath)
+
+
+def hash_dom_element(dom_element: DOMElementNode) -> HashedDomElement:
+	"""Hash of a live element, cached on the node until its data or position changes"""
+	if dom_element._hash is None:
+		dom_element._hash = HashedDomElement(
+			element_branch_path_hash(dom_element),
+			attributes_hash(dom_element.attributes),
+			xpath_hash(dom_element.xpath),
+		)
+	return dom_element._hash
+
+
+def hash_dom_history_element(dom_history_element: DOMHistoryElement) -> HashedDomElement:
+	return HashedDomElement(
+		branch_path_hash(dom_history_element.entire_parent_branch_path),
+		attributes_hash(dom_history_element.attributes),
+		xpath_hash(dom_history_element.xpath),
+	)
+
+
+def clickable_element_hash(dom_element: DOMElementNode) -> str:
+	hashed = hash_dom_element(dom_element)
+	return hash_string(f'{hashed.branch_path_hash}-{hashed.attributes_hash}-{hashed.xpath_hash}')
+
+
+def clickable_elements_hashes(dom_element: DOMElementNode) -> set[str]:
+	"""Hashes of all clickable elements below dom_element, branch paths are hashed in the same top-down walk"""
+	hashes = set()
+	stack = [(dom_element, element_branch_path_hash(dom_element))]
+	while stack:
+		node, path_hash = stack.pop()
+		for child in node.children:
+			if not isinstance(child, DOMElementNode):
+				continue
+
+			if child._branch_path_hash is None:
+				child._branch_path_hash = extend_branch_path_hash(path_hash, child.tag_name)
+			# same selection as ClickableElementProcessor.get_clickable_elements
+			if child.highlight_index:
+				hashes.add(clickable_element_hash(child))
+			stack.append((child, child._branch_path_hash))
+
+	return hashes
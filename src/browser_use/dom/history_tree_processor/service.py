@@ -1,5 +1,4 @@
-import hashlib
-
+from browser_use.dom import hashing
 from browser_use.dom.history_tree_processor.view import DOMHistoryElement, HashedDomElement
 from browser_use.dom.views import DOMElementNode
 
@@ -57,21 +56,12 @@ class HistoryTreeProcessor:
 
 	@staticmethod
 	def _hash_dom_history_element(dom_history_element: DOMHistoryElement) -> HashedDomElement:
-		branch_path_hash = HistoryTreeProcessor._parent_branch_path_hash(dom_history_element.entire_parent_branch_path)
-		attributes_hash = HistoryTreeProcessor._attributes_hash(dom_history_element.attributes)
-		xpath_hash = HistoryTreeProcessor._xpath_hash(dom_history_element.xpath)
-
-		return HashedDomElement(branch_path_hash, attributes_hash, xpath_hash)
+		return hashing.hash_dom_history_element(dom_history_element)
 
 	@staticmethod
 	def _hash_dom_element(dom_element: DOMElementNode) -> HashedDomElement:
-		parent_branch_path = HistoryTreeProcessor._get_parent_branch_path(dom_element)
-		branch_path_hash = HistoryTreeProcessor._parent_branch_path_hash(parent_branch_path)
-		attributes_hash = HistoryTreeProcessor._attributes_hash(dom_element.attributes)
-		xpath_hash = HistoryTreeProcessor._xpath_hash(dom_element.xpath)
 		# text_hash = DomTreeProcessor._text_hash(dom_element)
-
-		return HashedDomElement(branch_path_hash, attributes_hash, xpath_hash)
+		return hashing.hash_dom_element(dom_element)
 
 	@staticmethod
 	def _get_parent_branch_path(dom_element: DOMElementNode) -> list[str]:
@@ -87,20 +77,18 @@ class HistoryTreeProcessor:
 
 	@staticmethod
 	def _parent_branch_path_hash(parent_branch_path: list[str]) -> str:
-		parent_branch_path_string = '/'.join(parent_branch_path)
-		return hashlib.sha256(parent_branch_path_string.encode()).hexdigest()
+		return hashing.branch_path_hash(parent_branch_path)
 
 	@staticmethod
 	def _attributes_hash(attributes: dict[str, str]) -> str:
-		attributes_string = ''.join(f'{key}={value}' for key, value in attributes.items())
-		return hashlib.sha256(attributes_string.encode()).hexdigest()
+		return hashing.attributes_hash(attributes)
 
 	@staticmethod
 	def _xpath_hash(xpath: str) -> str:
-		return hashlib.sha256(xpath.encode()).hexdigest()
+		return hashing.xpath_hash(xpath)
 
 	@staticmethod
 	def _text_hash(dom_element: DOMElementNode) -> str:
 		""" """
 		text_string = dom_element.get_all_text_till_next_clickable_element()
-		return hashlib.sha256(text_string.encode()).hexdigest()
+		return hashing.hash_string(text_string)
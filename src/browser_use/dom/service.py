@@ -1,6 +1,10 @@
+import base64
 import json
 import logging
+import sys
+from array import array
 from dataclasses import dataclass
+from functools import cache
 from importlib import resources
 from typing import TYPE_CHECKING
 from urllib.parse import urlparse
@@ -11,14 +15,62 @@ if TYPE_CHECKING:
 from browser_use.dom.views import (
 	DOMBaseNode,
 	DOMElementNode,
+	DOMSnapshotColumns,
 	DOMState,
 	DOMTextNode,
+	DOMTreeCache,
 	SelectorMap,
 )
 from browser_use.utils import time_execution_async
 
 logger = logging.getLogger(__name__)
 
+# Name of the page global that holds the buildDomTree function once it has been installed
+BUILD_DOM_TREE_GLOBAL = '__browserUseBuildDomTree'
+
+# Sent on every snapshot instead of the full script, returns null if the function is not installed in this document
+CALL_BUILD_DOM_TREE_JS = f"""(args) => {{
+	const buildDomTree = window.{BUILD_DOM_TREE_GLOBAL};
+	return typeof buildDomTree === 'function' ? buildDomTree(args) : null;
+}}"""
+
+
+class PackedNodeFlags:
+	"""Bit flags of the packed transfer format, keep in sync with PACKED_FLAGS in buildDomTree.js"""
+
+	TEXT = 1
+	VISIBLE = 2
+	INTERACTIVE = 4
+	TOP_ELEMENT = 8
+	IN_VIEWPORT = 16
+	SHADOW_ROOT = 32
+
+
+def _decode_column(encoded: str, typecode: str) -> array:
+	"""Decode a base64 encoded typed array column of the packed transfer format"""
+	column = array(typecode)
+	column.frombytes(base64.b64decode(encoded))
+	if sys.byteorder == 'big':
+		# typed arrays are sent in the (little endian) byte order of the browser
+		column.byteswap()
+	return column
+
+
+@cache
+def get_build_dom_tree_js() -> str:
+	"""Source of buildDomTree.js, read from the package resources once per process"""
+	return resources.files('browser_use.dom').joinpath('buildDomTree.js').read_text()
+
+
+def get_build_dom_tree_init_script() -> str:
+	"""Init script that defines the buildDomTree function in every new top-level document of a context"""
+	return f'(() => {{ if (window !== window.top) return; window.{BUILD_DOM_TREE_GLOBAL} = {get_build_dom_tree_js()} }})();'
+
+
+def get_build_dom_tree_install_js() -> str:
+	"""Function that defines the buildDomTree function in the current document, for pages loaded before the init script"""
+	return f'() => {{ window.{BUILD_DOM_TREE_GLOBAL} = {get_build_dom_tree_js()} }}'
+
 
 @dataclass
 class ViewportInfo:
@@ -27,11 +79,13 @@ class ViewportInfo:
 
 
 class DomService:
-	def __init__(self, page: 'Page'):
+	def __init__(self, page: 'Page', tree_cache: DOMTreeCache | None = None, packed: bool = False):
 		self.page = page
 		self.xpath_cache = {}
-
-		self.js_code = resources.files('browser_use.dom').joinpath('buildDomTree.js').read_text()
+		# when set, the page only sends the nodes that changed since the last snapshot and we patch this cache
+		self.tree_cache = tree_cache
+		# request the columnar transfer format instead of one JSON object per node (ignored in incremental mode)
+		self.packed = packed
 
 	# region - Clickable elements
 	@time_execution_async('--get_clickable_elements')
@@ -95,12 +149,24 @@ class DomService:
 			'focusHighlightIndex': focus_element,
 			'viewportExpansion': viewport_expansion,
 			'debugMode': debug_mode,
+			'incremental': self.tree_cache is not None,
+			'knownEpoch': self.tree_cache.epoch if self.tree_cache is not None else None,
+			'packed': self.packed,
 		}
 
 		try:
-			eval_page: dict = await self.page.evaluate(self.js_code, args)
+			eval_page: dict | None = await self.page.evaluate(CALL_BUILD_DOM_TREE_JS, args)
+			if eval_page is None:
+				# the document was loaded before the init script was registered, install the function once
+				await self.page.evaluate(get_build_dom_tree_install_js())
+				eval_page = await self.page.evaluate(CALL_BUILD_DOM_TREE_JS, args)
+			if eval_page is None:
+				raise ValueError('buildDomTree.js could not be installed in the page')
 		except Exception as e:
 			logger.error('Error evaluating JavaScript: %s', e)
+			if self.tree_cache is not None:
+				# the page may have recorded a snapshot we never received, the next one has to be full
+				self.tree_cache.reset()
 			raise
 
 		# Only log performance metrics in debug mode
@@ -111,6 +177,17 @@ class DomService:
 				json.dumps(eval_page['perfMetrics'], indent=2),
 			)
 
+		if self.tree_cache is not None and 'epoch' in eval_page:
+			try:
+				return await self._patch_dom_tree(eval_page)
+			except Exception:
+				# the page already counts this delta as sent, a half patched cache would drift from it
+				self.tree_cache.reset()
+				raise
+
+		if 'packed' in eval_page:
+			return await self._decode_packed_dom_tree(eval_page['packed'])
+
 		return await self._construct_dom_tree(eval_page)
 
 	@time_execution_async('--construct_dom_tree')
@@ -157,6 +234,159 @@ class DomService:
 
 		return html_to_dict, selector_map
 
+	@time_execution_async('--decode_packed_dom_tree')
+	async def _decode_packed_dom_tree(
+		self,
+		packed: dict,
+	) -> tuple[DOMElementNode, SelectorMap]:
+		"""Build the DOM tree from the columnar transfer format produced by packDomHashMap in buildDomTree.js"""
+		strings: list[str] = packed['strings']
+		flags = _decode_column(packed['flags'], 'B')
+		names = _decode_column(packed['names'], 'i')
+		highlight_indices = _decode_column(packed['highlightIndices'], 'i')
+		viewport_distances = _decode_column(packed['viewportDistances'], 'i') if 'viewportDistances' in packed else None
+		parents = _decode_column(packed['parents'], 'i')
+		# xpaths and attributes are only decoded when a node actually needs them
+		columns = DOMSnapshotColumns(
+			strings=strings,
+			xpaths=_decode_column(packed['xpaths'], 'i'),
+			attribute_offsets=_decode_column(packed['attributeOffsets'], 'i'),
+			attributes=_decode_column(packed['attributes'], 'i'),
+		)
+
+		nodes: list[DOMBaseNode] = []
+		selector_map = {}
+
+		for i in range(packed['count']):
+			node_flags = flags[i]
+			if node_flags & PackedNodeFlags.TEXT:
+				nodes.append(
+					DOMTextNode(
+						text=strings[names[i]],
+						is_visible=bool(node_flags & PackedNodeFlags.VISIBLE),
+						parent=None,
+					)
+				)
+				continue
+
+			highlight_index = highlight_indices[i]
+			element_node = DOMElementNode(
+				tag_name=strings[names[i]],
+				xpath=None,
+				attributes=None,
+				children=[],
+				is_visible=bool(node_flags & PackedNodeFlags.VISIBLE),
+				is_interactive=bool(node_flags & PackedNodeFlags.INTERACTIVE),
+				is_top_element=bool(node_flags & PackedNodeFlags.TOP_ELEMENT),
+				is_in_viewport=bool(node_flags & PackedNodeFlags.IN_VIEWPORT),
+				highlight_index=highlight_index if highlight_index >= 0 else None,
+				viewport_distance=viewport_distances[i] if viewport_distances is not None and viewport_distances[i] >= 0 else None,
+				shadow_root=bool(node_flags & PackedNodeFlags.SHADOW_ROOT),
+				parent=None,
+				columns=columns,
+				column_index=i,
+			)
+			nodes.append(element_node)
+
+			if element_node.highlight_index is not None:
+				selector_map[element_node.highlight_index] = element_node
+
+		# Nodes are in post-order, iterating in index order keeps the siblings in document order
+		for i, parent_index in enumerate(parents):
+			if parent_index < 0:
+				continue
+			parent_node = nodes[parent_index]
+			child_node = nodes[i]
+			child_node.parent = parent_node
+			parent_node.children.append(child_node)
+
+		root_index = packed['root']
+		root = nodes[root_index] if 0 <= root_index < len(nodes) else None
+		if root is None or not isinstance(root, DOMElementNode):
+			raise ValueError('Failed to parse HTML to dictionary')
+
+		return root, selector_map
+
+	@time_execution_async('--patch_dom_tree')
+	async def _patch_dom_tree(
+		self,
+		eval_page: dict,
+	) -> tuple[DOMElementNode, SelectorMap]:
+		"""Apply an incremental snapshot (changed and removed nodes keyed by stable ids) to the cached tree."""
+		cache = self.tree_cache
+		assert cache is not None
+
+		if eval_page.get('full') or cache.epoch != eval_page['epoch']:
+			# new document or the page lost its snapshot agent, start over
+			cache.reset(eval_page['epoch'])
+
+		for node_id in eval_page.get('removed', []):
+			cache.node_map.pop(node_id, None)
+			cache.children_ids.pop(node_id, None)
+
+		changed_ids = []
+		for node_id, node_data in eval_page['map'].items():
+			node, children_ids = self._parse_node(node_data)
+			if node is None:
+				cache.node_map.pop(node_id, None)
+				cache.children_ids.pop(node_id, None)
+				continue
+
+			existing = cache.node_map.get(node_id)
+			if existing is not None and type(existing) is type(node):
+				self._update_node(existing, node)
+			else:
+				cache.node_map[node_id] = node
+			cache.children_ids[node_id] = children_ids
+			changed_ids.append(node_id)
+
+		# Only changed elements can have a different set of children
+		for node_id in changed_ids:
+			node = cache.node_map[node_id]
+			if not isinstance(node, DOMElementNode):
+				continue
+
+			children = []
+			for child_id in cache.children_ids.get(node_id, []):
+				child_node = cache.node_map.get(child_id)
+				if child_node is None:
+					continue
+				if child_node.parent is not None and child_node.parent is not node and isinstance(child_node, DOMElementNode):
+					# moved to another parent, the branch path hashes of the whole subtree changed
+					child_node._drop_cached_hashes()
+				child_node.parent = node
+				children.append(child_node)
+			node.children = children
+
+		root = cache.node_map.get(str(eval_page['rootId']))
+		if root is None or not isinstance(root, DOMElementNode):
+			cache.reset()
+			raise ValueError('Failed to parse HTML to dictionary')
+
+		selector_map = {}
+		for node in cache.node_map.values():
+			if isinstance(node, DOMElementNode):
+				# is_new is recalculated by the browser context for every state
+				node.is_new = None
+				if node.highlight_index is not None:
+					selector_map[node.highlight_index] = node
+
+		if eval_page.get('dirtySubtrees'):
+			logger.debug(
+				'Incremental DOM snapshot: %d changed, %d removed nodes from %d dirty subtrees',
+				len(changed_ids),
+				len(eval_page.get('removed', [])),
+				eval_page['dirtySubtrees'],
+			)
+
+		return root, selector_map
+
+	@staticmethod
+	def _update_node(existing: DOMBaseNode, node: DOMBaseNode) -> None:
+		"""Copy freshly parsed node data onto the cached node, keeping its identity, parent and children."""
+		# this also drops the cached hash, it depends on the data we just replaced
+		existing._copy_data_from(node)
+
 	def _parse_node(
 		self,
 		node_data: dict,
@@ -196,6 +426,7 @@ class DomService:
 			shadow_root=node_data.get('shadowRoot', False),
 			parent=None,
 			viewport_info=viewport_info,
+			viewport_distance=node_data.get('viewportDistance'),
 		)
 
 		children_ids = node_data.get('children', [])
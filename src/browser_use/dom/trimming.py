@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from browser_use.dom.views import DOMElementNode
+
+# Elements the agent types into or picks from are worth more than links and buttons of the same position
+INPUT_TAGS = frozenset({'input', 'textarea', 'select', 'option'})
+
+# Pixels from the viewport at which an element is worth half of one inside it
+VIEWPORT_HALF_VALUE_DISTANCE = 1000
+# Assumed distance of elements outside the (expanded) viewport whose distance the snapshot doesn't have
+UNKNOWN_VIEWPORT_DISTANCE = 2 * VIEWPORT_HALF_VALUE_DISTANCE
+
+
+def element_value(node: DOMElementNode) -> float:
+	"""How much a line of the element list is worth to the agent: elements close to the viewport, new since the last
+	step and interactive ones are kept longest"""
+	distance = node.viewport_distance
+	if distance is None:
+		distance = 0 if node.is_in_viewport else UNKNOWN_VIEWPORT_DISTANCE
+
+	value = 1 / (1 + distance / VIEWPORT_HALF_VALUE_DISTANCE)
+	if node.is_new:
+		value += 0.5
+	if node.highlight_index is not None:
+		value += 0.5
+		if node.tag_name in INPUT_TAGS:
+			value += 0.25
+	return value
+
+
+def trim_clickable_elements(
+	element_tree: DOMElementNode,
+	max_tokens: int,
+	count_tokens: Callable[[str], int],
+	include_attributes: list[str] | None = None,
+) -> str:
+	"""
+	`clickable_elements_to_string` held to `max_tokens`: the lowest valued lines are dropped first and the others keep
+	their document order. A note at the end tells the agent how many elements it doesn't see.
+	"""
+	lines = element_tree.clickable_element_lines(include_attributes)
+	# +1 for the newline joining each line to the next
+	tokens = [count_tokens(line) + 1 for _, line in lines]
+	total = sum(tokens)
+	if total <= max_tokens:
+		return '\n'.join(line for _, line in lines)
+
+	# ties are dropped from the end of the page first
+	ranked = sorted(range(len(lines)), key=lambda i: (element_value(lines[i][0]), -i))
+	dropped: set[int] = set()
+	dropped_elements = 0
+	note = ''
+	for i in ranked:
+		if total + count_tokens(note) <= max_tokens:
+			break
+		dropped.add(i)
+		total -= tokens[i]
+		if lines[i][0].highlight_index is not None:
+			dropped_elements += 1
+		note = f'... {dropped_elements} less relevant elements and {len(dropped) - dropped_elements} text lines omitted ...'
+
+	kept = [line for i, (_, line) in enumerate(lines) if i not in dropped]
+	if note:
+		kept.append(note)
+	return '\n'.join(kept)
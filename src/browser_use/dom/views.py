@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from functools import cached_property
+from collections.abc import Sequence
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Optional
 
 from browser_use.dom.history_tree_processor.view import CoordinateSet, HashedDomElement, ViewportInfo
@@ -10,20 +10,64 @@ if TYPE_CHECKING:
 	from .views import DOMElementNode
 
 
-@dataclass(frozen=False)
+class DOMSnapshotColumns:
+	"""
+	Columns of a packed DOM snapshot (see `dom_transfer_format='packed'`).
+
+	Element nodes built from a packed snapshot keep a reference to these columns and only decode their xpath and attributes on first access.
+	"""
+
+	__slots__ = ('strings', 'xpaths', 'attribute_offsets', 'attributes')
+
+	def __init__(self, strings: list[str], xpaths: Sequence[int], attribute_offsets: Sequence[int], attributes: Sequence[int]):
+		self.strings = strings
+		self.xpaths = xpaths
+		self.attribute_offsets = attribute_offsets
+		self.attributes = attributes
+
+	def xpath_of(self, index: int) -> str:
+		return self.strings[self.xpaths[index]]
+
+	def attributes_of(self, index: int) -> dict[str, str]:
+		strings = self.strings
+		attributes = self.attributes
+		return {
+			strings[attributes[i]]: strings[attributes[i + 1]]
+			for i in range(self.attribute_offsets[index], self.attribute_offsets[index + 1], 2)
+		}
+
+
 class DOMBaseNode:
-	is_visible: bool
-	# Use None as default and set parent later to avoid circular reference issues
-	parent: Optional['DOMElementNode']
+	"""
+	Nodes use __slots__ instead of dataclasses: there is one instance per DOM node on the page, so the per-instance __dict__ dominated the memory of a step.
+	"""
+
+	__slots__ = ('is_visible', 'parent')
+
+	def __init__(self, is_visible: bool, parent: Optional['DOMElementNode']):
+		self.is_visible = is_visible
+		# Use None as default and set parent later to avoid circular reference issues
+		self.parent = parent
+
+	def _copy_data_from(self, other: 'DOMBaseNode') -> None:
+		"""Copy the node data (everything except the tree links) from a freshly parsed node of the same type"""
+		for cls in type(self).__mro__:
+			for name in getattr(cls, '__slots__', ()):
+				if name not in ('parent', 'children'):
+					setattr(self, name, getattr(other, name))
 
 	def __json__(self) -> dict:
 		raise NotImplementedError('DOMBaseNode is an abstract class')
 
 
-@dataclass(frozen=False)
 class DOMTextNode(DOMBaseNode):
-	text: str
-	type: str = 'TEXT_NODE'
+	__slots__ = ('text',)
+
+	type = 'TEXT_NODE'
+
+	def __init__(self, is_visible: bool, parent: Optional['DOMElementNode'], text: str):
+		super().__init__(is_visible, parent)
+		self.text = text
 
 	def has_parent_with_highlight_index(self) -> bool:
 		current = self.parent
@@ -51,33 +95,105 @@ class DOMTextNode(DOMBaseNode):
 			'type': self.type,
 		}
 
+	def __repr__(self) -> str:
+		return f'DOMTextNode(text={self.text!r}, is_visible={self.is_visible})'
+
 
-@dataclass(frozen=False)
 class DOMElementNode(DOMBaseNode):
 	"""
 	xpath: the xpath of the element from the last root node (shadow root or iframe OR document if no shadow root or iframe).
 	To properly reference the element we need to recursively switch the root node until we find the element (work you way up the tree with `.parent`)
-	"""
-
-	tag_name: str
-	xpath: str
-	attributes: dict[str, str]
-	children: list[DOMBaseNode]
-	is_interactive: bool = False
-	is_top_element: bool = False
-	is_in_viewport: bool = False
-	shadow_root: bool = False
-	highlight_index: int | None = None
-	viewport_coordinates: CoordinateSet | None = None
-	page_coordinates: CoordinateSet | None = None
-	viewport_info: ViewportInfo | None = None
 
+	When built from a packed snapshot, xpath and attributes are decoded from the snapshot columns on first access.
 	"""
-	### State injected by the browser context.
 
-	The idea is that the clickable elements are sometimes persistent from the previous page -> tells the model which objects are new/_how_ the state has changed
-	"""
-	is_new: bool | None = None
+	__slots__ = (
+		'tag_name',
+		'_xpath',
+		'_attributes',
+		'children',
+		'is_interactive',
+		'is_top_element',
+		'is_in_viewport',
+		'shadow_root',
+		'highlight_index',
+		'viewport_coordinates',
+		'page_coordinates',
+		'viewport_info',
+		'viewport_distance',
+		'is_new',
+		'_hash',
+		'_branch_path_hash',
+		'_columns',
+		'_column_index',
+	)
+
+	def __init__(
+		self,
+		is_visible: bool,
+		parent: Optional['DOMElementNode'],
+		tag_name: str,
+		xpath: str | None,
+		attributes: dict[str, str] | None,
+		children: list[DOMBaseNode],
+		is_interactive: bool = False,
+		is_top_element: bool = False,
+		is_in_viewport: bool = False,
+		shadow_root: bool = False,
+		highlight_index: int | None = None,
+		viewport_coordinates: CoordinateSet | None = None,
+		page_coordinates: CoordinateSet | None = None,
+		viewport_info: ViewportInfo | None = None,
+		viewport_distance: int | None = None,
+		is_new: bool | None = None,
+		columns: DOMSnapshotColumns | None = None,
+		column_index: int = -1,
+	):
+		super().__init__(is_visible, parent)
+		self.tag_name = tag_name
+		self._xpath = xpath
+		self._attributes = attributes
+		self.children = children
+		self.is_interactive = is_interactive
+		self.is_top_element = is_top_element
+		self.is_in_viewport = is_in_viewport
+		self.shadow_root = shadow_root
+		self.highlight_index = highlight_index
+		self.viewport_coordinates = viewport_coordinates
+		self.page_coordinates = page_coordinates
+		self.viewport_info = viewport_info
+		# Vertical pixels between a highlighted element and the viewport (0 inside it), None when unknown
+		self.viewport_distance = viewport_distance
+		# State injected by the browser context.
+		# The idea is that the clickable elements are sometimes persistent from the previous page -> tells the model which objects are new/_how_ the state has changed
+		self.is_new = is_new
+		self._hash: HashedDomElement | None = None
+		# Cached by browser_use.dom.hashing, depends on the tag names of all ancestors
+		self._branch_path_hash: str | None = None
+		self._columns = columns
+		self._column_index = column_index
+
+	@property
+	def xpath(self) -> str:
+		if self._xpath is None:
+			self._xpath = self._columns.xpath_of(self._column_index) if self._columns is not None else ''
+		return self._xpath
+
+	@xpath.setter
+	def xpath(self, value: str) -> None:
+		self._xpath = value
+		self._hash = None
+
+	@property
+	def attributes(self) -> dict[str, str]:
+		if self._attributes is None:
+			self._attributes = self._columns.attributes_of(self._column_index) if self._columns is not None else {}
+		return self._attributes
+
+	@attributes.setter
+	def attributes(self, value: dict[str, str]) -> None:
+		self._attributes = value
+		self._hash = None
 
 	def __json__(self) -> dict:
 		return {
@@ -121,117 +237,152 @@ class DOMElementNode(DOMBaseNode):
 
 		return tag_str
 
-	@cached_property
+	@property
 	def hash(self) -> HashedDomElement:
-		from browser_use.dom.history_tree_processor.service import (
-			HistoryTreeProcessor,
-		)
+		from browser_use.dom.hashing import hash_dom_element
 
-		return HistoryTreeProcessor._hash_dom_element(self)
+		return hash_dom_element(self)
+
+	def _drop_cached_hashes(self) -> None:
+		"""Forget the hashes of this subtree, needed when it was moved to another parent"""
+		stack = [self]
+		while stack:
+			node = stack.pop()
+			node._hash = None
+			node._branch_path_hash = None
+			stack.extend(child for child in node.children if isinstance(child, DOMElementNode))
 
 	def get_all_text_till_next_clickable_element(self, max_depth: int = -1) -> str:
 		text_parts = []
 
-		def collect_text(node: DOMBaseNode, current_depth: int) -> None:
+		# Iterative pre-order walk (children pushed in reverse to keep document order), deep trees must not hit the recursion limit
+		stack: list[tuple[DOMBaseNode, int]] = [(self, 0)]
+		while stack:
+			node, current_depth = stack.pop()
 			if max_depth != -1 and current_depth > max_depth:
-				return
-
-			# Skip this branch if we hit a highlighted element (except for the current node)
-			if isinstance(node, DOMElementNode) and node != self and node.highlight_index is not None:
-				return
+				continue
 
 			if isinstance(node, DOMTextNode):
 				text_parts.append(node.text)
 			elif isinstance(node, DOMElementNode):
-				for child in node.children:
-					collect_text(child, current_depth + 1)
+				# Skip this branch if we hit a highlighted element (except for the current node)
+				if node is not self and node.highlight_index is not None:
+					continue
+				stack.extend((child, current_depth + 1) for child in reversed(node.children))
 
-		collect_text(self, 0)
 		return '\n'.join(text_parts).strip()
 
 	@time_execution_sync('--clickable_elements_to_string')
 	def clickable_elements_to_string(self, include_attributes: list[str] | None = None) -> str:
 		"""Convert the processed DOM content to HTML."""
-		formatted_text = []
+		return '\n'.join(line for _, line in self.clickable_element_lines(include_attributes))
+
+	def clickable_element_lines(self, include_attributes: list[str] | None = None) -> list[tuple['DOMElementNode', str]]:
+		"""Lines of `clickable_elements_to_string` with the element each one describes (the parent for text lines).
 
-		def process_node(node: DOMBaseNode, depth: int) -> None:
-			next_depth = int(depth)
-			depth_str = depth * '\t'
+		The tree is walked once, without recursion. Text nodes are collected for their nearest highlighted ancestor
+		in the same pass, so the line of a highlighted element is reserved when it is entered and filled in once its
+		subtree is done.
+		"""
+		formatted_text: list[tuple[DOMElementNode, str]] = []
 
+		# Text parts of the highlighted elements on the current path, innermost last
+		open_text_parts: list[list[str]] = []
+
+		# A highlighted element above the serialized subtree owns all of its text
+		has_highlighted_ancestor = False
+		current = self.parent
+		while current is not None:
+			if current.highlight_index is not None:
+				has_highlighted_ancestor = True
+				break
+			current = current.parent
+
+		# Stack items are (node, depth) to enter a node or (None, node, depth, line index, text parts) to close a highlighted element
+		stack: list[tuple] = [(self, 0)]
+		while stack:
+			item = stack.pop()
+
+			if item[0] is None:
+				_, node, depth, line_index, text_parts = item
+				open_text_parts.pop()
+				formatted_text[line_index] = (
+					node,
+					node._clickable_element_line(depth, '\n'.join(text_parts).strip(), include_attributes),
+				)
+				continue
+
+			node, depth = item
 			if isinstance(node, DOMElementNode):
+				next_depth = depth
 				# Add element with highlight_index
 				if node.highlight_index is not None:
 					next_depth += 1
-
-					text = node.get_all_text_till_next_clickable_element()
-					attributes_html_str = ''
-					if include_attributes:
-						attributes_to_include = {
-							key: str(value) for key, value in node.attributes.items() if key in include_attributes
-						}
-
-						# Easy LLM optimizations
-						# if tag == role attribute, don't include it
-						if node.tag_name == attributes_to_include.get('role'):
-							del attributes_to_include['role']
-
-						# if aria-label == text of the node, don't include it
-						if (
-							attributes_to_include.get('aria-label')
-							and attributes_to_include.get('aria-label', '').strip() == text.strip()
-						):
-							del attributes_to_include['aria-label']
-
-						# if placeholder == text of the node, don't include it
-						if (
-							attributes_to_include.get('placeholder')
-							and attributes_to_include.get('placeholder', '').strip() == text.strip()
-						):
-							del attributes_to_include['placeholder']
-
-						if attributes_to_include:
-							# Format as key1='value1' key2='value2'
-							attributes_html_str = ' '.join(f"{key}='{value}'" for key, value in attributes_to_include.items())
-
-					# Build the line
-					if node.is_new:
-						highlight_indicator = f'*[{node.highlight_index}]*'
-					else:
-						highlight_indicator = f'[{node.highlight_index}]'
-
-					line = f'{depth_str}{highlight_indicator}<{node.tag_name}'
-
-					if attributes_html_str:
-						line += f' {attributes_html_str}'
-
-					if text:
-						# Add space before >text only if there were NO attributes added before
-						if not attributes_html_str:
-							line += ' '
-						line += f'>{text}'
-					# Add space before /> only if neither attributes NOR text were added
-					elif not attributes_html_str:
-						line += ' '
-
-					line += ' />'  # 1 token
-					formatted_text.append(line)
+					text_parts: list[str] = []
+					formatted_text.append((node, ''))
+					stack.append((None, node, depth, len(formatted_text) - 1, text_parts))
+					open_text_parts.append(text_parts)
 
 				# Process children regardless
-				for child in node.children:
-					process_node(child, next_depth)
+				stack.extend((child, next_depth) for child in reversed(node.children))
 
 			elif isinstance(node, DOMTextNode):
+				if open_text_parts:
+					open_text_parts[-1].append(node.text)
 				# Add text only if it doesn't have a highlighted parent
-				if (
-					not node.has_parent_with_highlight_index()
-					and node.parent
-					and node.parent.is_visible
-					and node.parent.is_top_element
+				elif (
+					not has_highlighted_ancestor and node.parent and node.parent.is_visible and node.parent.is_top_element
 				):  # and node.is_parent_top_element()
-					formatted_text.append(f'{depth_str}{node.text}')
+					formatted_text.append((node.parent, depth * '\t' + node.text))
+
+		return formatted_text
+
+	def _clickable_element_line(self, depth: int, text: str, include_attributes: list[str] | None) -> str:
+		"""Format a highlighted element, its text is everything until the next clickable element"""
+		attributes_html_str = ''
+		if include_attributes:
+			attributes_to_include = {key: str(value) for key, value in self.attributes.items() if key in include_attributes}
+
+			# Easy LLM optimizations
+			# if tag == role attribute, don't include it
+			if self.tag_name == attributes_to_include.get('role'):
+				del attributes_to_include['role']
+
+			# if aria-label == text of the node, don't include it
+			if attributes_to_include.get('aria-label') and attributes_to_include.get('aria-label', '').strip() == text.strip():
+				del attributes_to_include['aria-label']
+
+			# if placeholder == text of the node, don't include it
+			if attributes_to_include.get('placeholder') and attributes_to_include.get('placeholder', '').strip() == text.strip():
+				del attributes_to_include['placeholder']
+
+			if attributes_to_include:
+				# Format as key1='value1' key2='value2'
+				attributes_html_str = ' '.join(f"{key}='{value}'" for key, value in attributes_to_include.items())
 
-		process_node(self, 0)
-		return '\n'.join(formatted_text)
+		# Build the line
+		if self.is_new:
+			highlight_indicator = f'*[{self.highlight_index}]*'
+		else:
+			highlight_indicator = f'[{self.highlight_index}]'
+
+		depth_str = depth * '\t'
+		line = f'{depth_str}{highlight_indicator}<{self.tag_name}'
+
+		if attributes_html_str:
+			line += f' {attributes_html_str}'
+
+		if text:
+			# Add space before >text only if there were NO attributes added before
+			if not attributes_html_str:
+				line += ' '
+			line += f'>{text}'
+		# Add space before /> only if neither attributes NOR text were added
+		elif not attributes_html_str:
+			line += ' '
+
+		line += ' />'  # 1 token
+		return line
 
 	def get_file_upload_element(self, check_siblings: bool = True) -> Optional['DOMElementNode']:
 		# Check if current element is a file input
@@ -263,3 +414,22 @@ SelectorMap = dict[int, DOMElementNode]
 class DOMState:
 	element_tree: DOMElementNode
 	selector_map: SelectorMap
+
+
+@dataclass
+class DOMTreeCache:
+	"""
+	Python-side mirror of the in-page snapshot agent used for incremental DOM snapshots.
+
+	Nodes are keyed by the stable ids assigned in buildDomTree.js and patched in place with the
+	deltas returned by the page, so unchanged parts of the tree are never rebuilt.
+	"""
+
+	epoch: str | None = None
+	node_map: dict[str, DOMBaseNode] = field(default_factory=dict)
+	children_ids: dict[str, list[str]] = field(default_factory=dict)
+
+	def reset(self, epoch: str | None = None) -> None:
+		self.epoch = epoch
+		self.node_map.clear()
+		self.children_ids.clear()
@@ -23,6 +23,7 @@ from browser_use.controller.views import (
 import logging
 import inspect
 import asyncio
+import functools
 import os
 from langchain_core.language_models.chat_models import BaseChatModel
 from browser_use.agent.views import ActionModel, ActionResult
@@ -41,12 +42,20 @@ class CustomController(Controller):
                  output_model: Optional[Type[BaseModel]] = None,
                  ask_assistant_callback: Optional[Union[Callable[[str, BrowserContext], Dict[str, Any]], Callable[
                      [str, BrowserContext], Awaitable[Dict[str, Any]]]]] = None,
+                 extraction_cache: Optional[Any] = None,
                  ):
+        """
+        extraction_cache: optional cache of page extractions (e.g. the deep research ResearchCache), consulted before
+        extract_content calls the page extraction LLM
+        """
         super().__init__(exclude_actions=exclude_actions, output_model=output_model)
         self._register_custom_actions()
         self.ask_assistant_callback = ask_assistant_callback
         self.mcp_client = None
         self.mcp_server_config = None
+        self.extraction_cache = extraction_cache
+        if extraction_cache is not None:
+            self._cache_page_extractions()
 
     def _register_custom_actions(self):
         """Register all custom browser actions"""
@@ -106,6 +115,32 @@ class CustomController(Controller):
                 logger.info(msg)
                 return ActionResult(error=msg)
 
+    def _cache_page_extractions(self):
+        """Serve extract_content from `extraction_cache` when the page and the goal were already extracted"""
+        action = self.registry.registry.actions.get('extract_content')
+        if action is None:
+            return
+        extract_content = action.function
+
+        # functools.wraps keeps the signature the registry inspects to inject the browser and the LLM
+        @functools.wraps(extract_content)
+        async def cached_extract_content(goal: str, should_strip_link_urls: bool, browser: BrowserContext,
+                                         page_extraction_llm: BaseChatModel):
+            page = await browser.get_current_page()
+            try:
+                page_text = await page.evaluate("document.body ? document.body.innerText : ''")
+            except Exception as e:
+                logger.debug(f'Could not read the page text, not caching the extraction: {e}')
+                return await extract_content(goal, should_strip_link_urls, browser, page_extraction_llm)
+            return await self.extraction_cache.extract(
+                page.url, page_text, goal, should_strip_link_urls,
+                lambda: extract_content(goal, should_strip_link_urls, browser, page_extraction_llm),
+                # without include_in_memory the LLM call failed and the result is the raw page
+                is_reusable=lambda result: isinstance(result, ActionResult) and result.include_in_memory,
+            )
+
+        action.function = cached_extract_content
+
     @time_execution_sync('--act')
     async def act(
             self,
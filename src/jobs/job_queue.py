@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .job_store import Job, JobStatus, JobStore
+
+logger = logging.getLogger(__name__)
+
+# Runs a job and returns its result, exceptions mark the job as failed
+JobRunner = Callable[[Job], Awaitable[Any]]
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Bounded in-process queue of agent jobs, executed by a fixed number of workers.
+
+    Size the workers to the browser capacity: jobs beyond that wait in the queue (at most `max_queued`), and submitting
+    more than that is refused with JobQueueFull. Job state is written to the store on every transition, so it can be
+    polled while the job runs and read back after it finished.
+    """
+
+    def __init__(self, runner: JobRunner, store: JobStore, workers: int = 1, max_queued: int = 100):
+        self.runner = runner
+        self.store = store
+        self.workers = max(workers, 1)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancelled: set = set()
+
+    async def start(self):
+        # Jobs of a previous process can't be resumed, their browser and agent state are gone
+        for job in await self.store.list_unfinished():
+            job.status = JobStatus.FAILED
+            job.error = "Interrupted by a service restart"
+            job.finished_at = time.time()
+            await self.store.save(job)
+
+        self._worker_tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Job queue started with {self.workers} workers")
+
+    async def submit(self, query: str, url: str, user: Optional[str] = None) -> Job:
+        if self._queue.full():
+            raise JobQueueFull(f"{self._queue.qsize()} jobs are already waiting")
+
+        job = Job(task_id=str(uuid.uuid4()), query=query, url=url, user=user)
+        await self.store.save(job)
+        self._queue.put_nowait(job)
+        return job
+
+    async def get(self, task_id: str) -> Optional[Job]:
+        return await self.store.get(task_id)
+
+    async def cancel(self, task_id: str) -> Optional[Job]:
+        """Cancel a queued or running job, finished jobs are returned unchanged"""
+        job = await self.store.get(task_id)
+        if job is None or job.finished:
+            return job
+
+        # a queued job is skipped when it comes up, a running one stays cancelled even if its runner swallows the
+        # cancellation and returns
+        self._cancelled.add(task_id)
+        running = self._running.get(task_id)
+        if running is not None:
+            running.cancel()
+
+        job.status = JobStatus.CANCELLED
+        job.finished_at = time.time()
+        await self.store.save(job)
+        return job
+
+    @property
+    def stats(self) -> dict:
+        return {"workers": self.workers, "queued": self._queue.qsize(), "running": len(self._running)}
+
+    async def close(self):
+        for task in [*self._worker_tasks, *self._running.values()]:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        await self.store.close()
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.task_id in self._cancelled:
+                    self._cancelled.discard(job.task_id)
+                    continue
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} failed on job {job.task_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        await self.store.save(job)
+        if job.task_id in self._cancelled:
+            # cancelled while the running state was being saved, that save must not be the last one
+            self._cancelled.discard(job.task_id)
+            job.status = JobStatus.CANCELLED
+            job.finished_at = time.time()
+            await self.store.save(job)
+            return
+
+        task = asyncio.create_task(self.runner(job))
+        self._running[job.task_id] = task
+        try:
+            job.result = await task
+            job.status = JobStatus.CANCELLED if job.task_id in self._cancelled else JobStatus.SUCCEEDED
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # the worker itself is being cancelled (shutdown)
+                task.cancel()
+                raise
+            job.status = JobStatus.CANCELLED
+        except Exception as e:
+            logger.error(f"Job {job.task_id} failed: {e}")
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+        finally:
+            self._running.pop(job.task_id, None)
+            self._cancelled.discard(job.task_id)
+            job.finished_at = time.time()
+            await self.store.save(job)
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+@dataclass
+class Job:
+    task_id: str
+    query: str
+    url: str
+    user: Optional[str] = None
+    status: str = JobStatus.QUEUED
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in JobStatus.FINISHED
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobStore(ABC):
+    """Where job state lives. Subclass it to keep jobs somewhere else than SQLite (e.g. a database shared by replicas)"""
+
+    @abstractmethod
+    async def save(self, job: Job) -> None:
+        pass
+
+    @abstractmethod
+    async def get(self, task_id: str) -> Optional[Job]:
+        pass
+
+    @abstractmethod
+    async def list_unfinished(self) -> List[Job]:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryJobStore(JobStore):
+    """Keeps jobs for the life of the process only"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+
+    async def save(self, job: Job) -> None:
+        self._jobs[job.task_id] = Job(**job.to_dict())
+
+    async def get(self, task_id: str) -> Optional[Job]:
+        job = self._jobs.get(task_id)
+        return Job(**job.to_dict()) if job else None
+
+    async def list_unfinished(self) -> List[Job]:
+        return [Job(**job.to_dict()) for job in self._jobs.values() if not job.finished]
+
+
+class SQLiteJobStore(JobStore):
+    """Jobs in a local SQLite file, queries run in a worker thread so they never block the event loop"""
+
+    _COLUMNS = ("task_id", "query", "url", "user", "status", "result", "error", "created_at", "started_at", "finished_at")
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    task_id TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    user TEXT,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+
+    async def save(self, job: Job) -> None:
+        row = job.to_dict()
+        row["result"] = json.dumps(row["result"], default=str) if row["result"] is not None else None
+        await asyncio.to_thread(
+            self._execute,
+            f"INSERT OR REPLACE INTO jobs ({', '.join(self._COLUMNS)}) VALUES ({', '.join('?' * len(self._COLUMNS))})",
+            tuple(row[column] for column in self._COLUMNS),
+        )
+
+    async def get(self, task_id: str) -> Optional[Job]:
+        rows = await asyncio.to_thread(
+            self._execute, f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE task_id = ?", (task_id,)
+        )
+        return self._to_job(rows[0]) if rows else None
+
+    async def list_unfinished(self) -> List[Job]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE status IN (?, ?)",
+            (JobStatus.QUEUED, JobStatus.RUNNING),
+        )
+        return [self._to_job(row) for row in rows]
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql: str, params: tuple) -> list:
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _to_job(self, row) -> Job:
+        values = dict(zip(self._COLUMNS, row))
+        if values["result"] is not None:
+            values["result"] = json.loads(values["result"])
+        return Job(**values)
+
+
+def get_job_store() -> JobStore:
+    """Job store selected by JOB_STORE_BACKEND (sqlite or memory), the SQLite file is JOB_STORE_PATH"""
+    backend = os.getenv("JOB_STORE_BACKEND", "sqlite").lower()
+    if backend == "memory":
+        return InMemoryJobStore()
+    if backend != "sqlite":
+        logger.warning(f"Unknown JOB_STORE_BACKEND '{backend}', using sqlite")
+    path = os.getenv("JOB_STORE_PATH") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "outputdata", "jobs.sqlite3")
+    return SQLiteJobStore(path)
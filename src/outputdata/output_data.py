@@ -1,9 +1,59 @@
+import asyncio
 import json
 import os
+import threading
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Iterator, List, Optional
 import subprocess
 
+
+def task_output_dir(task_id: str) -> Path:
+    """Directory with everything a single agent task writes (execution log, step responses)"""
+    return Path(__file__).parent / "tasks" / task_id
+
+
+class TaskExecutionLog:
+    """
+    Agent outputs of one task. Entries are kept in memory for the caller and appended to the task's own
+    execution.jsonl, so concurrent tasks never share (or rewrite) a file.
+    """
+
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self.entries: List[dict] = []
+        self.path = task_output_dir(task_id) / "execution.jsonl"
+        self._lock = threading.Lock()
+
+    def append(self, entry: dict) -> None:
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            self.entries.append(entry)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+# Log of the task running in the current asyncio context, write_data_to_file falls back to agent_execution.json
+_current_execution_log: ContextVar[Optional[TaskExecutionLog]] = ContextVar("current_execution_log", default=None)
+
+
+@contextmanager
+def use_execution_log(execution_log: TaskExecutionLog) -> Iterator[TaskExecutionLog]:
+    """Send the write_data_to_file calls made inside the block (and the tasks it starts) to execution_log"""
+    token = _current_execution_log.set(execution_log)
+    try:
+        yield execution_log
+    finally:
+        _current_execution_log.reset(token)
+
+
+# write_data_to_file may run in several threads at once (see awrite_data_to_file)
+_agent_execution_file_lock = threading.Lock()
+
+
 def write_data_to_file(
     agents_name: str,
     number_of_tries: int = 1,
@@ -14,25 +64,10 @@ def write_data_to_file(
     memory=None,
     next_goal=None,
     actions=None,
-    final_result=None
+    final_result=None,
+    cache_hit: bool = False
 ) -> None:
     try:
-        script_dir = Path(__file__).parent
-        output_file = script_dir / 'agent_execution.json'
-        os.makedirs(script_dir, exist_ok=True)
-
-        # Read existing data safely
-        if output_file.exists():
-            with open(output_file, 'r', encoding='utf-8') as f:
-                try:
-                    data = json.load(f)
-                    if not isinstance(data, list):
-                        data = []
-                except json.JSONDecodeError:
-                    data = []
-        else:
-            data = []
-
         #construct new entry
         if agents_name == "Browser Use Agent":
             new_entry = {
@@ -60,17 +95,41 @@ def write_data_to_file(
             new_entry = {
                 "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
                 "agents_name": agents_name,
-                "number_of_tries": number_of_tries,
+                # an output reused from the preflight cache took no tries
+                **({"cache_hit": True} if cache_hit else {"number_of_tries": number_of_tries}),
                 "time_taken": time_taken,
                 "user_input": user_input,
                 "output": serializable_output
             }
 
-        data.append(new_entry)
+        execution_log = _current_execution_log.get()
+        if execution_log is not None:
+            execution_log.append(new_entry)
+            print(f"✅ Successfully wrote data for agent: {agents_name} (task {execution_log.task_id})")
+            return
+
+        script_dir = Path(__file__).parent
+        output_file = script_dir / 'agent_execution.json'
+        os.makedirs(script_dir, exist_ok=True)
+
+        with _agent_execution_file_lock:
+            # Read existing data safely
+            if output_file.exists():
+                with open(output_file, 'r', encoding='utf-8') as f:
+                    try:
+                        data = json.load(f)
+                        if not isinstance(data, list):
+                            data = []
+                    except json.JSONDecodeError:
+                        data = []
+            else:
+                data = []
+
+            data.append(new_entry)
 
-        #Write entire list back safely
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+            #Write entire list back safely
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
         
         print(f"✅ Successfully wrote data for agent: {agents_name}")
 
@@ -82,6 +141,11 @@ def write_data_to_file(
             print(f"🔍 Debug info - output attributes: {dir(output)}")
 
 
+async def awrite_data_to_file(*args, **kwargs) -> None:
+    """write_data_to_file in a worker thread, for callers on the event loop (the task's execution log is kept)"""
+    await asyncio.to_thread(write_data_to_file, *args, **kwargs)
+
+
 def merge_videos_in_order(base_videos_dir: str = "/app/src/outputdata/videos", output_path: str = "/app/src/outputdata/merged.webm") -> str:
     """
     Merge all per-tab videos in order: tab_001_*, tab_002_*, ... into a single webm/mp4 file.
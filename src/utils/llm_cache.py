@@ -0,0 +1,263 @@
+"""
+Response cache and request deduplication for the chat models returned by `llm_provider.get_llm_model`.
+
+The cache plugs into LangChain's own `BaseChatModel.cache` hook, so structured output and tool calling keep working
+unchanged. Keys are a hash of the normalized messages and the model parameters: screenshots are left out by default
+(the DOM text already describes the page), and so are message ids and the current time of browser_use's state
+message. Identical requests that are already in flight are merged into one provider call.
+
+A request repeated shortly after it was answered is a retry (e.g. after the response failed to parse): it skips the
+cache, and its fresh response replaces the cached one.
+"""
+
+import asyncio
+import copy
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.load import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+_IMAGE_PART_TYPES = ("image_url", "image")
+# Differ between otherwise identical messages
+_VOLATILE_KEYS = ("response_metadata", "usage_metadata")
+_CURRENT_TIME = re.compile(r"Current date and time: \d{4}-\d{2}-\d{2} \d{2}:\d{2}")
+
+
+def _normalize(value: Any, include_images: bool) -> Any:
+    if isinstance(value, dict):
+        if not include_images and value.get("type") in _IMAGE_PART_TYPES:
+            return {"type": value["type"]}
+        return {
+            key: _normalize(item, include_images)
+            for key, item in value.items()
+            # string ids are message and tool call ids, list ids are the serialized class paths
+            if key not in _VOLATILE_KEYS and not (key == "id" and isinstance(item, str))
+        }
+    if isinstance(value, list):
+        return [_normalize(item, include_images) for item in value]
+    if isinstance(value, str):
+        return _CURRENT_TIME.sub("Current date and time: <now>", value).strip()
+    return value
+
+
+def cache_key(prompt: str, llm_string: str, include_images: bool = False) -> str:
+    """Hash of a serialized message list (as LangChain passes it to caches) and the model parameters"""
+    try:
+        normalized = json.dumps(_normalize(json.loads(prompt), include_images), sort_keys=True)
+    except ValueError:
+        normalized = prompt
+    return hashlib.sha256(f"{llm_string}\n{normalized}".encode()).hexdigest()
+
+
+class LLMResponseCache(BaseCache):
+    """LangChain cache of chat model responses in a local SQLite file, with a TTL and least recently used eviction"""
+
+    def __init__(self, path: str, ttl: float = 86400.0, max_entries: int = 5000, include_images: bool = False,
+                 retry_window: float = 300.0):
+        self.ttl = ttl
+        self.retry_window = retry_window
+        self.max_entries = max_entries
+        self.include_images = include_images
+        self.hits = 0
+        self.misses = 0
+        self.retries = 0
+        # when each key was last answered, asking again within retry_window is a retry
+        self._answered: Dict[str, float] = {}
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache (last_used)")
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def key(self, prompt: str, llm_string: str) -> str:
+        return cache_key(prompt, llm_string, self.include_images)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if not self.enabled:
+            return None
+        key = self.key(prompt, llm_string)
+        if not self._answer(key):
+            # the caller didn't accept the answer it got, ask the model again
+            self.retries += 1
+            logger.info(f"LLM cache skipped for a retried request ({self.retries} retries)")
+            return None
+        value = self._lookup(key)
+        if value is None:
+            self.misses += 1
+            return None
+        try:
+            generations = [loads(generation) for generation in json.loads(value)]
+        except Exception as e:
+            logger.warning(f"Dropping unreadable LLM cache entry: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info(f"LLM cache hit ({self.hits} hits, {self.misses} misses)")
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if not self.enabled:
+            return
+        key = self.key(prompt, llm_string)
+        self._answer(key)
+        self._store(key, json.dumps([dumps(generation) for generation in return_val]))
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return await asyncio.to_thread(self.lookup, prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        await asyncio.to_thread(self.update, prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def _answer(self, key: str) -> bool:
+        """Records that `key` is being answered, False if it already was within the retry window"""
+        now = time.monotonic()
+        with self._lock:
+            answered_at = self._answered.get(key)
+            self._answered[key] = now
+            if len(self._answered) > self.max_entries:
+                self._answered = {k: t for k, t in self._answered.items() if now - t < self.retry_window}
+        return answered_at is None or now - answered_at >= self.retry_window
+
+    def _lookup(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND created_at > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def _store(self, key: str, value: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, value, now, now))
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,))
+            self._conn.execute(
+                """
+                DELETE FROM llm_cache WHERE rowid IN (
+                    SELECT rowid FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+
+class _InFlightRequests:
+    """Provider calls that are running, by cache key, so identical requests wait for the first one instead"""
+
+    def __init__(self):
+        self._requests: Dict[str, asyncio.Future] = {}
+        self.merged = 0
+
+    async def run(self, key: str, call):
+        while key in self._requests:
+            running = self._requests[key]
+            self.merged += 1
+            logger.info(f"Merged an identical in-flight LLM request ({self.merged} so far)")
+            try:
+                # LangChain sets ids and metadata on the result, every caller gets its own copy
+                return copy.deepcopy(await asyncio.shield(running))
+            except asyncio.CancelledError:
+                # the first caller was cancelled, not this one: make the call ourselves
+                if running.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._requests[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            # waiters get the same error the provider returned
+            future.set_exception(e)
+            # marks the exception as retrieved, there may be no waiters
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._requests.pop(key, None)
+
+
+def enable_llm_cache(llm: BaseChatModel, cache: Optional["LLMResponseCache"] = None) -> BaseChatModel:
+    """Attach the response cache and in-flight deduplication to a chat model, in place"""
+    cache = cache or get_llm_response_cache()
+    if cache is None or not isinstance(llm, BaseChatModel):
+        return llm
+
+    llm.cache = cache
+    agenerate = llm._agenerate
+
+    @functools.wraps(agenerate)
+    async def _agenerate(messages: Sequence, stop: Optional[list] = None, **kwargs: Any):
+        params = {name: value for name, value in kwargs.items() if name != "run_manager"}
+        key = cache.key(dumps(messages), llm._get_llm_string(stop=stop, **params))
+        return await _in_flight.run(key, lambda: agenerate(messages, stop=stop, **kwargs))
+
+    # the instance attribute shadows the class method, `_agenerate_with_cache` calls it after a cache miss
+    object.__setattr__(llm, "_agenerate", _agenerate)
+    return llm
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_loaded = False
+_in_flight = _InFlightRequests()
+
+
+def get_llm_response_cache() -> Optional[LLMResponseCache]:
+    """Process wide cache, configured by LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_INCLUDE_IMAGES and LLM_CACHE_RETRY_WINDOW. None when it's disabled, which is the default: interactive runs want fresh answers"""
+    global _llm_cache, _llm_cache_loaded
+    if not _llm_cache_loaded:
+        _llm_cache_loaded = True
+        if os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("true", "1", "yes"):
+            path = os.getenv("LLM_CACHE_PATH") or os.path.join(
+                os.path.dirname(os.path.dirname(__file__)), "outputdata", "llm_cache.sqlite3"
+            )
+            _llm_cache = LLMResponseCache(
+                path,
+                ttl=float(os.getenv("LLM_CACHE_TTL") or 86400),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES") or 5000),
+                include_images=os.getenv("LLM_CACHE_INCLUDE_IMAGES", "false").lower() in ("true", "1", "yes"),
+                retry_window=float(os.getenv("LLM_CACHE_RETRY_WINDOW") or 300),
+            )
+    return _llm_cache
@@ -50,6 +50,7 @@ from langchain_aws import ChatBedrock
 from pydantic import SecretStr
 
 from src.utils import config
+from src.utils.llm_cache import enable_llm_cache
 
 
 class DeepSeekR1ChatOpenAI(ChatOpenAI):
@@ -151,11 +152,15 @@ class DeepSeekR1ChatOllama(ChatOllama):
 
 def get_llm_model(provider: str, **kwargs):
     """
-    Get LLM model
+    Get LLM model, with the response cache and in-flight request deduplication of `llm_cache` attached
     :param provider: LLM provider
     :param kwargs:
     :return:
     """
+    return enable_llm_cache(_create_llm_model(provider, **kwargs))
+
+
+def _create_llm_model(provider: str, **kwargs):
     if provider not in ["ollama", "bedrock"]:
         env_var = f"{provider.upper()}_API_KEY"
         api_key = kwargs.get("api_key", "") or os.getenv(env_var, "")
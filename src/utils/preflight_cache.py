@@ -0,0 +1,187 @@
+"""
+Cache of the pre-flight stages of an agent run (QA possibility check, prompt enhancement).
+
+Entries are content addressed: the key is a hash of the stage inputs (normalized query, URL, prompt), and the
+screenshot is matched by perceptual hash, so a screenshot of the same page that differs in a few pixels still hits.
+Entries expire after a TTL, the least recently used ones are evicted, and everything lives in a local SQLite file.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, whitespace collapsed and without trailing punctuation, so trivially different queries share entries"""
+    return re.sub(r"\s+", " ", query or "").strip().rstrip(".!?").strip().lower()
+
+
+def screenshot_hash(path: str) -> Optional[str]:
+    """Perceptual hash (hex) of a screenshot file, or a sha256 of its bytes when Pillow isn't installed"""
+    try:
+        from PIL import Image
+
+        from browser_use.browser.screenshot import perceptual_hash
+
+        with Image.open(path) as image:
+            return f"p{perceptual_hash(image):064x}"
+    except ImportError:
+        with open(path, "rb") as f:
+            return f"s{hashlib.sha256(f.read()).hexdigest()}"
+    except Exception as e:
+        logger.warning(f"Could not hash screenshot {path}: {e}")
+        return None
+
+
+def _image_distance(a: str, b: str) -> Optional[int]:
+    """Bits between two perceptual hashes, None if the images can't be compared (missing or exact hashes)"""
+    if a == b:
+        return 0
+    if not a.startswith("p") or not b.startswith("p"):
+        return None
+    return (int(a[1:], 16) ^ int(b[1:], 16)).bit_count()
+
+
+@dataclass
+class StageStats:
+    hits: int = 0
+    misses: int = 0
+    saved_seconds: float = 0.0
+
+
+class PreflightCache:
+    def __init__(self, path: str, ttl: float = 3600.0, max_entries: int = 1000, max_image_distance: int = 8):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Perceptual hashes at most this many bits apart are considered the same screenshot
+        self.max_image_distance = max_image_distance
+        self.stats: Dict[str, StageStats] = {}
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS preflight_cache (
+                    stage TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    image_hash TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    cost REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (stage, key, image_hash)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS preflight_cache_lru ON preflight_cache (last_used)")
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    async def get(self, stage: str, key_parts: Dict[str, Any], image_hash: Optional[str] = None) -> Optional[Any]:
+        """Cached value of a stage for these inputs, None on a miss (which is counted in the stage's stats)"""
+        if not self.enabled:
+            return None
+
+        key = self._key(key_parts)
+        found = await asyncio.to_thread(self._lookup, stage, key, image_hash or "")
+        stats = self.stats.setdefault(stage, StageStats())
+        if found is None:
+            stats.misses += 1
+            logger.info(f"Preflight cache miss for {stage} ({self._summary(stats)})")
+            return None
+
+        value, cost = found
+        stats.hits += 1
+        stats.saved_seconds += cost
+        logger.info(f"Preflight cache hit for {stage}, saved {cost:.2f}s ({self._summary(stats)})")
+        return value
+
+    async def put(self, stage: str, key_parts: Dict[str, Any], value: Any, cost: float, image_hash: Optional[str] = None):
+        """Store the value a stage computed in `cost` seconds"""
+        if not self.enabled:
+            return
+        await asyncio.to_thread(self._store, stage, self._key(key_parts), image_hash or "", json.dumps(value), cost)
+
+    def _key(self, key_parts: Dict[str, Any]) -> str:
+        return hashlib.sha256(json.dumps(key_parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _summary(self, stats: StageStats) -> str:
+        return f"{stats.hits} hits, {stats.misses} misses, {stats.saved_seconds:.2f}s saved"
+
+    def _lookup(self, stage: str, key: str, image_hash: str):
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT image_hash, value, cost FROM preflight_cache WHERE stage = ? AND key = ? AND created_at > ?",
+                (stage, key, now - self.ttl),
+            ).fetchall()
+
+            best = None
+            for row_image_hash, value, cost in rows:
+                distance = _image_distance(image_hash, row_image_hash)
+                if distance is None or distance > self.max_image_distance:
+                    continue
+                if best is None or distance < best[0]:
+                    best = (distance, row_image_hash, value, cost)
+
+            if best is None:
+                return None
+
+            _, row_image_hash, value, cost = best
+            self._conn.execute(
+                "UPDATE preflight_cache SET last_used = ? WHERE stage = ? AND key = ? AND image_hash = ?",
+                (now, stage, key, row_image_hash),
+            )
+            return json.loads(value), cost
+
+    def _store(self, stage: str, key: str, image_hash: str, value: str, cost: float):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO preflight_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (stage, key, image_hash, value, cost, now, now),
+            )
+            self._conn.execute("DELETE FROM preflight_cache WHERE created_at <= ?", (now - self.ttl,))
+            self._conn.execute(
+                """
+                DELETE FROM preflight_cache WHERE rowid IN (
+                    SELECT rowid FROM preflight_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+
+_preflight_cache: Optional[PreflightCache] = None
+
+
+def get_preflight_cache() -> PreflightCache:
+    """Process wide cache, configured by PREFLIGHT_CACHE_PATH, PREFLIGHT_CACHE_TTL (0 disables it) and
+    PREFLIGHT_CACHE_MAX_ENTRIES"""
+    global _preflight_cache
+    if _preflight_cache is None:
+        path = os.getenv("PREFLIGHT_CACHE_PATH") or os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), "outputdata", "preflight_cache.sqlite3"
+        )
+        _preflight_cache = PreflightCache(
+            path,
+            ttl=float(os.getenv("PREFLIGHT_CACHE_TTL") or 3600),
+            max_entries=int(os.getenv("PREFLIGHT_CACHE_MAX_ENTRIES") or 1000),
+        )
+    return _preflight_cache
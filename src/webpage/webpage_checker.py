@@ -2,7 +2,7 @@ import httpx
 import requests
 import logging
 logger = logging.getLogger(__name__)
-from ..outputdata.output_data import write_data_to_file
+from ..outputdata.output_data import awrite_data_to_file
 
 class WebpageChecker:
     def __init__(self, url,message_callback=None) -> None:
@@ -31,7 +31,7 @@ class WebpageChecker:
                     if self.message_callback:
                         await self.message_callback(f"⚠️ HEAD request got status {response.status_code}, trying GET instead...")
                     response = await client.get(self.url, headers=headers, follow_redirects=True)
-                write_data_to_file(
+                await awrite_data_to_file(
                     agents_name="Webpage Checker",
                     number_of_tries=1,
                     time_taken=1,
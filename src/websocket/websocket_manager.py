@@ -1,46 +1,142 @@
-from fastapi import WebSocket, logger
-from typing import List
+from fastapi import WebSocket
+from typing import Dict, List, Optional
+from collections import deque
 import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Connection:
+    """
+    One client with its own outbound queue and writer task, so a slow client only ever delays itself.
+
+    When the queue is full the oldest messages are dropped and the client gets a single notice with the number of
+    messages it missed instead.
+    """
+
+    def __init__(self, websocket: WebSocket, task_id: Optional[str], max_queued: int, send_timeout: float):
+        self.websocket = websocket
+        # None receives the messages of every task
+        self.task_id = task_id
+        self.send_timeout = send_timeout
+        self.dropped = 0
+        self._queue: deque = deque(maxlen=max_queued)
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+
+    def wants(self, task_id: Optional[str]) -> bool:
+        return self.task_id is None or self.task_id == task_id
+
+    def start(self, on_failure):
+        self._writer = asyncio.create_task(self._write_loop(on_failure))
+
+    def stop(self):
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        self._writer = None
+
+    def enqueue(self, message: str):
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(message)
+        self._ready.set()
+
+    async def _write_loop(self, on_failure):
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self._queue:
+                    if self.dropped:
+                        dropped, self.dropped = self.dropped, 0
+                        await self._send(f"⚠️ {dropped} messages were dropped, the connection is too slow")
+                    await self._send(self._queue.popleft())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"❌ Error sending message, dropping WebSocket client: {e!r}")
+            on_failure(self.websocket)
+            try:
+                await self.websocket.close()
+            except Exception:
+                pass
+
+    async def _send(self, message: str):
+        await asyncio.wait_for(self.websocket.send_text(message), self.send_timeout)
+
 
 class WebSocketManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, max_queued_messages: int = 500, send_timeout: float = 10.0):
+        self.max_queued_messages = max_queued_messages
+        self.send_timeout = send_timeout
+        self.connections: Dict[WebSocket, _Connection] = {}
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.connections)
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, task_id: Optional[str] = None):
+        """Accept a client, it receives the messages of `task_id` only, or of every task if None"""
         await websocket.accept()
-        self.active_connections.append(websocket)
-        print(f"✅ WebSocket connected. Total clients: {len(self.active_connections)}")
+        connection = _Connection(websocket, task_id, self.max_queued_messages, self.send_timeout)
+        self.connections[websocket] = connection
+        connection.start(self.disconnect)
+        logger.info(f"✅ WebSocket connected. Total clients: {len(self.connections)}")
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            print(f"⚠️ WebSocket disconnected. Total clients: {len(self.active_connections)}")
-
-    async def send_message(self, message: str):
-        print(f"📤 Sending message to {len(self.active_connections)} clients: {message}")
-        if not self.active_connections:
-            print("⚠️ No active WebSocket connections")
-            return
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                print(f"❌ Error sending message: {e}")
+        connection = self.connections.pop(websocket, None)
+        if connection is not None:
+            connection.stop()
+            logger.info(f"⚠️ WebSocket disconnected. Total clients: {len(self.connections)}")
+
+    async def send_message(self, message: str, task_id: Optional[str] = None):
+        """
+        Queue a message for every client subscribed to `task_id` (and the clients subscribed to all tasks).
+
+        Never waits for the network: each client's writer task sends its queue concurrently with the others.
+        """
+        logger.debug(f"📤 Queueing message for task {task_id}: {message}")
+        for connection in list(self.connections.values()):
+            if connection.wants(task_id):
+                connection.enqueue(message)
 
 # Helper function
+import functools
 import inspect
 
+# Messages sent by send_ws_message that are still in flight, by callback (one per task), referenced so they are not
+# garbage collected mid-send
+_pending_ws_messages: Dict[object, set] = {}
+
+def _on_ws_message_done(message_callback, task: asyncio.Task):
+    pending = _pending_ws_messages.get(message_callback)
+    if pending is not None:
+        pending.discard(task)
+        if not pending:
+            del _pending_ws_messages[message_callback]
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Error sending async message: {task.exception()}")
+
 def send_ws_message(message_callback, message: str):
-    """Send WebSocket message safely, handling both async and sync callbacks."""
-    print(f"📤 Sending WebSocket message: {message}")
+    """Send WebSocket message safely, handling both async and sync callbacks. Never blocks the caller."""
+    logger.debug(f"📤 Sending WebSocket message: {message}")
     if message_callback:
         if inspect.iscoroutinefunction(message_callback):
             try:
-                asyncio.create_task(message_callback(message)) 
+                task = asyncio.create_task(message_callback(message))
+                _pending_ws_messages.setdefault(message_callback, set()).add(task)
+                task.add_done_callback(functools.partial(_on_ws_message_done, message_callback))
             except Exception as e:
                 logger.error(f"Error sending async message: {e}")
         else:
             try:
                 message_callback(message)  # Call sync
             except Exception as e:
-                logger.error(f"Error sending sync message: {e}")
\ No newline at end of file
+                logger.error(f"Error sending sync message: {e}")
+
+async def flush_ws_messages(message_callback):
+    """Wait for the messages sent through `message_callback` by send_ws_message so far, not those of other tasks"""
+    pending = _pending_ws_messages.get(message_callback)
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -33,6 +33,7 @@ from gradio.components import Component
 from langchain_core.language_models.chat_models import BaseChatModel
 
 from src.agent.browser_use.browser_use_agent import BrowserUseAgent
+from src.browser.browser_pool import BrowserPool
 from src.browser.custom_browser import CustomBrowser
 from src.controller.custom_controller import CustomController
 from src.utils import llm_provider
@@ -87,7 +88,39 @@ async def _initialize_llm(
         return None
 
 
-async def run_agent_task(query: str, url: str, message_callback: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
+def build_agent_browser_config() -> BrowserConfig:
+    """Browser settings of the agent runs, shared by the per-task browser and the browser pool"""
+    return BrowserConfig(
+        headless=False,
+        disable_security=False,
+        fullscreen=True,
+        extra_browser_args=[
+            "--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu",
+            "--disable-web-security", "--disable-features=VizDisplayCompositor",
+            "--start-maximized", "--window-size=1920,1080", "--window-position=0,0",
+            "--disable-extensions", "--disable-background-timer-throttling",
+            "--disable-backgrounding-occluded-windows", "--disable-renderer-backgrounding",
+            "--force-device-scale-factor=1", "--high-dpi-support=1"
+        ],
+        new_context_config=BrowserContextConfig(window_width=1920, window_height=1080)
+    )
+
+
+def build_agent_context_config(output_dir: str = os.path.join("/app", "src", "outputdata")) -> BrowserContextConfig:
+    return BrowserContextConfig(
+        save_downloads_path=os.path.join(output_dir, "downloads"),
+        window_height=1080,
+        window_width=1920,
+    )
+
+
+async def run_agent_task(
+        query: str,
+        url: str,
+        message_callback: Optional[Callable[[str], Awaitable[None]]] = None,
+        browser_pool: Optional[BrowserPool] = None,
+        task_id: Optional[str] = None,
+) -> Dict[str, Any]:
     """
     Simplified agent runner that handles everything
     Returns: {
@@ -95,7 +128,7 @@ async def run_agent_task(query: str, url: str, message_callback: Optional[Callab
         "final_result": str
     }
     """
-    task_id = str(uuid.uuid4())
+    task_id = task_id or str(uuid.uuid4())
     if message_callback:
         await message_callback(f"Task ID: {task_id}")
 
@@ -113,67 +146,6 @@ async def run_agent_task(query: str, url: str, message_callback: Optional[Callab
     print(f"🖥️ Using display: {os.getenv('DISPLAY')}")
     
     
-    # 1. Initialize browser
-    playwright = await async_playwright().start()
-    browser = CustomBrowser(
-        config=BrowserConfig(
-            headless=False,
-            disable_security=False,
-            fullscreen=True,
-            extra_browser_args=[
-                "--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu",
-                "--disable-web-security", "--disable-features=VizDisplayCompositor",
-                "--start-maximized", "--window-size=1920,1080", "--window-position=0,0",
-                "--disable-extensions", "--disable-background-timer-throttling",
-                "--disable-backgrounding-occluded-windows", "--disable-renderer-backgrounding",
-                "--force-device-scale-factor=1", "--high-dpi-support=1"
-            ],
-            new_context_config=BrowserContextConfig(window_width=1920, window_height=1080)
-        )
-    )
-
-    playwright_browser = await browser._setup_builtin_browser(playwright)
-    # Recording per tab/context is handled by CustomBrowserContext
-
-    context_config = BrowserContextConfig(
-        save_downloads_path=os.path.join(output_dir, "downloads"),
-        window_height=1080,
-        window_width=1920,
-    )
-    browser_context = await browser.new_context(config=context_config)
-    await browser_context.setup()
-
-    if message_callback:
-        await message_callback("🌐 Maximizing browser window...")
-
-    try:
-        # Use the primary session page instead of creating/closing a helper tab,
-        # so the first navigation can be migrated and recorded as tab_001
-        session = await browser_context.get_session()
-        page = session.context.pages[0] if session.context.pages else await session.context.new_page()
-        await page.set_viewport_size({"width": 1920, "height": 1080})
-        await page.evaluate("""
-            if (window.screen && window.screen.availWidth && window.screen.availHeight) {
-                window.resizeTo(window.screen.availWidth, window.screen.availHeight);
-                window.moveTo(0, 0);
-            }
-            setTimeout(() => {
-                if (document.documentElement.requestFullscreen) {
-                    document.documentElement.requestFullscreen();
-                } else if (document.documentElement.webkitRequestFullscreen) {
-                    document.documentElement.webkitRequestFullscreen();
-                } else if (document.documentElement.msRequestFullscreen) {
-                    document.documentElement.msRequestFullscreen();
-                }
-            }, 1000);
-            if (window.chrome && window.chrome.webstore) {
-                window.resizeTo(screen.availWidth, screen.availHeight);
-            }
-        """)
-        # Do not close the page; the agent will navigate this page first
-    except Exception as e:
-        print(f"⚠️ Could not maximize browser window: {e}")
-
     # 3. Initialize controller
     controller = CustomController()
 
@@ -190,7 +162,7 @@ async def run_agent_task(query: str, url: str, message_callback: Optional[Callab
     
     # 4. Step handler with WebSocket message sending
     async def handle_step(state: BrowserState, output: AgentOutput, step_num: int):
-        step_dir = os.path.join(output_dir, f"step_{step_num}")
+        step_dir = os.path.join(output_dir, "tasks", task_id, f"step_{step_num}")
         os.makedirs(step_dir, exist_ok=True)
 
 
@@ -223,9 +195,6 @@ async def run_agent_task(query: str, url: str, message_callback: Optional[Callab
 
         return None, response_path
 
-    if message_callback:
-        await message_callback("🚀 Starting agent...")
-
     # 5. Run agent
     agent = AgentOrchestrator(
         llm=llm,
@@ -248,12 +217,78 @@ async def run_agent_task(query: str, url: str, message_callback: Optional[Callab
         message_callback=message_callback
     )
 
-    history = await agent.run(
-        task=f"{query}  url: {url}",
-        browser=browser,
-        browser_context=browser_context,
-        controller=controller
-    )
+    # 6. Initialize browser last. A pooled browser is held for the whole orchestrator run (the pre-flight checks and
+    # the browser agent), so the pool is sized for concurrent runs rather than concurrent browser agent steps
+    lease = None
+    playwright = None
+    if browser_pool is not None:
+        if message_callback:
+            await message_callback("🌐 Leasing a browser from the pool...")
+        lease = await browser_pool.acquire()
+        browser, browser_context = lease.browser, lease.browser_context
+    else:
+        playwright = await async_playwright().start()
+        browser = CustomBrowser(config=build_agent_browser_config())
+
+        playwright_browser = await browser._setup_builtin_browser(playwright)
+        # Recording per tab/context is handled by CustomBrowserContext
+
+        browser_context = await browser.new_context(config=build_agent_context_config(output_dir))
+        await browser_context.setup()
+
+    # from here on the browser is returned however the run ends, a cancelled job included
+    succeeded = False
+    try:
+        if message_callback:
+            await message_callback("🌐 Maximizing browser window...")
+
+        try:
+            # Use the primary session page instead of creating/closing a helper tab,
+            # so the first navigation can be migrated and recorded as tab_001
+            session = await browser_context.get_session()
+            page = session.context.pages[0] if session.context.pages else await session.context.new_page()
+            await page.set_viewport_size({"width": 1920, "height": 1080})
+            await page.evaluate("""
+                if (window.screen && window.screen.availWidth && window.screen.availHeight) {
+                    window.resizeTo(window.screen.availWidth, window.screen.availHeight);
+                    window.moveTo(0, 0);
+                }
+                setTimeout(() => {
+                    if (document.documentElement.requestFullscreen) {
+                        document.documentElement.requestFullscreen();
+                    } else if (document.documentElement.webkitRequestFullscreen) {
+                        document.documentElement.webkitRequestFullscreen();
+                    } else if (document.documentElement.msRequestFullscreen) {
+                        document.documentElement.msRequestFullscreen();
+                    }
+                }, 1000);
+                if (window.chrome && window.chrome.webstore) {
+                    window.resizeTo(screen.availWidth, screen.availHeight);
+                }
+            """)
+            # Do not close the page; the agent will navigate this page first
+        except Exception as e:
+            print(f"⚠️ Could not maximize browser window: {e}")
+
+        if message_callback:
+            await message_callback("🚀 Starting agent...")
+
+        history = await agent.run(
+            task=f"{query}  url: {url}",
+            browser=browser,
+            browser_context=browser_context,
+            controller=controller
+        )
+        succeeded = True
+    finally:
+        # Recordings are saved/closed by CustomBrowserContext.close()
+        if lease is not None:
+            # a browser that failed a task may be in any state, the pool relaunches it
+            await browser_pool.release(lease, healthy=succeeded)
+        elif playwright is not None:
+            await browser_context.close()
+            await browser.close()
+            await playwright.stop()
 
     print("\n\n\n\n\n history:", history)
 
@@ -273,12 +308,6 @@ async def run_agent_task(query: str, url: str, message_callback: Optional[Callab
     # if message_callback:
     #     await message_callback("📦 Processing final result...")
 
-    # Recordings are saved/closed by CustomBrowserContext.close()
-
-    await browser_context.close()
-    await browser.close()
-    await playwright.stop()
-
     final_result = "No result"
     if last_result and last_result.extracted_content:
         content = last_result.extracted_content
@@ -200,6 +200,7 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
             logger.warning("Cannot monitor plan file: Task ID unknown.")
             plan_file_path = None
         last_plan_content = None
+        last_partial_report = ""
         while not agent_task.done():
             update_dict = {}
             update_dict[resume_task_id_comp] = gr.update(value=running_task_id)
@@ -228,6 +229,12 @@ async def run_deep_research(webui_manager: WebuiManager, components: Dict[Compon
                     # Avoid continuous logging for the same error
                     await asyncio.sleep(2.0)
 
+            # Once the report is being written, show it as it streams in instead of the plan
+            partial_report = getattr(webui_manager.dr_agent, 'partial_report', "")
+            if partial_report and partial_report != last_partial_report:
+                update_dict[markdown_display_comp] = gr.update(value=partial_report)
+                last_partial_report = partial_report
+
             # Yield updates if any
             if update_dict:
                 yield update_dict
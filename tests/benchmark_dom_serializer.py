@@ -0,0 +1,53 @@
+"""
+Scaling of clickable_elements_to_string on synthetic DOM trees of 1k to 200k nodes.
+
+    python tests/benchmark_dom_serializer.py
+
+The time per node of the single pass serializer stays flat as the tree grows (linear scaling). The recursive
+serializer it replaced is timed too, up to REFERENCE_MAX_NODES, for comparison.
+"""
+
+import random
+import sys
+import time
+
+sys.path.insert(0, "src")
+sys.path.append(".")
+
+from tests.test_dom_serializer import ATTRIBUTES, random_tree, reference_clickable_elements_to_string
+
+SIZES = [1_000, 5_000, 10_000, 50_000, 100_000, 200_000]
+REFERENCE_MAX_NODES = 50_000
+REPEATS = 3
+
+
+def best_time(function, *args) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    # the recursive reference needs the stack of the deepest random trees
+    sys.setrecursionlimit(100_000)
+    print(f"{'nodes':>8} {'single pass (s)':>16} {'us/node':>8} {'recursive (s)':>14} {'us/node':>8}")
+    per_node = []
+    for size in SIZES:
+        root = random_tree(random.Random(size), size)
+        seconds = best_time(root.clickable_elements_to_string, ATTRIBUTES)
+        per_node.append(seconds / size)
+        line = f"{size:>8} {seconds:>16.4f} {seconds / size * 1e6:>8.2f}"
+        if size <= REFERENCE_MAX_NODES:
+            reference = best_time(reference_clickable_elements_to_string, root, ATTRIBUTES)
+            line += f" {reference:>14.4f} {reference / size * 1e6:>8.2f}"
+        print(line)
+
+    print(f"\ntime per node at {SIZES[-1]} nodes vs {SIZES[0]} nodes: {per_node[-1] / per_node[0]:.2f}x "
+          f"(1x is linear scaling)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import json
+import os
+import sys
+import tempfile
+
+# same import paths as the Docker image (PYTHONPATH=/app/src:/app)
+sys.path.insert(0, "src")
+sys.path.append(".")
+
+from src.agent.deep_research.checkpoint_store import (
+    JOURNAL_FILENAME,
+    PLAN_FILENAME,
+    SEARCH_INFO_FILENAME,
+    ResearchCheckpointStore,
+    render_plan_md,
+)
+
+
+def make_plan():
+    return [
+        {
+            "category_name": "Background",
+            "tasks": [
+                {"task_description": "Find the history", "status": "pending", "queries": None, "result_summary": None},
+                {"task_description": "Find the people", "status": "pending", "queries": None, "result_summary": None},
+            ],
+        },
+        {
+            "category_name": "Impact",
+            "tasks": [
+                {"task_description": "Find the numbers", "status": "pending", "queries": None, "result_summary": None},
+            ],
+        },
+    ]
+
+
+def result(query, text="finding"):
+    return {"query": query, "status": "completed", "result": text}
+
+
+def test_commits_are_replayed():
+    with tempfile.TemporaryDirectory() as output_dir:
+        store = ResearchCheckpointStore(output_dir)
+        store.commit_plan(make_plan())
+        store.commit_task((1, 0), "completed", "numbers found", [result("numbers")])
+        store.commit_task((0, 0), "failed", "no history", [])
+
+        resumed = ResearchCheckpointStore(output_dir)
+        assert resumed.commits == 3
+        assert resumed.plan[1]["tasks"][0]["status"] == "completed"
+        assert resumed.plan[0]["tasks"][0]["status"] == "failed"
+        assert resumed.search_results == [result("numbers")]
+        assert resumed.next_pending_task() == (0, 1)
+        state = resumed.resume_state()
+        assert (state["current_category_index"], state["current_task_index_in_category"]) == (0, 1)
+
+
+def test_torn_last_line_is_dropped_and_truncated():
+    with tempfile.TemporaryDirectory() as output_dir:
+        store = ResearchCheckpointStore(output_dir)
+        store.commit_plan(make_plan())
+        store.commit_task((0, 0), "completed", "history found", [result("history")])
+        journal_path = os.path.join(output_dir, JOURNAL_FILENAME)
+        valid_size = os.path.getsize(journal_path)
+        with open(journal_path, "a", encoding="utf-8") as f:
+            f.write('{"op": "task", "key": [0, 1], "status": "comp')
+
+        resumed = ResearchCheckpointStore(output_dir)
+        assert resumed.commits == 2
+        assert resumed.plan[0]["tasks"][1]["status"] == "pending"
+        assert os.path.getsize(journal_path) == valid_size
+
+        # commits after the truncation start on a line of their own
+        resumed.commit_task((0, 1), "completed", "people found", [result("people")])
+        assert ResearchCheckpointStore(output_dir).search_results == [result("history"), result("people")]
+
+
+def test_task_run_again_replaces_its_results():
+    with tempfile.TemporaryDirectory() as output_dir:
+        store = ResearchCheckpointStore(output_dir)
+        store.commit_plan(make_plan())
+        store.commit_task((0, 0), "completed", "first run", [result("history", "old")])
+        store.commit_task((0, 0), "completed", "second run", [result("history", "new")])
+
+        for reader in (store, ResearchCheckpointStore(output_dir)):
+            assert reader.search_results == [result("history", "new")]
+            assert reader.plan[0]["tasks"][0]["result_summary"] == "second run"
+
+
+def test_results_are_in_plan_order_and_grouped_by_category():
+    with tempfile.TemporaryDirectory() as output_dir:
+        store = ResearchCheckpointStore(output_dir)
+        store.commit_plan(make_plan())
+        store.commit_task((1, 0), "completed", None, [result("numbers")])
+        store.commit_task((0, 1), "completed", None, [result("people")])
+        store.commit_task((0, 0), "completed", None, [result("history")])
+
+        assert [r["query"] for r in store.search_results] == ["history", "people", "numbers"]
+        grouped = store.search_results_by_category()
+        assert [r["query"] for r in grouped[0]] == ["history", "people"]
+        assert [r["query"] for r in grouped[1]] == ["numbers"]
+
+
+def test_new_plan_replaces_the_results():
+    with tempfile.TemporaryDirectory() as output_dir:
+        store = ResearchCheckpointStore(output_dir)
+        store.commit_plan(make_plan())
+        store.commit_task((0, 0), "completed", None, [result("history")])
+        store.commit_plan(make_plan())
+
+        assert store.search_results == []
+        assert ResearchCheckpointStore(output_dir).next_pending_task() == (0, 0)
+
+
+def test_failed_write_still_applies_the_commit():
+    with tempfile.TemporaryDirectory() as output_dir:
+        store = ResearchCheckpointStore(output_dir)
+        store.commit_plan(make_plan())
+        store.journal_path = os.path.join(output_dir, "missing", JOURNAL_FILENAME)
+        store.commit_task((0, 0), "completed", "history found", [result("history")])
+
+        assert store.commits == 1
+        assert store.plan[0]["tasks"][0]["status"] == "completed"
+        assert store.search_results == [result("history")]
+
+
+def test_legacy_files_are_imported():
+    with tempfile.TemporaryDirectory() as output_dir:
+        plan = make_plan()
+        plan[0]["tasks"][0]["status"] = "completed"
+        plan[0]["tasks"][1]["status"] = "failed"
+        with open(os.path.join(output_dir, PLAN_FILENAME), "w", encoding="utf-8") as f:
+            f.write(render_plan_md(plan))
+        with open(os.path.join(output_dir, SEARCH_INFO_FILENAME), "w", encoding="utf-8") as f:
+            json.dump([result("history")], f)
+
+        store = ResearchCheckpointStore(output_dir)
+        assert [category["category_name"] for category in store.plan] == ["Background", "Impact"]
+        assert [task["status"] for task in store.plan[0]["tasks"]] == ["completed", "failed"]
+        assert store.next_pending_task() == (1, 0)
+        assert store.search_results == [result("history")]
+        assert store.search_results_by_category() == {None: [result("history")]}
+
+        # imported once, then replayed from the journal
+        assert os.path.exists(os.path.join(output_dir, JOURNAL_FILENAME))
+        assert ResearchCheckpointStore(output_dir).search_results == [result("history")]
+
+
+def test_exported_search_results_are_imported():
+    with tempfile.TemporaryDirectory() as output_dir:
+        with open(os.path.join(output_dir, PLAN_FILENAME), "w", encoding="utf-8") as f:
+            f.write(render_plan_md(make_plan()))
+        with open(os.path.join(output_dir, SEARCH_INFO_FILENAME), "w", encoding="utf-8") as f:
+            json.dump({"search_results": [result("history")], "cache_stats": {"search_hits": 1}}, f)
+
+        assert ResearchCheckpointStore(output_dir).search_results == [result("history")]
+
+
+if __name__ == '__main__':
+    test_commits_are_replayed()
+    test_torn_last_line_is_dropped_and_truncated()
+    test_task_run_again_replaces_its_results()
+    test_results_are_in_plan_order_and_grouped_by_category()
+    test_new_plan_replaces_the_results()
+    test_failed_write_still_applies_the_commit()
+    test_legacy_files_are_imported()
+    test_exported_search_results_are_imported()
@@ -0,0 +1,173 @@
+import random
+import sys
+
+# same import paths as the Docker image (PYTHONPATH=/app/src:/app)
+sys.path.insert(0, "src")
+sys.path.append(".")
+
+from browser_use.dom.views import DOMElementNode, DOMTextNode
+
+ATTRIBUTES = ["role", "aria-label", "placeholder", "title", "type", "name"]
+TAGS = ["div", "span", "a", "button", "input", "li", "ul", "p", "select", "textarea"]
+
+
+def random_tree(rng: random.Random, size: int, max_children: int = 6) -> DOMElementNode:
+    """Random DOM tree of about `size` nodes, mixing highlighted elements, hidden elements and text"""
+    root = DOMElementNode(is_visible=True, parent=None, tag_name="body", xpath="", attributes={}, children=[],
+                          is_top_element=True)
+    open_elements = [root]
+    highlight_index = 0
+    for _ in range(size - 1):
+        parent = rng.choice(open_elements)
+        if len(parent.children) + 1 >= max_children and len(open_elements) > 1:
+            open_elements.remove(parent)
+        if rng.random() < 0.35:
+            text = rng.choice(["Search", "Go", "  padded  ", "line\nbreak", "Next page", ""])
+            parent.children.append(DOMTextNode(is_visible=True, parent=parent, text=text))
+            continue
+
+        tag = rng.choice(TAGS)
+        attributes = {name: rng.choice([tag, "Search", "Go", "x"]) for name in ATTRIBUTES if rng.random() < 0.3}
+        element = DOMElementNode(
+            is_visible=rng.random() < 0.9,
+            parent=parent,
+            tag_name=tag,
+            xpath=f"{parent.xpath}/{tag}",
+            attributes=attributes,
+            children=[],
+            is_top_element=rng.random() < 0.9,
+            highlight_index=None,
+            is_new=rng.choice([None, False, True]),
+        )
+        if rng.random() < 0.4:
+            element.highlight_index = highlight_index
+            highlight_index += 1
+        parent.children.append(element)
+        open_elements.append(element)
+    return root
+
+
+def reference_clickable_elements_to_string(root: DOMElementNode, include_attributes=None) -> str:
+    """The recursive serializer clickable_elements_to_string replaced, kept as the reference output"""
+
+    def text_till_next_clickable_element(element: DOMElementNode) -> str:
+        text_parts = []
+
+        def collect_text(node, current_depth: int) -> None:
+            if isinstance(node, DOMElementNode) and node is not element and node.highlight_index is not None:
+                return
+            if isinstance(node, DOMTextNode):
+                text_parts.append(node.text)
+            elif isinstance(node, DOMElementNode):
+                for child in node.children:
+                    collect_text(child, current_depth + 1)
+
+        collect_text(element, 0)
+        return "\n".join(text_parts).strip()
+
+    formatted_text = []
+
+    def process_node(node, depth: int) -> None:
+        next_depth = int(depth)
+        depth_str = depth * "\t"
+
+        if isinstance(node, DOMElementNode):
+            if node.highlight_index is not None:
+                next_depth += 1
+
+                text = text_till_next_clickable_element(node)
+                attributes_html_str = ""
+                if include_attributes:
+                    attributes_to_include = {
+                        key: str(value) for key, value in node.attributes.items() if key in include_attributes
+                    }
+                    if node.tag_name == attributes_to_include.get("role"):
+                        del attributes_to_include["role"]
+                    if (
+                            attributes_to_include.get("aria-label")
+                            and attributes_to_include.get("aria-label", "").strip() == text.strip()
+                    ):
+                        del attributes_to_include["aria-label"]
+                    if (
+                            attributes_to_include.get("placeholder")
+                            and attributes_to_include.get("placeholder", "").strip() == text.strip()
+                    ):
+                        del attributes_to_include["placeholder"]
+                    if attributes_to_include:
+                        attributes_html_str = " ".join(f"{key}='{value}'" for key, value in attributes_to_include.items())
+
+                if node.is_new:
+                    highlight_indicator = f"*[{node.highlight_index}]*"
+                else:
+                    highlight_indicator = f"[{node.highlight_index}]"
+
+                line = f"{depth_str}{highlight_indicator}<{node.tag_name}"
+                if attributes_html_str:
+                    line += f" {attributes_html_str}"
+                if text:
+                    if not attributes_html_str:
+                        line += " "
+                    line += f">{text}"
+                elif not attributes_html_str:
+                    line += " "
+                line += " />"
+                formatted_text.append(line)
+
+            for child in node.children:
+                process_node(child, next_depth)
+
+        elif isinstance(node, DOMTextNode):
+            if (
+                    not node.has_parent_with_highlight_index()
+                    and node.parent
+                    and node.parent.is_visible
+                    and node.parent.is_top_element
+            ):
+                formatted_text.append(f"{depth_str}{node.text}")
+
+    process_node(root, 0)
+    return "\n".join(formatted_text)
+
+
+def test_matches_recursive_serializer():
+    rng = random.Random(20)
+    for _ in range(300):
+        root = random_tree(rng, rng.randint(1, 400))
+        for include_attributes in (None, ATTRIBUTES):
+            assert root.clickable_elements_to_string(include_attributes) == \
+                   reference_clickable_elements_to_string(root, include_attributes)
+
+
+def test_matches_recursive_serializer_on_subtrees():
+    # a highlighted ancestor above the serialized subtree owns its text
+    rng = random.Random(7)
+    for _ in range(50):
+        root = random_tree(rng, 300)
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, DOMElementNode):
+                assert node.clickable_elements_to_string(ATTRIBUTES) == \
+                       reference_clickable_elements_to_string(node, ATTRIBUTES)
+                stack.extend(node.children)
+
+
+def test_deep_tree_does_not_recurse():
+    root = DOMElementNode(is_visible=True, parent=None, tag_name="body", xpath="", attributes={}, children=[],
+                          is_top_element=True)
+    node = root
+    for i in range(sys.getrecursionlimit() * 2):
+        child = DOMElementNode(is_visible=True, parent=node, tag_name="div", xpath="", attributes={}, children=[],
+                               is_top_element=True, highlight_index=i if i % 100 == 0 else None)
+        node.children.append(child)
+        node = child
+    node.children.append(DOMTextNode(is_visible=True, parent=node, text="leaf"))
+
+    lines = root.clickable_elements_to_string().split("\n")
+    assert lines[-1].strip() == "[" + str((sys.getrecursionlimit() * 2 - 1) // 100 * 100) + "]<div >leaf />"
+
+
+if __name__ == '__main__':
+    test_matches_recursive_serializer()
+    test_matches_recursive_serializer_on_subtrees()
+    test_deep_tree_does_not_recurse()
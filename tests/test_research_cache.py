@@ -0,0 +1,203 @@
+import asyncio
+import sys
+
+# same import paths as the Docker image (PYTHONPATH=/app/src:/app)
+sys.path.insert(0, "src")
+sys.path.append(".")
+
+from src.agent.deep_research.research_cache import ResearchCache, canonical_url, query_key
+
+
+def completed(query, text="finding"):
+    return {"query": query, "status": "completed", "result": text}
+
+
+def test_query_key_ignores_case_spacing_and_trailing_punctuation():
+    assert query_key("Python  GIL removal?") == query_key("python gil removal")
+    assert query_key("  Rust async\truntime. ") == query_key("rust async runtime")
+
+
+def test_query_key_keeps_word_order_and_repeated_words():
+    assert query_key("flights from paris to london") != query_key("flights from london to paris")
+    assert query_key("dog bites man") != query_key("man bites dog")
+    assert query_key("new new york") != query_key("new york")
+
+
+def test_completed_search_is_reused():
+    cache = ResearchCache()
+    calls = []
+
+    async def run():
+        calls.append(1)
+        return completed("GIL removal")
+
+    async def main():
+        first = await cache.search("GIL removal", run)
+        second = await cache.search("gil removal?", run)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert len(calls) == 1
+    assert "cached" not in first
+    assert second["cached"] and second["query"] == "gil removal?" and second["result"] == "finding"
+    assert (cache.search_hits, cache.search_misses) == (1, 1)
+
+
+def test_reordered_query_is_searched_again():
+    cache = ResearchCache()
+    calls = []
+
+    async def run():
+        calls.append(1)
+        return completed("query")
+
+    async def main():
+        await cache.search("paris to london", run)
+        await cache.search("london to paris", run)
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_identical_running_searches_are_merged():
+    cache = ResearchCache()
+    calls = []
+
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return completed("q")
+
+    async def main():
+        return await asyncio.gather(*(cache.search("Same query", run) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert sum(bool(result.get("cached")) for result in results) == 2
+
+
+def test_failed_running_search_is_retried_by_one_waiter():
+    cache = ResearchCache()
+    calls = []
+
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        if len(calls) == 1:
+            raise RuntimeError("search failed")
+        return completed("q")
+
+    async def main():
+        return await asyncio.gather(*(cache.search("Same query", run) for _ in range(4)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert isinstance(results[0], RuntimeError)
+    # one waiter searched again, the two others reused its result
+    assert len(calls) == 2
+    assert [bool(result.get("cached")) for result in results[1:]].count(True) == 2
+
+
+def test_failed_search_is_retried_only_once_when_every_run_fails():
+    cache = ResearchCache()
+    calls = []
+
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        if len(calls) == 1:
+            raise RuntimeError("search failed")
+        return {"query": "Same query", "status": "cancelled", "result": None}
+
+    async def main():
+        return await asyncio.gather(*(cache.search("Same query", run) for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert len(calls) == 2
+    assert isinstance(results[0], RuntimeError)
+    # the retry's stopped result goes to the waiters that didn't retry, none of them is a cache hit
+    assert [result["status"] for result in results[1:]] == ["cancelled"] * 4
+    assert all(result["query"] == "Same query" and not result.get("cached") for result in results[1:])
+    assert cache.search_hits == 0
+
+
+def test_unsuccessful_search_is_not_cached():
+    cache = ResearchCache()
+    calls = []
+
+    async def run():
+        calls.append(1)
+        return {"query": "q", "status": "failed", "error": "timeout"}
+
+    async def main():
+        await cache.search("q", run)
+        await cache.search("q", run)
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_results_of_earlier_runs_are_reused():
+    cache = ResearchCache([completed("Earlier query"), {"query": "failed", "status": "failed"}])
+
+    async def run():
+        raise AssertionError("should not search")
+
+    assert asyncio.run(cache.search("earlier query", run))["cached"]
+
+
+def test_extraction_is_keyed_by_canonical_url_content_and_goal():
+    cache = ResearchCache()
+    calls = []
+
+    async def run():
+        calls.append(1)
+        return f"extraction {len(calls)}"
+
+    async def main():
+        first = await cache.extract("https://Example.com/page/?utm_source=x#top", "text", "Prices", None, run)
+        same = await cache.extract("https://example.com/page", "text", "prices", None, run)
+        changed_page = await cache.extract("https://example.com/page", "new text", "prices", None, run)
+        other_goal = await cache.extract("https://example.com/page", "text", "opening hours", None, run)
+        return first, same, changed_page, other_goal
+
+    assert asyncio.run(main()) == ("extraction 1", "extraction 1", "extraction 2", "extraction 3")
+    assert (cache.extraction_hits, cache.extraction_misses) == (1, 3)
+
+
+def test_canonical_url():
+    assert canonical_url("HTTPS://Example.COM:443/a/?b=2&a=1&utm_campaign=x#frag") == "https://example.com/a?a=1&b=2"
+    assert canonical_url("http://example.com:8080") == "http://example.com:8080/"
+    assert canonical_url("https://example.com/a?gclid=1") == canonical_url("https://example.com/a")
+    assert canonical_url("https://example.com/a?page=2") != canonical_url("https://example.com/a?page=3")
+
+
+def test_near_duplicate_findings_are_collapsed():
+    cache = ResearchCache()
+    text = "The global market for electric bicycles grew by twelve percent in 2023 according to the annual report"
+    results = [
+        completed("market growth", text),
+        completed("ebike market", text + " published in March"),
+        completed("battery prices", "Lithium battery pack prices fell to a record low of 139 dollars per kWh"),
+        {"query": "failed search", "status": "failed"},
+    ]
+
+    kept = cache.collapse_near_duplicates(results)
+    assert [result["query"] for result in kept] == ["market growth", "battery prices", "failed search"]
+    assert kept[0]["duplicate_queries"] == ["ebike market"]
+    assert "duplicate_queries" not in results[0]
+    assert cache.stats["duplicates_collapsed"] == 1
+
+
+if __name__ == '__main__':
+    test_query_key_ignores_case_spacing_and_trailing_punctuation()
+    test_query_key_keeps_word_order_and_repeated_words()
+    test_completed_search_is_reused()
+    test_reordered_query_is_searched_again()
+    test_identical_running_searches_are_merged()
+    test_failed_running_search_is_retried_by_one_waiter()
+    test_failed_search_is_retried_only_once_when_every_run_fails()
+    test_unsuccessful_search_is_not_cached()
+    test_results_of_earlier_runs_are_reused()
+    test_extraction_is_keyed_by_canonical_url_content_and_goal()
+    test_canonical_url()
+    test_near_duplicate_findings_are_collapsed()
@@ -0,0 +1,152 @@
+import os
+import sys
+
+# same import paths as the Docker image (PYTHONPATH=/app/src:/app)
+sys.path.insert(0, "src")
+sys.path.append(".")
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "false")
+
+from langchain_core.messages import SystemMessage
+
+from browser_use.agent.message_manager.service import MessageManager, MessageManagerSettings
+from browser_use.agent.message_manager.token_counter import TokenCounter
+from browser_use.agent.message_manager.views import MessageManagerState
+from browser_use.browser.views import BrowserState
+from browser_use.dom.trimming import trim_clickable_elements
+from browser_use.dom.views import DOMElementNode, DOMTextNode
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def make_body() -> DOMElementNode:
+    return DOMElementNode(is_visible=True, parent=None, tag_name="body", xpath="", attributes={}, children=[],
+                          is_top_element=True)
+
+
+def add_element(parent: DOMElementNode, text: str, tag: str = "button", highlight_index=None, **kwargs):
+    element = DOMElementNode(is_visible=True, parent=parent, tag_name=tag, xpath="", attributes={}, children=[],
+                             is_top_element=True, highlight_index=highlight_index, **kwargs)
+    element.children.append(DOMTextNode(is_visible=True, parent=element, text=text))
+    parent.children.append(element)
+    return element
+
+
+def line_tokens(lines) -> int:
+    return sum(count_words(line) + 1 for line in lines)
+
+
+def test_fitting_elements_are_not_trimmed():
+    body = make_body()
+    for i in range(5):
+        add_element(body, f"button {i}", highlight_index=i, viewport_distance=0)
+
+    assert trim_clickable_elements(body, 1000, count_words) == body.clickable_elements_to_string()
+
+
+def test_near_new_and_input_elements_survive_distant_ones():
+    body = make_body()
+    add_element(body, "far away from the viewport", highlight_index=0, viewport_distance=5000)
+    add_element(body, "in view", highlight_index=1, viewport_distance=0)
+    add_element(body, "far but new", highlight_index=2, viewport_distance=5000, is_new=True)
+    add_element(body, "far input", tag="input", highlight_index=3, viewport_distance=5000)
+    add_element(body, "far away from the viewport too", highlight_index=4, viewport_distance=5000)
+    lines = body.clickable_elements_to_string().split("\n")
+    note = "... 2 less relevant elements and 0 text lines omitted ..."
+
+    trimmed = trim_clickable_elements(body, line_tokens(lines[1:4]) + count_words(note), count_words)
+    # the kept lines keep their document order, the note comes last
+    assert trimmed.split("\n") == lines[1:4] + [note]
+
+
+def test_omitted_note_counts_text_lines():
+    body = make_body()
+    body.children.append(DOMTextNode(is_visible=True, parent=body, text="a long paragraph of page text " * 5))
+    add_element(body, "in view", highlight_index=0, viewport_distance=0)
+    add_element(body, "below the fold", highlight_index=1, is_in_viewport=False)
+    full = body.clickable_elements_to_string()
+
+    trimmed = trim_clickable_elements(body, count_words(full) // 2, count_words)
+    assert trimmed.endswith("text lines omitted ...")
+    assert "[0]<button >in view />" in trimmed
+    assert "a long paragraph" not in trimmed
+    assert count_words(trimmed) <= count_words(full) // 2 + len(trimmed.split("\n"))
+
+
+def make_manager(max_input_tokens: int, image_tokens: int = 800) -> MessageManager:
+    return MessageManager(
+        "task",
+        SystemMessage(content="system prompt"),
+        MessageManagerSettings(max_input_tokens=max_input_tokens, image_tokens=image_tokens),
+        MessageManagerState(),
+        token_counter=TokenCounter(),
+    )
+
+
+def make_state(elements: int) -> BrowserState:
+    body = make_body()
+    for i in range(elements):
+        add_element(body, f"button number {i} with some text", highlight_index=i, viewport_distance=i * 100)
+    return BrowserState(element_tree=body, selector_map={}, url="https://example.com", title="Example", tabs=[],
+                        screenshot="iVBORw0KGgo")
+
+
+def test_screenshot_is_dropped_before_any_text():
+    state = make_state(50)
+    manager = make_manager(max_input_tokens=100_000)
+    manager.add_state_message(state, use_vision=True)
+    message = manager.state.history.messages[-1]
+    text_tokens = message.metadata.tokens - manager.settings.image_tokens
+
+    # the text fits, the text and the screenshot don't
+    manager = make_manager(max_input_tokens=manager.state.history.current_tokens - manager.settings.image_tokens // 2)
+    manager.add_state_message(state, use_vision=True)
+    message = manager.state.history.messages[-1]
+
+    assert isinstance(message.message.content, str)
+    assert "omitted" not in message.message.content
+    assert "[49]<button" in message.message.content
+    assert message.metadata.tokens == text_tokens
+    assert manager.state.history.current_tokens <= manager.settings.max_input_tokens
+
+
+def test_text_is_trimmed_when_it_does_not_fit_either():
+    state = make_state(200)
+    manager = make_manager(max_input_tokens=100_000)
+    history_tokens = manager.state.history.current_tokens
+
+    manager = make_manager(max_input_tokens=history_tokens + 600)
+    manager.add_state_message(state, use_vision=True)
+    message = manager.state.history.messages[-1]
+
+    assert isinstance(message.message.content, str)
+    assert "less relevant elements" in message.message.content
+    # the elements in view are kept, the farthest ones dropped
+    assert "[0]<button" in message.message.content
+    assert "[199]<button" not in message.message.content
+    assert manager.state.history.current_tokens <= manager.settings.max_input_tokens
+
+
+def test_cut_messages_renders_the_state_again_with_fewer_elements():
+    state = make_state(100)
+    manager = make_manager(max_input_tokens=100_000)
+    manager.add_state_message(state, use_vision=False)
+    full_text = manager.state.history.messages[-1].message.content
+
+    manager.settings.max_input_tokens = manager.state.history.current_tokens - 300
+    manager.cut_messages()
+    message = manager.state.history.messages[-1]
+
+    assert "less relevant elements" in message.message.content
+    assert len(message.message.content) < len(full_text)
+    assert manager.state.history.current_tokens <= manager.settings.max_input_tokens
+
+
+if __name__ == '__main__':
+    test_fitting_elements_are_not_trimmed()
+    test_near_new_and_input_elements_survive_distant_ones()
+    test_omitted_note_counts_text_lines()
+    test_screenshot_is_dropped_before_any_text()
+    test_text_is_trimmed_when_it_does_not_fit_either()
+    test_cut_messages_renders_the_state_again_with_fewer_elements()
@@ -0,0 +1,124 @@
+import asyncio
+import sys
+
+# same import paths as the Docker image (PYTHONPATH=/app/src:/app)
+sys.path.insert(0, "src")
+sys.path.append(".")
+
+from src.agent.deep_research.task_scheduler import ResearchTaskScheduler, parse_task_reference
+
+
+def make_plan(*categories):
+    """Plan of pending tasks, each category a list of depends_on lists"""
+    return [
+        {
+            "category_name": f"Category {cat_idx + 1}",
+            "tasks": [
+                {"task_description": f"Task {cat_idx + 1}.{task_idx + 1}", "status": "pending", "depends_on": depends_on}
+                for task_idx, depends_on in enumerate(tasks)
+            ],
+        }
+        for cat_idx, tasks in enumerate(categories)
+    ]
+
+
+def run_plan(plan, max_concurrency=1, fail=(), delays=None):
+    started, finished = [], []
+
+    async def run_task(key, dependency_outcomes):
+        started.append(key)
+        await asyncio.sleep((delays or {}).get(key, 0.01))
+        if key in fail:
+            raise RuntimeError(f"task {key} failed")
+        return {"key": key, "dependencies": dependency_outcomes}
+
+    scheduler = ResearchTaskScheduler(
+        plan, run_task, max_concurrency=max_concurrency, on_task_done=lambda key, outcome: finished.append(key)
+    )
+    outcomes = asyncio.run(scheduler.run())
+    return scheduler, outcomes, started, finished
+
+
+def test_parse_task_reference():
+    assert parse_task_reference("1.2") == (0, 1)
+    assert parse_task_reference(" 3 . 1 ") == (2, 0)
+    assert parse_task_reference("a.b") is None
+    assert parse_task_reference(None) is None
+
+
+def test_dependencies_run_first_and_pass_their_outcomes():
+    plan = make_plan([None, ["2.1"]], [None])
+    _, outcomes, started, finished = run_plan(plan, max_concurrency=3)
+
+    assert set(outcomes) == {(0, 0), (0, 1), (1, 0)}
+    assert started.index((1, 0)) < started.index((0, 1))
+    assert finished.index((1, 0)) < finished.index((0, 1))
+    assert outcomes[(0, 1)]["dependencies"] == {(1, 0): outcomes[(1, 0)]}
+
+
+def test_independent_tasks_run_concurrently_up_to_the_limit():
+    plan = make_plan([None, None, None, None])
+    running = 0
+    most_running = 0
+
+    async def run_task(key, dependency_outcomes):
+        nonlocal running, most_running
+        running += 1
+        most_running = max(most_running, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    asyncio.run(ResearchTaskScheduler(plan, run_task, max_concurrency=2).run())
+    assert most_running == 2
+
+
+def test_failed_dependency_still_unblocks_its_dependents():
+    plan = make_plan([None, ["1.1"]])
+    _, outcomes, started, _ = run_plan(plan, fail={(0, 0)})
+
+    assert isinstance(outcomes[(0, 0)], RuntimeError)
+    assert (0, 1) in started
+    assert isinstance(outcomes[(0, 1)]["dependencies"][(0, 0)], RuntimeError)
+
+
+def test_circular_dependencies_are_left_pending():
+    plan = make_plan([["1.2"], ["1.1"], None])
+    scheduler, outcomes, started, _ = run_plan(plan)
+
+    assert started == [(0, 2)]
+    assert set(outcomes) == {(0, 2)}
+    assert scheduler.critical_path_length() == 2
+
+
+def test_invalid_and_self_dependencies_are_ignored():
+    plan = make_plan([["1.1", "9.9", "nonsense"], None])
+    scheduler, outcomes, _, _ = run_plan(plan)
+
+    assert scheduler.dependencies[(0, 0)] == set()
+    assert set(outcomes) == {(0, 0), (0, 1)}
+
+
+def test_finished_tasks_are_not_run_again():
+    plan = make_plan([None, ["1.1"]])
+    plan[0]["tasks"][0]["status"] = "completed"
+    _, outcomes, started, _ = run_plan(plan)
+
+    assert started == [(0, 1)]
+    # the outcome of a task finished by an earlier run is not known
+    assert outcomes[(0, 1)]["dependencies"] == {(0, 0): None}
+
+
+def test_critical_path_length():
+    scheduler, _, _, _ = run_plan(make_plan([None, ["1.1"], ["1.2"]], [["1.1"]]))
+    assert scheduler.critical_path_length() == 3
+
+
+if __name__ == '__main__':
+    test_parse_task_reference()
+    test_dependencies_run_first_and_pass_their_outcomes()
+    test_independent_tasks_run_concurrently_up_to_the_limit()
+    test_failed_dependency_still_unblocks_its_dependents()
+    test_circular_dependencies_are_left_pending()
+    test_invalid_and_self_dependencies_are_ignored()
+    test_finished_tasks_are_not_run_again()
+    test_critical_path_length()
@@ -0,0 +1,133 @@
+import os
+import sys
+import tempfile
+
+# same import paths as the Docker image (PYTHONPATH=/app/src:/app)
+sys.path.insert(0, "src")
+sys.path.append(".")
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "false")
+
+import tiktoken
+import tiktoken.load
+from langchain_core.messages import HumanMessage, SystemMessage
+from tiktoken.registry import ENCODINGS
+
+from browser_use.agent.message_manager import token_counter
+from browser_use.agent.message_manager.service import MessageManager, MessageManagerSettings
+from browser_use.agent.message_manager.token_counter import TiktokenCounter, TokenCounter, get_token_counter
+from browser_use.agent.message_manager.views import MessageManagerState
+
+
+def byte_encoding(name: str) -> tiktoken.Encoding:
+    """Offline stand-in for a tiktoken encoding: one token per byte of each word and each run of spaces"""
+    return tiktoken.Encoding(name, pat_str=r"\S+|\s+", mergeable_ranks={bytes([i]): i for i in range(256)},
+                             special_tokens={})
+
+
+def test_estimate_and_memo():
+    counter = TokenCounter(estimated_characters_per_token=3, memo_size=2)
+    assert counter.count("abcdefghi") == 3
+    assert counter.count("abcdefghi") == 3
+    assert (counter.calls, counter.memo_hits) == (2, 1)
+
+    # least recently used texts leave the memo first
+    counter.count("one")
+    counter.count("abcdefghi")
+    counter.count("two")
+    counter.count("abcdefghi")
+    assert counter.memo_hits == 3
+    counter.count("one")
+    assert counter.memo_hits == 3
+
+    # one-off texts don't take a memo entry
+    counter.count("once", memoize=False)
+    counter.count("once", memoize=False)
+    assert counter.memo_hits == 3
+    assert "once" not in counter._memo
+
+
+def test_stats():
+    counter = TiktokenCounter(byte_encoding("test_bytes"), estimated_characters_per_token=3)
+    counter.count("abcdef")  # 6 tokens, estimated 2
+    counter.count("abcdef")
+
+    stats = counter.stats
+    assert stats["counter"] == "tiktoken:test_bytes"
+    assert (stats["calls"], stats["memo_hits"]) == (2, 1)
+    assert stats["estimate_error"] == round(4 / 6, 3)
+    assert TokenCounter().stats["estimate_error"] == 0.0
+
+
+def test_truncate():
+    assert TokenCounter(estimated_characters_per_token=2).truncate("abcdefgh", 3) == "abcdef"
+    counter = TiktokenCounter(byte_encoding("test_bytes"))
+    assert counter.truncate("abcdefgh", 3) == "abc"
+    assert counter.truncate("abc", 10) == "abc"
+
+
+def test_uncached_encoding_falls_back_to_the_estimate_without_downloading():
+    def no_download(blobpath):
+        raise AssertionError(f"tried to download {blobpath}")
+
+    read_file = tiktoken.load.read_file
+    cache_dir = os.environ.get("TIKTOKEN_CACHE_DIR")
+    token_counter._tiktoken_encoding.cache_clear()
+    try:
+        with tempfile.TemporaryDirectory() as empty_cache:
+            os.environ["TIKTOKEN_CACHE_DIR"] = empty_cache
+            tiktoken.load.read_file = no_download
+            counter = get_token_counter("gpt-4o", estimated_characters_per_token=4)
+            assert type(counter) is TokenCounter
+            assert counter.count("abcdefgh") == 2
+            assert type(get_token_counter("unknown")) is TokenCounter
+            assert type(get_token_counter(None)) is TokenCounter
+    finally:
+        tiktoken.load.read_file = read_file
+        if cache_dir is None:
+            os.environ.pop("TIKTOKEN_CACHE_DIR", None)
+        else:
+            os.environ["TIKTOKEN_CACHE_DIR"] = cache_dir
+        token_counter._tiktoken_encoding.cache_clear()
+
+
+def test_loaded_encoding_is_used():
+    previous = ENCODINGS.get("cl100k_base")
+    token_counter._tiktoken_encoding.cache_clear()
+    try:
+        ENCODINGS["cl100k_base"] = byte_encoding("cl100k_base")
+        counter = get_token_counter("gpt-4")
+        assert isinstance(counter, TiktokenCounter)
+        assert counter.count("abc de") == 6
+    finally:
+        if previous is None:
+            ENCODINGS.pop("cl100k_base", None)
+        else:
+            ENCODINGS["cl100k_base"] = previous
+        token_counter._tiktoken_encoding.cache_clear()
+
+
+def test_image_parts_count_as_image_tokens():
+    manager = MessageManager(
+        "task",
+        SystemMessage(content="system prompt"),
+        MessageManagerSettings(image_tokens=123, estimated_characters_per_token=3),
+        MessageManagerState(),
+        token_counter=TokenCounter(estimated_characters_per_token=3),
+    )
+    text = "x" * 30
+    message = HumanMessage(content=[
+        {"type": "text", "text": text},
+        {"type": "image_url", "image_url": {"url": "data:image/png;base64,iVBORw0KGgo"}},
+    ])
+
+    assert manager._count_tokens(message) == 10 + 123
+    assert manager._count_tokens(HumanMessage(content=text)) == 10
+
+
+if __name__ == '__main__':
+    test_estimate_and_memo()
+    test_stats()
+    test_truncate()
+    test_uncached_encoding_falls_back_to_the_estimate_without_downloading()
+    test_loaded_encoding_is_used()
+    test_image_parts_count_as_image_tokens()